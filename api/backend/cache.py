@@ -0,0 +1,152 @@
+"""
+In-process stale-while-revalidate cache for dashboard aggregates.
+
+    metrics_cache.get(key, loader, tags=("spots",))
+
+- younger than `ttl`: served from memory;
+- older than `ttl` but younger than `ttl + stale_ttl`: served from memory
+  while one background thread re-runs `loader`;
+- older, or never loaded: loaded inline (concurrent callers for the same key
+  wait for a single load).
+
+Writes call metrics_cache.invalidate(tag) after committing; every entry
+carrying the tag is dropped, and a load that started before the
+invalidation is not stored, so the next read in this process sees the
+write. The cache is per process: the invalidation reaches the other
+workers through backend/cache_sync.py ("metrics:<tag>" counters), so their
+reads see the write from their first request more than
+CACHE_SYNC_INTERVAL seconds after it (or after ttl + stale_ttl when cache
+sync is disabled or MySQL cannot be reached for it).
+
+Loaders run outside the request context (background refresh), so they
+should use db.connect() rather than db.get_db() / current_app.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from functools import partial
+
+from backend.cache_sync import cache_sync
+
+
+class _Entry:
+    __slots__ = ("value", "loaded_at", "tags", "refreshing")
+
+    def __init__(self, value, tags):
+        self.value = value
+        self.loaded_at = time.monotonic()
+        self.tags = tags
+        self.refreshing = False
+
+
+class SWRCache:
+    def __init__(self, ttl: float = 30.0, stale_ttl: float = 300.0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.enabled = True
+        self.logger = None
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._key_locks = {}
+        self._generation = {}
+        self._epoch = 0
+        self._synced_tags = set()
+        self.hits = self.stale_hits = self.misses = 0
+
+    def init_app(self, app):
+        self.ttl = float(app.config.get("METRICS_CACHE_TTL", self.ttl))
+        self.stale_ttl = float(app.config.get("METRICS_CACHE_STALE", self.stale_ttl))
+        self.enabled = self.ttl > 0
+        self.logger = app.logger
+
+    def _generations(self, tags):
+        return (self._epoch,) + tuple(self._generation.get(t, 0) for t in tags)
+
+    def _store(self, key, value, tags, generations):
+        with self._lock:
+            if self._generations(tags) == generations:
+                self._entries[key] = _Entry(value, tags)
+            else:
+                self._entries.pop(key, None)
+
+    def _follow(self, tags):
+        """Drop entries of these tags when another worker invalidates them."""
+        with self._lock:
+            new = [t for t in tags if t not in self._synced_tags]
+            self._synced_tags.update(new)
+        for tag in new:
+            cache_sync.subscribe(f"metrics:{tag}", partial(self._drop, (tag,)))
+
+    def get(self, key, loader, tags=()):
+        tags = tuple(tags)
+        if not self.enabled:
+            return loader()
+        self._follow(tags)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry.loaded_at
+                if age < self.ttl:
+                    self.hits += 1
+                    return entry.value
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        self._refresh_in_background(key, loader, tags, self._generations(tags))
+                    return entry.value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+                    self.hits += 1  # loaded by the caller we waited on
+                    return entry.value
+                self.misses += 1
+                generations = self._generations(tags)
+            value = loader()
+            self._store(key, value, tags, generations)
+            return value
+
+    def _refresh_in_background(self, key, loader, tags, generations):
+        def run():
+            try:
+                self._store(key, loader(), tags, generations)
+            except Exception as e:
+                # Keep serving the stale value; the next read past ttl retries.
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        entry.refreshing = False
+                if self.logger:
+                    self.logger.error(f"metrics cache refresh of {key!r} failed: {e}")
+
+        threading.Thread(target=run, name=f"swr-{key}", daemon=True).start()
+
+    def invalidate(self, *tags):
+        """Drop the tagged entries here and in every other worker (call after commit)."""
+        self._drop(tags)
+        cache_sync.publish(*(f"metrics:{tag}" for tag in tags))
+
+    def _drop(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generation[tag] = self._generation.get(tag, 0) + 1
+            for key in [k for k, e in self._entries.items() if set(e.tags) & set(tags)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "stale_hits": self.stale_hits, "misses": self.misses}
+
+
+metrics_cache = SWRCache()
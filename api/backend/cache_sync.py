@@ -0,0 +1,145 @@
+"""
+Cross-worker invalidation for the in-process caches.
+
+Each worker process (SERVER_MODE=production runs several) keeps its own
+spot index, price snapshot and metrics cache, so a write answered by one
+worker used to reach the others only when their copies expired. The
+CacheVersion table holds one counter per cache name:
+
+    cache_sync.publish("spots")            # after commit: bump the counter
+    cache_sync.subscribe("spots", fn)      # fn() runs when another process bumped it
+
+Before a request is handled, poll() reads the counters (one primary key
+scan, at most every CACHE_SYNC_INTERVAL seconds per process) and calls the
+subscribers of every name whose counter moved. A write is therefore seen by
+every worker from its first request more than CACHE_SYNC_INTERVAL seconds
+after the commit; the TTLs of the caches remain as a backstop for writes
+made outside the API.
+
+A process's own bumps do not trigger its subscribers (it has already
+applied the change locally). Counters are read and written on separate
+pooled connections, so publish() can be called from any thread.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict
+
+from backend.db_connection import db
+
+DEFAULT_INTERVAL = 1.0
+
+CACHE_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS CacheVersion (
+  name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+)
+"""
+
+
+class CacheSync:
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.enabled = True
+        self.interval = interval
+        self.logger = None
+        self._lock = threading.Lock()
+        self._seen = {}              # name -> counter value this process has applied
+        self._primed = False
+        self._checked_at = 0.0
+        self._warned = False
+        self._subscribers = defaultdict(list)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("CACHE_SYNC_ENABLED", True))
+        self.interval = float(app.config.get("CACHE_SYNC_INTERVAL", self.interval))
+        self.logger = app.logger
+        if not self.enabled:
+            return
+        # Record the current counters before the caches load (and before
+        # gunicorn forks), so only later writes count as changes.
+        self._read(prime=True)
+        app.before_request(self.poll)
+
+    def subscribe(self, name, callback):
+        with self._lock:
+            self._subscribers[name].append(callback)
+
+    def _warn(self, message):
+        if self.logger and not self._warned:
+            self.logger.warning(message)
+        self._warned = True
+
+    def _read(self, prime=False):
+        """Apply the counters from MySQL; returns the names that moved since the last read."""
+        try:
+            conn = db.connect()
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT name, version FROM CacheVersion")
+                versions = {r["name"]: r["version"] for r in cur.fetchall()}
+            finally:
+                cur.close()
+                conn.close()
+        except Exception as e:
+            self._warn(f"cache sync unavailable, other workers' writes show up on cache expiry: {e}")
+            return []
+        self._warned = False
+        with self._lock:
+            if not self._primed:
+                # counters unknown when the caches loaded: anything may have changed
+                changed = set() if prime else set(self._subscribers)
+                self._primed = True
+            else:
+                changed = {name for name, v in versions.items() if self._seen.get(name, 0) != v}
+            self._seen.update(versions)
+            return sorted(changed)
+
+    def poll(self):
+        """before_request hook: run the subscribers of caches changed by other processes."""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.interval:
+                return
+            self._checked_at = now
+        for name in self._read():
+            for callback in list(self._subscribers.get(name, ())):
+                try:
+                    callback()
+                except Exception as e:
+                    if self.logger:
+                        self.logger.error(f"cache sync: {name} invalidation failed: {e}")
+
+    def publish(self, *names):
+        """Bump the counters of the named caches (call after the write committed)."""
+        if not self.enabled or not names:
+            return
+        try:
+            conn = db.connect()
+            cur = conn.cursor()
+            try:
+                bumped = {}
+                for name in sorted(set(names)):
+                    cur.execute(
+                        "INSERT INTO CacheVersion (name, version) VALUES (%s, 1) "
+                        "ON DUPLICATE KEY UPDATE version = LAST_INSERT_ID(version + 1)",
+                        (name,),
+                    )
+                    bumped[name] = 1 if cur.rowcount == 1 else cur.lastrowid
+                conn.commit()
+            finally:
+                cur.close()
+                conn.close()
+        except Exception as e:
+            # Never fail the write because of the cache; the TTLs still apply.
+            self._warn(f"cache sync publish of {', '.join(names)} failed: {e}")
+            return
+        with self._lock:
+            for name, version in bumped.items():
+                if self._seen.get(name, 0) == version - 1:
+                    self._seen[name] = version  # nobody else wrote in between
+
+
+cache_sync = CacheSync()
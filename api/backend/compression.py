@@ -0,0 +1,65 @@
+"""
+Negotiated response compression (after_request).
+
+JSON / text / CSV responses of at least COMPRESS_MIN_SIZE bytes are
+compressed with brotli (client accepts "br"; the `brotli` package is pinned
+in requirements.txt, and without it only gzip is offered) or gzip,
+following the request's Accept-Encoding.
+Streamed responses (the /export endpoints) are left alone: they compress
+themselves on the fly.
+"""
+from __future__ import annotations
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "text/")
+
+settings = {"enabled": True, "min_size": 1024, "level": 6, "br_quality": 4}
+
+
+def compress(data: bytes, coding: str) -> bytes:
+    if coding == "br":
+        if brotli is None:
+            raise RuntimeError("brotli is not installed (pip install -r requirements.txt)")
+        return brotli.compress(data, quality=settings["br_quality"])
+    return gzip.compress(data, compresslevel=settings["level"])
+
+
+def _encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def _compress_response(response):
+    if (not settings["enabled"]
+            or response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE)):
+        return response
+    response.vary.add("Accept-Encoding")
+    if response.content_length is not None and response.content_length < settings["min_size"]:
+        return response
+    coding = request.accept_encodings.best_match(_encodings())
+    if coding is None:
+        return response
+    data = response.get_data()
+    if len(data) < settings["min_size"]:
+        return response
+    response.set_data(compress(data, coding))
+    response.headers["Content-Encoding"] = coding
+    return response
+
+
+def init_app(app):
+    settings["enabled"] = bool(app.config.get("COMPRESS_ENABLED", True))
+    settings["min_size"] = int(app.config.get("COMPRESS_MIN_SIZE", settings["min_size"]))
+    settings["level"] = int(app.config.get("COMPRESS_LEVEL", settings["level"]))
+    settings["br_quality"] = int(app.config.get("COMPRESS_BR_QUALITY", settings["br_quality"]))
+    app.after_request(_compress_response)
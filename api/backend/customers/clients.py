@@ -0,0 +1,85 @@
+"""
+Per-client order statistics for the owner and sales pages
+(/owner/clients/top, /salesman/clients/repeat).
+
+One SQL statement aggregates the period's orders per customer (order count,
+spend, last order date and its total) with the customer's name joined in,
+so the pages no longer download raw orders and look each client up
+separately. Results are cached in metrics_cache under the orders/customers
+tags.
+"""
+from __future__ import annotations
+
+from backend.cache import metrics_cache
+from backend.db_connection import db
+
+SORTS = {
+    "spend": "spend DESC, orders DESC, r.cID",
+    "orders": "orders DESC, spend DESC, r.cID",
+    "recent": "last_order_date DESC, r.cID",
+}
+
+_CLIENT_STATS_SQL = """
+SELECT r.cID, r.orders, r.spend, r.date AS last_order_date, r.total AS last_total,
+       c.fName, c.lName, c.companyName, c.email, c.VIP
+FROM (
+    SELECT cID, date, total,
+           ROW_NUMBER() OVER (PARTITION BY cID ORDER BY date DESC, orderID DESC) AS rn,
+           COUNT(*) OVER (PARTITION BY cID) AS orders,
+           COALESCE(SUM(total) OVER (PARTITION BY cID), 0) AS spend
+    FROM Orders
+    WHERE date >= CURDATE() - INTERVAL %s DAY AND cID IS NOT NULL
+) r
+JOIN Customers c ON c.cID = r.cID
+WHERE r.rn = 1 AND r.orders >= %s
+ORDER BY {order_by}
+LIMIT %s
+"""
+
+
+def period_days(raw, default: int) -> int:
+    """'90d' / '90' -> 90; anything else -> default."""
+    raw = (raw or "").strip().lower().rstrip("d")
+    try:
+        return max(1, int(raw)) if raw else default
+    except ValueError:
+        return default
+
+
+def display_name(row) -> str:
+    name = f"{row.get('fName') or ''} {row.get('lName') or ''}".strip()
+    company = row.get("companyName")
+    if company:
+        return f"{name} ({company})" if name else company
+    return name or f"Customer {row['cID']}"
+
+
+def _load(days, min_orders, limit, sort):
+    conn = db.connect()
+    cur = conn.cursor()
+    try:
+        cur.execute(_CLIENT_STATS_SQL.format(order_by=SORTS[sort]), (days, min_orders, limit))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+    return [
+        {
+            "cID": r["cID"],
+            "customer": display_name(r),
+            "email": r["email"],
+            "VIP": bool(r["VIP"]),
+            "orders": int(r["orders"]),
+            "spend": int(r["spend"]),
+            "last_order_date": str(r["last_order_date"]) if r["last_order_date"] else None,
+            "last_total": r["last_total"],
+        }
+        for r in rows
+    ]
+
+
+def client_stats(days: int, min_orders: int = 1, limit: int = 10, sort: str = "spend"):
+    """Clients with at least `min_orders` orders in the last `days` days, best first."""
+    key = ("client_stats", days, min_orders, limit, sort)
+    return metrics_cache.get(key, lambda: _load(days, min_orders, limit, sort),
+                             tags=("orders", "customers"))
@@ -1,31 +1,22 @@
-import mysql.connector as mysql
 from flask import Blueprint, request, jsonify, current_app
-from mysql.connector import Error
+from pymysql import MySQLError as Error
 from datetime import datetime
+from backend.db_connection import db
+from backend.cache import metrics_cache
+from backend.orders.orders_routes import ORDER_STATUS_COLUMNS, ORDER_STATUS_JOINS
+from backend.pagination import CursorError, decode_cursor, keyset_predicate, page_limit, paginate
 
 # Blueprint setup
 customer = Blueprint("customer", __name__, url_prefix="/customer")
 customer.strict_slashes = False
 
 
-def _get_database_connection():
-    """Get a fresh database connection using Flask config"""
-    cfg = current_app.config
-    return mysql.connect(
-        host=cfg.get("MYSQL_DATABASE_HOST", "127.0.0.1"),
-        port=int(cfg.get("MYSQL_DATABASE_PORT", 3306)),
-        user=cfg.get("MYSQL_DATABASE_USER", "root"),
-        password=cfg.get("MYSQL_DATABASE_PASSWORD", "changeme"),
-        database=cfg.get("MYSQL_DATABASE_DB", "SpotLight"),
-    )
-
-
-def _execute_query(query, params=None, fetch_one=False, fetch_all=False, dictionary=False):
+def _execute_query(query, params=None, fetch_one=False, fetch_all=False, dictionary=True):
     """Execute a database query with consistent error handling and connection management"""
     connection = None
     cursor = None
     try:
-        connection = _get_database_connection()
+        connection = db.connect()
         cursor = connection.cursor(dictionary=dictionary)
         cursor.execute(query, params or ())
         
@@ -113,6 +104,7 @@ def update_customer(c_id: int):
         if error:
             return jsonify({"error": error}), 500
         
+        metrics_cache.invalidate("customers")
         return jsonify({"message": "updated", "cID": c_id}), 200
         
     except (ValueError, TypeError) as e:
@@ -132,52 +124,76 @@ def delete_customer(c_id: int):
     if error:
         return jsonify({"error": error}), 500
     
+    metrics_cache.invalidate("customers")
     return jsonify({"deleted": c_id, "rows_affected": rows_affected}), 200
 
 
 @customer.route("/", methods=["GET"])
 def list_customers():
-    """List customers with optional search functionality"""
+    """
+    List customers with optional search functionality.
+    Optional: cursor=<next_cursor> (empty for the first page) & limit=
+    for keyset pagination over cID; returns {data, next_cursor}.
+    """
     search_term = (request.args.get("q") or "").strip()
-    
+    where = []
+    params = []
+
     if search_term:
-        query = """
-            SELECT cID, fName, lName, email, TEL
-            FROM Customers
-            WHERE fName LIKE %s OR lName LIKE %s OR email LIKE %s
-            ORDER BY cID DESC
-            LIMIT 200
-        """
         like_pattern = f"%{search_term}%"
-        params = (like_pattern, like_pattern, like_pattern)
-    else:
-        query = """
-            SELECT cID, fName, lName, email, TEL 
-            FROM Customers 
-            ORDER BY cID DESC 
-            LIMIT 200
-        """
-        params = None
-    
-    result, error = _execute_query(query, params, fetch_all=True, dictionary=True)
+        where.append("(fName LIKE %s OR lName LIKE %s OR email LIKE %s)")
+        params += [like_pattern, like_pattern, like_pattern]
+
+    keyset = "cursor" in request.args
+    scope = "customers"
+    limit = 200
+    if keyset:
+        try:
+            limit = page_limit(request.args, default=200)
+            after = decode_cursor(request.args.get("cursor", ""), scope)
+        except CursorError as e:
+            return jsonify({"error": str(e)}), 400
+        if after is not None:
+            pred, pred_params = keyset_predicate(None, "cID", True, after)
+            where.append(pred)
+            params += pred_params
+
+    query = f"""
+        SELECT cID, fName, lName, email, TEL
+        FROM Customers
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY cID DESC
+        LIMIT %s
+    """
+    params.append(limit + 1 if keyset else limit)
+
+    result, error = _execute_query(query, tuple(params), fetch_all=True, dictionary=True)
     
     if error:
         return jsonify({"error": error}), 500
-    
+
+    if keyset:
+        return jsonify(paginate(result, limit, scope, lambda r: [r["cID"]])), 200
     return jsonify(result), 200
 
 
 @customer.route("/<int:c_id>/orders", methods=["GET"])
 def list_customer_orders(c_id: int):
-    """List recent orders for a specific customer"""
-    query = """
-        SELECT o.*
+    """
+    List recent orders for a specific customer.
+    Optional: with_status=1 adds paymentStatus (PAID/UNPAID/UNKNOWN),
+    queueStatus and processTime for just these orders.
+    """
+    with_status = request.args.get("with_status", "").lower() in ("1", "true", "yes")
+    query = f"""
+        SELECT o.*{", " + ORDER_STATUS_COLUMNS if with_status else ""}
         FROM Orders o
+        {ORDER_STATUS_JOINS if with_status else ""}
         WHERE o.cID = %s
         ORDER BY o.orderID DESC
         LIMIT 100
     """
-    
+
     result, error = _execute_query(query, (c_id,), fetch_all=True, dictionary=True)
     
     if error:
@@ -202,18 +218,27 @@ def add_funds(c_id: int):
     except Exception:
         return jsonify({"error": "Invalid amount"}), 400
 
-    # Increment balance in a single atomic statement
-    upd_sql = "UPDATE Customers SET balance = COALESCE(balance, 0) + %s WHERE cID = %s"
-    updated_rows, err = _execute_query(upd_sql, (amount, c_id))
-    if err:
-        return jsonify({"error": err}), 500
-    if not updated_rows:
-        return jsonify({"error": "Customer not found"}), 404
-
-    # Return the new balance
-    sel_sql = "SELECT cID, balance FROM Customers WHERE cID = %s"
-    row, err = _execute_query(sel_sql, (c_id,), fetch_one=True, dictionary=True)
-    if err:
-        return jsonify({"error": err}), 500
+    # Increment and read back the balance on one pooled connection
+    connection = cursor = None
+    try:
+        connection = db.connect()
+        cursor = connection.cursor()
+        cursor.execute(
+            "UPDATE Customers SET balance = COALESCE(balance, 0) + %s WHERE cID = %s",
+            (amount, c_id),
+        )
+        if not cursor.rowcount:
+            return jsonify({"error": "Customer not found"}), 404
+        cursor.execute("SELECT cID, balance FROM Customers WHERE cID = %s", (c_id,))
+        row = cursor.fetchone()
+        connection.commit()
+    except Error as e:
+        current_app.logger.error(f"add_funds error: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
 
     return jsonify({"cID": row["cID"], "balance": row.get("balance", 0)}), 200
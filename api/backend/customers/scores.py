@@ -0,0 +1,109 @@
+"""
+RFM (recency / frequency / monetary) customer scores for /owner/customers/scores.
+
+One query loads, for every customer with orders in the period, the days
+since their last order, the number of orders and the spend into NumPy
+arrays. Each feature is turned into a percentile rank (ties share their
+average rank; fewer days since the last order ranks higher), and from those:
+  r/f/m_score  quintile 1..5 per feature ("rfm" = e.g. "545")
+  score        0..100 weighted blend of the percentiles (SCORE_WEIGHTS)
+  category     Low / Med / High / VIP by score (CATEGORY_BINS)
+  suggest_vip  score >= VIP_THRESHOLD and not VIP yet
+Results are cached per period under the orders/customers tags.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from backend.cache import metrics_cache
+from backend.customers.clients import display_name
+from backend.db_connection import db
+
+SCORE_WEIGHTS = {"recency": 0.2, "frequency": 0.3, "monetary": 0.5}
+CATEGORY_BINS = [(90, "VIP"), (70, "High"), (40, "Med")]
+VIP_THRESHOLD = 90
+
+_FEATURES_SQL = (
+    "SELECT o.cID, DATEDIFF(CURDATE(), MAX(o.date)) AS recency_days, COUNT(*) AS orders, "
+    "COALESCE(SUM(o.total), 0) AS spend, c.fName, c.lName, c.companyName, c.VIP "
+    "FROM Orders o JOIN Customers c ON c.cID = o.cID "
+    "WHERE o.date >= CURDATE() - INTERVAL %s DAY "
+    "GROUP BY o.cID, c.fName, c.lName, c.companyName, c.VIP"
+)
+
+
+def percentile_rank(x: np.ndarray) -> np.ndarray:
+    """Average-rank percentile in (0, 1]; equal values get equal ranks."""
+    n = len(x)
+    if n == 0:
+        return np.zeros(0)
+    ranks = np.empty(n, dtype=np.float64)
+    ranks[np.argsort(x, kind="mergesort")] = np.arange(1, n + 1)
+    _, inverse, counts = np.unique(x, return_inverse=True, return_counts=True)
+    avg = np.bincount(inverse, weights=ranks) / counts
+    return avg[inverse] / n
+
+
+def _quintile(p):
+    return np.clip(np.ceil(p * 5), 1, 5).astype(np.int8)
+
+
+def score_features(recency_days, orders, spend):
+    """Vectorized RFM scoring; returns a dict of arrays aligned with the inputs."""
+    pr = percentile_rank(-np.asarray(recency_days, dtype=np.float64))
+    pf = percentile_rank(np.asarray(orders, dtype=np.float64))
+    pm = percentile_rank(np.asarray(spend, dtype=np.float64))
+    score = 100 * (SCORE_WEIGHTS["recency"] * pr + SCORE_WEIGHTS["frequency"] * pf
+                   + SCORE_WEIGHTS["monetary"] * pm)
+    category = np.select([score >= lo for lo, _ in CATEGORY_BINS],
+                         [name for _, name in CATEGORY_BINS], default="Low")
+    return {
+        "r_score": _quintile(pr), "f_score": _quintile(pf), "m_score": _quintile(pm),
+        "score": np.round(score, 1), "category": category,
+    }
+
+
+def _load(days):
+    conn = db.connect()
+    cur = conn.cursor()
+    try:
+        cur.execute(_FEATURES_SQL, (days,))
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+    if not rows:
+        return []
+
+    recency = np.fromiter((r["recency_days"] for r in rows), dtype=np.float64, count=len(rows))
+    orders = np.fromiter((r["orders"] for r in rows), dtype=np.int64, count=len(rows))
+    spend = np.fromiter((r["spend"] for r in rows), dtype=np.float64, count=len(rows))
+    vip = np.fromiter((bool(r["VIP"]) for r in rows), dtype=bool, count=len(rows))
+    s = score_features(recency, orders, spend)
+    suggest = (s["score"] >= VIP_THRESHOLD) & ~vip
+
+    out = [
+        {
+            "cID": r["cID"],
+            "customer": display_name(r),
+            "VIP": bool(vip[i]),
+            "recency_days": int(recency[i]),
+            f"orders_{days}d": int(orders[i]),
+            f"spend_{days}d": int(spend[i]),
+            "r_score": int(s["r_score"][i]),
+            "f_score": int(s["f_score"][i]),
+            "m_score": int(s["m_score"][i]),
+            "rfm": f"{s['r_score'][i]}{s['f_score'][i]}{s['m_score'][i]}",
+            "score": float(s["score"][i]),
+            "category": str(s["category"][i]),
+            "suggest_vip": bool(suggest[i]),
+        }
+        for i, r in enumerate(rows)
+    ]
+    out.sort(key=lambda d: (-d["score"], d["cID"]))
+    return out
+
+
+def customer_scores(days: int):
+    return metrics_cache.get(("customer_scores", days), lambda: _load(days),
+                             tags=("orders", "customers"))
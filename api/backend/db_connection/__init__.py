@@ -1,10 +1,9 @@
 #------------------------------------------------------------
 # This file creates a shared DB connection resource
 #------------------------------------------------------------
-from flaskext.mysql import MySQL
-from pymysql import cursors
+from backend.db_connection.pool import ConnectionPool, PooledConnection, PoolTimeout, PooledMySQL, per_worker_limits
 
 
-# the parameter instructs the connection to return data
-# as a dictionary object.
-db = MySQL(cursorclass=cursors.DictCursor)
\ No newline at end of file
+# One pool per worker process. Connections hand out DictCursors by default
+# so every blueprint gets rows back as dictionaries.
+db = PooledMySQL()
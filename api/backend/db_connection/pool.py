@@ -0,0 +1,329 @@
+#------------------------------------------------------------
+# Pooled PyMySQL connections shared by every blueprint
+#------------------------------------------------------------
+import os
+import threading
+import time
+from collections import deque
+
+import pymysql
+from flask import g
+from pymysql import cursors
+
+
+class PoolTimeout(pymysql.err.OperationalError):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a raw PyMySQL connection, one per checkout.
+    close() hands the connection back to the pool instead of closing the socket,
+    so existing `conn.close()` / `_close(cursor, conn)` code keeps working.
+    After close() the wrapper is detached: a stale reference (a second close(),
+    or g._pooled_db after a route closed it early) can no longer reach the
+    socket, which by then may belong to another request.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self.created_at = created_at
+        self.last_used = time.monotonic()
+        self.closed = False
+
+    def _live(self):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError(0, "connection was already returned to the pool")
+        return self._raw
+
+    def cursor(self, dictionary=True, unbuffered=False):
+        """
+        Rows come back as dicts by default; pass dictionary=False for tuples.
+        unbuffered=True streams rows from the server as they are fetched
+        instead of loading the whole result set into memory on execute().
+        """
+        if unbuffered:
+            return self._live().cursor(cursors.SSDictCursor if dictionary else cursors.SSCursor)
+        return self._live().cursor(cursors.DictCursor if dictionary else cursors.Cursor)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        raw, self._raw = self._raw, None
+        self._pool.release(_Idle(raw, self.created_at))
+
+    def discard(self):
+        """
+        Close the socket instead of pooling it, e.g. when an unbuffered query
+        is abandoned halfway (pooling it would first drain the remaining rows).
+        """
+        if self.closed:
+            return
+        self.closed = True
+        raw, self._raw = self._raw, None
+        self._pool._discard(_Idle(raw, self.created_at))
+
+    def __getattr__(self, name):
+        # commit, rollback, ping, begin, ... go straight to the raw connection
+        return getattr(self._live(), name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Idle:
+    """A pooled raw connection between checkouts."""
+    __slots__ = ("_raw", "created_at", "last_used")
+
+    def __init__(self, raw, created_at):
+        self._raw = raw
+        self.created_at = created_at
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of PyMySQL connections for one worker process.
+
+    - pool_size idle connections are kept around; up to max_overflow extra ones
+      are opened under bursts and closed again when returned.
+    - connections idle for longer than ping_interval seconds are pinged on
+      checkout and replaced if the server went away.
+    - connections older than recycle seconds are closed and reopened.
+    """
+
+    def __init__(self, connect_kwargs, pool_size=5, max_overflow=5, timeout=10.0,
+                 recycle=1800, ping_interval=30):
+        self._connect_kwargs = dict(connect_kwargs)
+        self.pool_size = max(1, int(pool_size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.timeout = float(timeout)
+        self.recycle = float(recycle)
+        self.ping_interval = float(ping_interval)
+
+        self._lock = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        # Called at construction and again after fork: sockets are never shared
+        # between worker processes.
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._open = 0
+        self._stats = {
+            "created": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "discarded": 0,
+        }
+
+    # ------------------------- internals -------------------------
+
+    def _bump(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _new_raw(self):
+        raw = pymysql.connect(cursorclass=cursors.DictCursor, **self._connect_kwargs)
+        self._bump("created")
+        return raw
+
+    @staticmethod
+    def _close_raw(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _discard(self, conn):
+        with self._lock:
+            self._open -= 1
+            self._stats["discarded"] += 1
+            self._lock.notify()
+        self._close_raw(conn._raw)
+
+    def _is_usable(self, conn):
+        now = time.monotonic()
+        if self.recycle > 0 and now - conn.created_at > self.recycle:
+            self._bump("recycled")
+            return False
+        if self.ping_interval >= 0 and now - conn.last_used > self.ping_interval:
+            try:
+                conn._raw.ping(reconnect=False)
+            except Exception:
+                self._bump("ping_failures")
+                return False
+        return True
+
+    # ------------------------- public API -------------------------
+
+    def connect(self):
+        """Check out a healthy connection, waiting up to `timeout` seconds."""
+        if os.getpid() != self._pid:
+            with self._lock:
+                if os.getpid() != self._pid:
+                    self._reset()
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            with self._lock:
+                while not self._idle and self._open >= self.pool_size + self.max_overflow:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            2013, f"timed out after {self.timeout}s waiting for a pooled connection"
+                        )
+                    self._stats["waits"] += 1
+                    self._lock.wait(remaining)
+                if self._idle:
+                    conn = self._idle.pop()
+                else:
+                    self._open += 1
+
+            if conn is not None:
+                # Health check happens outside the lock so a slow ping never
+                # blocks other threads returning connections.
+                if self._is_usable(conn):
+                    self._bump("checkouts")
+                    return PooledConnection(self, conn._raw, conn.created_at)
+                self._discard(conn)
+                continue
+
+            try:
+                raw = self._new_raw()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+            self._bump("checkouts")
+            return PooledConnection(self, raw, time.monotonic())
+
+    def release(self, conn):
+        """Return a connection (an _Idle record); any open transaction is rolled back first."""
+        keep = os.getpid() == self._pid
+        if keep:
+            try:
+                conn._raw.rollback()
+            except Exception:
+                keep = False
+        with self._lock:
+            if keep and len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                self._lock.notify()
+                return
+        self._discard(conn)
+
+    def close_all(self):
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                self._open -= 1
+                self._close_raw(conn._raw)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats)
+            out.update({
+                "pid": self._pid,
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+            })
+            return out
+
+
+def per_worker_limits(pool_size, max_overflow, workers=1, max_connections=None):
+    """
+    (pool_size, max_overflow) for one worker process so that all `workers`
+    together stay within `max_connections` (MySQL's limit, or the share of
+    it this API may use). Overflow is given up before idle pool slots.
+    """
+    pool_size, max_overflow = max(1, int(pool_size)), max(0, int(max_overflow))
+    if not max_connections:
+        return pool_size, max_overflow
+    share = max(1, int(max_connections) // max(1, int(workers)))
+    pool_size = min(pool_size, share)
+    return pool_size, min(max_overflow, share - pool_size)
+
+
+class PooledMySQL:
+    """
+    Flask extension exposing the pool with the same surface the blueprints used
+    from flaskext.mysql:
+      db.connect()  -> a connection the caller closes (returned to the pool)
+      db.get_db()   -> a request-scoped connection released on teardown
+    db.connect() does not need an app context, so worker threads can use it.
+    """
+
+    def __init__(self):
+        self.pool = None
+
+    def init_app(self, app):
+        cfg = app.config
+        # One pool per worker process: under the multi-worker server the
+        # connection budget is split between the workers.
+        workers = int(cfg.get("SERVER_WORKERS") or 1)
+        pool_size, max_overflow = per_worker_limits(
+            cfg.get("DB_POOL_SIZE", 5), cfg.get("DB_POOL_MAX_OVERFLOW", 5),
+            workers, cfg.get("DB_MAX_CONNECTIONS"),
+        )
+        if (pool_size, max_overflow) != (cfg.get("DB_POOL_SIZE", 5), cfg.get("DB_POOL_MAX_OVERFLOW", 5)):
+            app.logger.info("DB pool per worker capped to %s+%s (%s workers, DB_MAX_CONNECTIONS=%s)",
+                            pool_size, max_overflow, workers, cfg.get("DB_MAX_CONNECTIONS"))
+        self.pool = ConnectionPool(
+            {
+                "host": cfg.get("MYSQL_DATABASE_HOST", "127.0.0.1"),
+                "port": int(cfg.get("MYSQL_DATABASE_PORT", 3306)),
+                "user": cfg.get("MYSQL_DATABASE_USER", "root"),
+                "password": cfg.get("MYSQL_DATABASE_PASSWORD", "changeme"),
+                "database": cfg.get("MYSQL_DATABASE_DB", "SpotLight"),
+                "charset": cfg.get("MYSQL_DATABASE_CHARSET", "utf8mb4"),
+                "connect_timeout": int(cfg.get("DB_CONNECT_TIMEOUT", 10)),
+                "autocommit": False,
+            },
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            timeout=cfg.get("DB_POOL_TIMEOUT", 10),
+            recycle=cfg.get("DB_POOL_RECYCLE", 1800),
+            ping_interval=cfg.get("DB_POOL_PING_INTERVAL", 30),
+        )
+        app.teardown_appcontext(self._teardown)
+
+    def connect(self):
+        if self.pool is None:
+            raise RuntimeError("db.init_app(app) has not been called")
+        return self.pool.connect()
+
+    def get_db(self):
+        conn = g.get("_pooled_db")
+        if conn is None or conn.closed:
+            conn = self.connect()
+            g._pooled_db = conn
+        return conn
+
+    def close_all(self):
+        """Close idle connections (the production server's master does this before forking workers)."""
+        if self.pool is not None:
+            self.pool.close_all()
+
+    def stats(self):
+        return self.pool.stats() if self.pool else {}
+
+    @staticmethod
+    def _teardown(exception):
+        conn = g.pop("_pooled_db", None)
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,218 @@
+"""
+Streaming exports for analysts:
+
+    GET /export/spots.csv       GET /export/spots.ndjson
+    GET /export/customers.csv   GET /export/customers.ndjson
+    GET /export/orders.csv      GET /export/orders.ndjson
+
+Rows are read through an unbuffered (server-side) cursor and written to the
+response by a generator, FETCH_ROWS at a time, so memory stays flat however
+many rows are exported. Optional filters:
+
+    status=free,inuse            spots: Spot.status; orders: PAID / UNPAID / UNKNOWN
+    date_from= / date_to=        YYYY-MM-DD, inclusive; orders: date,
+                                 spots: endTimeOfCurrentOrder
+    gzip=1                       download as <name>.csv.gz / .ndjson.gz
+
+Without gzip=1 the body is still gzip-encoded on the fly (Content-Encoding)
+when the client sends Accept-Encoding: gzip.
+"""
+import csv
+import io
+import zlib
+from datetime import date, datetime
+
+from flask import Blueprint, Response, request, jsonify, current_app
+from pymysql import MySQLError as Error
+
+from backend.db_connection import db
+from backend.json_provider import dumps_bytes
+from backend.orders.orders_routes import ORDER_STATUS_COLUMNS, ORDER_STATUS_JOINS
+
+export = Blueprint("export", __name__, url_prefix="/export")
+
+FETCH_ROWS = 1000
+GZIP_LEVEL = 6
+# the server waits on us while we wait on the client; give slow downloads time
+# (harmless for the buffered queries the pooled connection runs afterwards)
+NET_WRITE_TIMEOUT = 600
+
+SPOT_STATUSES = ("free", "inuse", "w.issue", "planned")
+ORDER_STATUSES = {
+    "UNPAID": "t.orderID IS NOT NULL",
+    "PAID": "t.orderID IS NULL AND p.orderID IS NOT NULL",
+    "UNKNOWN": "t.orderID IS NULL AND p.orderID IS NULL",
+}
+
+# select, date column (None: no date filter), ORDER BY
+ENTITIES = {
+    "spots": (
+        "SELECT spotID, address, status, price, estViewPerMonth, monthlyRentCost, "
+        "endTimeOfCurrentOrder, region, latitude, longitude, contactTel FROM Spot",
+        "endTimeOfCurrentOrder", "spotID",
+    ),
+    "customers": (
+        "SELECT cID, fName, lName, email, position, companyName, totalOrderTimes, VIP, balance, TEL "
+        "FROM Customers",
+        None, "cID",
+    ),
+    "orders": (
+        f"SELECT o.orderID, o.date, o.total, o.cID, {ORDER_STATUS_COLUMNS} FROM Orders o {ORDER_STATUS_JOINS}",
+        "o.date", "o.date, o.orderID",
+    ),
+}
+
+MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _parse_date(name):
+    raw = request.args.get(name)
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD")
+
+
+def _build_query(entity):
+    """SELECT + params for the entity and the request's filters; raises ValueError."""
+    sql, date_col, order_by = ENTITIES[entity]
+    where, params = [], []
+
+    statuses = [s.strip() for s in (request.args.get("status") or "").split(",") if s.strip()]
+    if statuses:
+        if entity == "spots":
+            bad = [s for s in statuses if s not in SPOT_STATUSES]
+            if bad:
+                raise ValueError(f"status must be among: {', '.join(SPOT_STATUSES)}")
+            where.append(f"status IN ({','.join(['%s'] * len(statuses))})")
+            params.extend(statuses)
+        elif entity == "orders":
+            statuses = [s.upper() for s in statuses]
+            bad = [s for s in statuses if s not in ORDER_STATUSES]
+            if bad:
+                raise ValueError(f"status must be among: {', '.join(ORDER_STATUSES)}")
+            where.append("(" + " OR ".join(f"({ORDER_STATUSES[s]})" for s in statuses) + ")")
+        else:
+            raise ValueError(f"{entity} cannot be filtered by status")
+
+    date_from, date_to = _parse_date("date_from"), _parse_date("date_to")
+    if date_from or date_to:
+        if date_col is None:
+            raise ValueError(f"{entity} cannot be filtered by date")
+        if date_from:
+            where.append(f"{date_col} >= %s")
+            params.append(date_from)
+        if date_to:
+            where.append(f"{date_col} <= %s")
+            params.append(date_to)
+
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return f"{sql} ORDER BY {order_by}", tuple(params)
+
+
+def _csv_chunks(columns, batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def _ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield b"".join(dumps_bytes(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def _gzipped(chunks):
+    z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+class _RowStream:
+    """
+    Response body yielding the encoded rows. The WSGI server calls close()
+    when the response is done, including when the body is never iterated
+    (HEAD) or the client disconnects halfway; the connection goes back to
+    the pool only if every row was read, otherwise it is discarded so the
+    rest of the result is not drained.
+    """
+
+    def __init__(self, conn, cur, fmt, compress, logger, label):
+        self.conn, self.cur = conn, cur
+        self.fmt, self.compress = fmt, compress
+        self.logger, self.label = logger, label
+        self.finished = False
+        self.rows_sent = 0
+
+    def _batches(self):
+        while True:
+            rows = self.cur.fetchmany(FETCH_ROWS)
+            if not rows:
+                return
+            self.rows_sent += len(rows)
+            yield rows
+
+    def __iter__(self):
+        try:
+            columns = [d[0] for d in self.cur.description]
+            chunks = (_csv_chunks if self.fmt == "csv" else _ndjson_chunks)(columns, self._batches())
+            yield from (_gzipped(chunks) if self.compress else chunks)
+            self.finished = True
+        except Exception as e:
+            self.logger.error(f"{self.label} failed after {self.rows_sent} rows: {e}")
+            raise
+
+    def close(self):
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        if self.finished:
+            self.cur.close()
+            conn.close()
+        else:
+            conn.discard()
+
+
+@export.route("/<any(spots, customers, orders):entity>.<any(csv, ndjson):fmt>", methods=["GET"])
+def export_entity(entity, fmt):
+    """Stream every row of the entity as CSV or NDJSON (see module docstring for filters)."""
+    try:
+        sql, params = _build_query(entity)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    download = request.args.get("gzip") in ("1", "true", "yes")
+    encode = not download and "gzip" in request.headers.get("Accept-Encoding", "")
+
+    conn = None
+    try:
+        conn = db.connect()
+        setup = conn.cursor()
+        setup.execute("SET SESSION net_write_timeout = %s", (NET_WRITE_TIMEOUT,))
+        setup.close()
+        cur = conn.cursor(dictionary=False, unbuffered=True)
+        cur.execute(sql, params)
+    except Error as e:
+        current_app.logger.error(f"export {entity}.{fmt} error: {e}")
+        if conn is not None:
+            conn.discard()
+        return jsonify({"error": str(e)}), 500
+
+    filename = f"{entity}-{date.today():%Y%m%d}.{fmt}" + (".gz" if download else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Vary": "Accept-Encoding"}
+    if encode:
+        headers["Content-Encoding"] = "gzip"
+    body = _RowStream(conn, cur, fmt, download or encode, current_app.logger, f"export {entity}.{fmt}")
+    return Response(body, mimetype="application/gzip" if download else MIMETYPES[fmt], headers=headers)
@@ -0,0 +1,69 @@
+"""
+Run independent read queries concurrently under one latency budget.
+
+Each task is a callable that opens its own pooled connection (db.connect()
+works outside the request context) and returns a result. fan_out() waits at
+most `budget_s` seconds overall; tasks still running then are reported as
+timed out and the caller answers with whatever finished. Queries should also
+carry a MAX_EXECUTION_TIME hint (see max_time_hint) so MySQL stops working on
+a result nobody is waiting for.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def init_app(app):
+    """Size the shared executor from FANOUT_WORKERS (default: the DB pool size)."""
+    global _executor
+    workers = int(app.config.get("FANOUT_WORKERS") or app.config.get("DB_POOL_SIZE", 5))
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fanout")
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="fanout")
+        return _executor
+
+
+def max_time_hint(budget_s: float) -> str:
+    """Optimizer hint capping a SELECT's server-side run time (MySQL >= 5.7)."""
+    return f"/*+ MAX_EXECUTION_TIME({max(1, int(budget_s * 1000))}) */"
+
+
+def fan_out(tasks: dict, budget_s: float, logger=None):
+    """
+    Run {name: callable} concurrently.
+
+    Returns (results, timed_out, errors): results maps each finished task to
+    its return value, timed_out lists the tasks still running at the
+    deadline, errors maps failed tasks to their error message.
+    """
+    executor = _get_executor()
+    futures = {executor.submit(fn): name for name, fn in tasks.items()}
+    done, pending = wait(futures, timeout=budget_s)
+
+    results, errors = {}, {}
+    for fut in done:
+        name = futures[fut]
+        try:
+            results[name] = fut.result()
+        except Exception as e:
+            if logger is not None:
+                logger.error(f"fan_out {name} error: {e}")
+            errors[name] = str(e)
+    for fut in pending:
+        fut.cancel()  # drops it if it never started; a running query ends on its own
+    timed_out = sorted(futures[f] for f in pending)
+    if timed_out and logger is not None:
+        logger.warning(f"fan_out: {', '.join(timed_out)} exceeded {budget_s:.2f}s budget")
+    return results, timed_out, errors
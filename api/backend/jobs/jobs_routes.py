@@ -0,0 +1,49 @@
+from flask import Blueprint, request, jsonify, current_app
+from pymysql import MySQLError as Error
+
+from backend.db_connection import db
+from backend.jobs.runner import job_runner
+
+jobs = Blueprint("jobs", __name__, url_prefix="/jobs")
+jobs.strict_slashes = False
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+
+@jobs.route("/<int:job_id>", methods=["GET"])
+def get_job(job_id: int):
+    """Status, progress (0..1), message, result and error of a background job."""
+    try:
+        connection = db.get_db()
+        cursor = connection.cursor()
+        job = job_runner.get(cursor, job_id)
+        connection.commit()
+        cursor.close()
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job), 200
+    except Error as e:
+        current_app.logger.error(f"get_job error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@jobs.route("/", methods=["GET"])
+def list_jobs():
+    """Recent jobs, newest first. Optional: status, kind, limit (default 50, max 500)."""
+    status = request.args.get("status")
+    if status and status not in JOB_STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(JOB_STATUSES)}"}), 400
+    try:
+        limit = max(1, min(500, int(request.args.get("limit", 50))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        connection = db.get_db()
+        cursor = connection.cursor()
+        rows = job_runner.recent(cursor, limit, status, request.args.get("kind"))
+        connection.commit()
+        cursor.close()
+        return jsonify(rows), 200
+    except Error as e:
+        current_app.logger.error(f"list_jobs error: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,346 @@
+"""
+In-process runner for long admin operations (bulk import, bulk repricing,
+retention purge / archive).
+
+    job_id = job_runner.submit("bulk_price", {...params...})
+
+inserts a Job row and returns its id at once; a worker thread (JOB_WORKERS,
+default 2) then calls the handler registered for the kind with the Job
+context and the params:
+
+    @handler("bulk_price")
+    def _bulk_price_job(job, **params):
+        ...
+        job.progress(done, total, "message")
+        return {...}              # stored as the job result (JSON)
+
+Progress, status, result and error live in the Job table, so GET /jobs/<id>
+works from every API process, not only the one running the job. While a
+job is queued or running its process refreshes heartbeat_at.
+
+Jobs run in the API worker that accepted them, and worker processes come
+and go (gunicorn recycling and reloads, see gunicorn.conf.py). Handlers
+registered with resumable=True survive that: they call
+
+    job.checkpoint({...state...})     # after each committed batch
+
+which stores the state in params["resume"] and, once the process is
+shutting down (stop()), raises JobInterrupted. The job goes back to
+'queued' and another process takes it over (resume_orphans(), run on
+GET /jobs and when a worker starts), calling the handler again with
+resume=<last checkpoint>. A resumable job whose process was killed is taken
+over the same way once its heartbeat is STALE_AFTER_SECONDS old (a kill
+between a batch commit and its checkpoint repeats that batch); other jobs
+are then marked failed.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.db_connection import db
+
+JOB_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS Job (
+  jobID INT AUTO_INCREMENT PRIMARY KEY,
+  kind VARCHAR(50) NOT NULL,
+  status ENUM('queued', 'running', 'succeeded', 'failed') NOT NULL DEFAULT 'queued',
+  params JSON,
+  progress DOUBLE NOT NULL DEFAULT 0,
+  message VARCHAR(255),
+  result JSON,
+  error TEXT,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP NULL,
+  finished_at TIMESTAMP NULL,
+  heartbeat_at TIMESTAMP NULL,
+  KEY idx_job_status (status, heartbeat_at),
+  KEY idx_job_created (created_at, jobID)
+)
+"""
+
+HEARTBEAT_SECONDS = 15
+STALE_AFTER_SECONDS = 90
+PROGRESS_INTERVAL = 0.5
+STOP_WAIT_SECONDS = 10
+
+JOB_COLUMNS = ("jobID, kind, status, params, progress, message, result, error, "
+               "created_at, started_at, finished_at")
+
+HANDLERS = {}
+RESUMABLE = set()
+
+# queued/running jobs nobody is working on: requeued (no heartbeat) or heartbeat lost
+_ORPHANED = ("status IN ('queued', 'running') "
+             "AND (heartbeat_at IS NULL OR heartbeat_at < NOW() - INTERVAL %s SECOND)")
+
+
+class JobInterrupted(Exception):
+    """Raised by Job.checkpoint() while the process shuts down; the job is requeued."""
+
+
+def handler(kind, resumable=False):
+    """
+    Register the function that runs jobs of `kind`. Resumable handlers take
+    a `resume` argument (None, or the state of their last checkpoint).
+    """
+    def register(fn):
+        HANDLERS[kind] = fn
+        if resumable:
+            RESUMABLE.add(kind)
+        return fn
+    return register
+
+
+def _dumps(value):
+    return json.dumps(value, default=str)
+
+
+class Job:
+    """What a handler sees: the job id/params and a throttled progress reporter."""
+
+    def __init__(self, job_id, kind, params, conn, stopping=None):
+        self.id, self.kind, self.params = job_id, kind, params
+        self._conn = conn
+        self._stopping = stopping
+        self._last = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        now = time.monotonic()
+        if not force and now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        fraction = min(1.0, done / total) if total else 0.0
+        cur = self._conn.cursor()
+        try:
+            cur.execute("UPDATE Job SET progress = %s, message = %s, heartbeat_at = NOW() WHERE jobID = %s",
+                        (fraction, (message or "")[:255] or None, self.id))
+            self._conn.commit()
+        finally:
+            cur.close()
+
+    def checkpoint(self, state):
+        """Record where the job can pick up again; stops here when the process is shutting down."""
+        cur = self._conn.cursor()
+        try:
+            cur.execute("UPDATE Job SET params = JSON_SET(params, '$.resume', CAST(%s AS JSON)), "
+                        "heartbeat_at = NOW() WHERE jobID = %s", (_dumps(state), self.id))
+            self._conn.commit()
+        finally:
+            cur.close()
+        self.params["resume"] = state
+        if self._stopping is not None and self._stopping.is_set():
+            raise JobInterrupted(f"job {self.id} stopped for a worker restart")
+
+
+class JobRunner:
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self.logger = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._active = set()
+        self._heartbeat = None
+        self._stopping = threading.Event()
+
+    def init_app(self, app):
+        self.logger = app.logger
+        self.workers = int(app.config.get("JOB_WORKERS", self.workers))
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="job")
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="job")
+            return self._executor
+
+    # ------------------------- submitting -------------------------
+
+    def submit(self, kind, params):
+        """Queue a job; returns its jobID."""
+        if kind not in HANDLERS:
+            raise ValueError(f"unknown job kind {kind!r}")
+        conn = db.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute("INSERT INTO Job (kind, params, heartbeat_at) VALUES (%s, %s, NOW())",
+                        (kind, _dumps(params)))
+            job_id = cur.lastrowid
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        with self._lock:
+            self._active.add(job_id)
+            self._start_heartbeat()
+        self._get_executor().submit(self._run, job_id, kind, params)
+        return job_id
+
+    def _run(self, job_id, kind, params):
+        conn = db.connect()
+        try:
+            self._update(conn, "UPDATE Job SET status = 'running', started_at = COALESCE(started_at, NOW()), "
+                               "heartbeat_at = NOW() WHERE jobID = %s", (job_id,))
+            try:
+                result = HANDLERS[kind](Job(job_id, kind, params, conn, self._stopping), **params)
+            except JobInterrupted:
+                self._update(conn, "UPDATE Job SET status = 'queued', heartbeat_at = NULL, message = %s "
+                                   "WHERE jobID = %s", ("interrupted by a worker restart, will resume", job_id))
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"job {job_id} ({kind}) failed: {e}")
+                self._update(conn, "UPDATE Job SET status = 'failed', error = %s, finished_at = NOW() "
+                                   "WHERE jobID = %s", (str(e), job_id))
+            else:
+                self._update(conn, "UPDATE Job SET status = 'succeeded', progress = 1, result = %s, "
+                                   "finished_at = NOW() WHERE jobID = %s", (_dumps(result), job_id))
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"job {job_id} ({kind}) could not be recorded: {e}")
+        finally:
+            conn.close()
+            with self._lock:
+                self._active.discard(job_id)
+
+    @staticmethod
+    def _update(conn, sql, params):
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            conn.commit()
+        finally:
+            cur.close()
+
+    # ------------------------- worker lifecycle -------------------------
+
+    def busy(self):
+        """True while this process runs jobs (gunicorn.conf.py defers recycling then)."""
+        with self._lock:
+            return bool(self._active)
+
+    def stop(self, timeout=STOP_WAIT_SECONDS):
+        """
+        Process shutdown: resumable jobs stop at their next checkpoint and are
+        requeued for another process. Waits up to `timeout` seconds; returns
+        False if jobs are still running (non-resumable ones run on until the
+        process is killed, and are then marked failed).
+        """
+        self._stopping.set()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.busy():
+                return True
+            time.sleep(0.1)
+        return not self.busy()
+
+    def resume_orphans(self):
+        """Take over resumable jobs left by a stopped or killed process; returns their ids."""
+        if self._stopping.is_set() or not RESUMABLE:
+            return []
+        kinds = sorted(RESUMABLE)
+        conn = db.connect()
+        cur = conn.cursor()
+        claimed = []
+        try:
+            cur.execute(
+                f"SELECT jobID, kind, params FROM Job WHERE {_ORPHANED} "
+                f"AND kind IN ({','.join(['%s'] * len(kinds))}) ORDER BY jobID LIMIT %s",
+                (STALE_AFTER_SECONDS, *kinds, max(1, self.workers)),
+            )
+            for row in cur.fetchall():
+                # only one process wins the row: the others no longer match _ORPHANED
+                cur.execute(f"UPDATE Job SET status = 'running', heartbeat_at = NOW() "
+                            f"WHERE jobID = %s AND {_ORPHANED}", (row["jobID"], STALE_AFTER_SECONDS))
+                if cur.rowcount:
+                    claimed.append(self._shape(row))
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+        for row in claimed:
+            if self.logger:
+                self.logger.info(f"resuming job {row['jobID']} ({row['kind']})")
+            with self._lock:
+                self._active.add(row["jobID"])
+                self._start_heartbeat()
+            self._get_executor().submit(self._run, row["jobID"], row["kind"], row["params"] or {})
+        return [row["jobID"] for row in claimed]
+
+    # ------------------------- heartbeat -------------------------
+
+    def _start_heartbeat(self):
+        if self._heartbeat is None or not self._heartbeat.is_alive():
+            self._heartbeat = threading.Thread(target=self._beat, name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            with self._lock:
+                ids = list(self._active)
+                if not ids:
+                    self._heartbeat = None
+                    return
+            try:
+                conn = db.connect()
+                try:
+                    self._update(conn, f"UPDATE Job SET heartbeat_at = NOW() WHERE jobID IN "
+                                       f"({','.join(['%s'] * len(ids))})", tuple(ids))
+                finally:
+                    conn.close()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"job heartbeat failed: {e}")
+
+    # ------------------------- reading -------------------------
+
+    def _reap(self, cur):
+        kinds = sorted(RESUMABLE) or [""]
+        cur.execute(
+            "UPDATE Job SET status = 'failed', error = 'worker stopped before the job finished', "
+            f"finished_at = NOW() WHERE {_ORPHANED} AND kind NOT IN ({','.join(['%s'] * len(kinds))})",
+            (STALE_AFTER_SECONDS, *kinds),
+        )
+        cur.connection.commit()  # before resume_orphans() claims rows on its own connection
+        try:
+            self.resume_orphans()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"resuming orphaned jobs failed: {e}")
+
+    @staticmethod
+    def _shape(row):
+        for key in ("params", "result"):
+            if isinstance(row.get(key), (str, bytes)):
+                row[key] = json.loads(row[key])
+        return row
+
+    def get(self, cursor, job_id):
+        self._reap(cursor)
+        cursor.execute(f"SELECT {JOB_COLUMNS} FROM Job WHERE jobID = %s", (job_id,))
+        row = cursor.fetchone()
+        return self._shape(row) if row else None
+
+    def recent(self, cursor, limit=50, status=None, kind=None):
+        self._reap(cursor)
+        where, params = [], []
+        if status:
+            where.append("status = %s")
+            params.append(status)
+        if kind:
+            where.append("kind = %s")
+            params.append(kind)
+        cursor.execute(
+            f"SELECT {JOB_COLUMNS} FROM Job {'WHERE ' + ' AND '.join(where) if where else ''} "
+            "ORDER BY jobID DESC LIMIT %s",
+            (*params, limit),
+        )
+        return [self._shape(r) for r in cursor.fetchall()]
+
+
+job_runner = JobRunner()
@@ -0,0 +1,327 @@
+"""
+Versioned schema migrations for databases created before a schema change.
+
+database-files/01_schema.sql always describes the current schema, so a new
+database needs no migrations; an existing one is brought up to date with
+
+    flask --app backend_app migrate            # apply pending migrations
+    flask --app backend_app migrate --check    # report only
+
+Applied versions are recorded in SchemaMigration. Every step checks
+information_schema first and skips work that is already there, so running
+a migration on a database that already has its tables/indexes (including a
+fresh one) just records it. Secondary indexes are added with
+ALGORITHM=INPLACE, LOCK=NONE so reads and writes continue during the build;
+FULLTEXT/SPATIAL indexes and generated columns need MySQL's default
+algorithm and briefly block writes.
+
+At startup init_app() compares the database with the indexes/columns the
+migrations expect and logs a warning naming what is missing (or applies the
+migrations when MIGRATE_ON_STARTUP is set).
+"""
+from __future__ import annotations
+
+import time
+
+import click
+from flask.cli import with_appcontext
+from pymysql import MySQLError
+
+from backend.cache_sync import CACHE_VERSION_DDL
+from backend.db_connection import db
+from backend.jobs.runner import JOB_TABLE_DDL
+
+# ALTER TABLE ... ALGORITHM=INPLACE/LOCK=NONE not supported for this change
+_ER_ALTER_NOT_SUPPORTED = (1845, 1846)
+
+_TRACKING_TABLE = """
+CREATE TABLE IF NOT EXISTS SchemaMigration (
+  version INT PRIMARY KEY,
+  name VARCHAR(100) NOT NULL,
+  applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  duration_ms INT
+)
+"""
+
+
+def _exists(cur, sql, params):
+    cur.execute(sql, params)
+    return cur.fetchone() is not None
+
+
+def _table_exists(cur, table):
+    return _exists(cur, "SELECT 1 FROM information_schema.tables "
+                        "WHERE table_schema = DATABASE() AND table_name = %s", (table,))
+
+
+def _column_exists(cur, table, column):
+    return _exists(cur, "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+                   (table, column))
+
+
+def _index_exists(cur, table, index):
+    return _exists(cur, "SELECT 1 FROM information_schema.statistics "
+                        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+                   (table, index))
+
+
+class AddIndex:
+    """ALTER TABLE `table` ADD <ddl> unless index `name` exists (online when possible)."""
+
+    def __init__(self, table, name, ddl, online=True):
+        self.table, self.name, self.ddl, self.online = table, name, ddl, online
+
+    def __str__(self):
+        return f"{self.table}.{self.name}"
+
+    def present(self, cur):
+        return _table_exists(cur, self.table) and _index_exists(cur, self.table, self.name)
+
+    def apply(self, conn, cur):
+        sql = f"ALTER TABLE `{self.table}` ADD {self.ddl}"
+        if self.online:
+            try:
+                cur.execute(sql + ", ALGORITHM=INPLACE, LOCK=NONE")
+                return
+            except MySQLError as e:
+                if e.args[0] not in _ER_ALTER_NOT_SUPPORTED:
+                    raise
+        cur.execute(sql)
+
+
+class AddColumn:
+    """ALTER TABLE `table` ADD COLUMN <ddl> unless the column exists."""
+
+    def __init__(self, table, column, ddl):
+        self.table, self.column, self.ddl = table, column, ddl
+
+    def __str__(self):
+        return f"{self.table}.{self.column} (column)"
+
+    def present(self, cur):
+        return _column_exists(cur, self.table, self.column)
+
+    def apply(self, conn, cur):
+        cur.execute(f"ALTER TABLE `{self.table}` ADD COLUMN {self.ddl}")
+
+
+class CreateTable:
+    def __init__(self, table, ddl):
+        self.table, self.ddl = table, ddl
+
+    def __str__(self):
+        return f"{self.table} (table)"
+
+    def present(self, cur):
+        return _table_exists(cur, self.table)
+
+    def apply(self, conn, cur):
+        cur.execute(self.ddl)
+
+
+class Run:
+    """A Python step, run every time its migration is applied (must be idempotent)."""
+    expected = False
+
+    def __init__(self, fn, description):
+        self.fn, self.description = fn, description
+
+    def __str__(self):
+        return self.description
+
+    def present(self, cur):
+        return False
+
+    def apply(self, conn, cur):
+        conn.commit()
+        self.fn(conn)
+
+
+def _dedupe_spot_order(conn):
+    """Drop NULL and duplicate SpotOrder rows so (orderID, spotID) can be the primary key."""
+    cur = conn.cursor()
+    try:
+        cur.execute("DELETE FROM SpotOrder WHERE spotID IS NULL OR orderID IS NULL")
+        cur.execute("SELECT spotID, orderID, COUNT(*) AS n FROM SpotOrder "
+                    "GROUP BY spotID, orderID HAVING n > 1")
+        for r in cur.fetchall():
+            cur.execute("DELETE FROM SpotOrder WHERE spotID = %s AND orderID = %s LIMIT %s",
+                        (r["spotID"], r["orderID"], r["n"] - 1))
+        conn.commit()
+    finally:
+        cur.close()
+
+
+def _backfill_rollups(conn):
+    from backend.orders.rollup import backfill
+    backfill(conn)
+
+
+class Migration:
+    def __init__(self, version, name, steps):
+        self.version, self.name, self.steps = version, name, steps
+
+
+MIGRATIONS = [
+    Migration(1, "spot location point", [
+        AddColumn("Spot", "location",
+                  "location POINT GENERATED ALWAYS AS (ST_SRID(POINT(COALESCE(latitude, 0), "
+                  "COALESCE(longitude, 0)), 4326)) STORED SRID 4326 NOT NULL"),
+        AddIndex("Spot", "sp_location", "SPATIAL INDEX sp_location (location)", online=False),
+    ]),
+    Migration(2, "fulltext search indexes", [
+        AddIndex("Spot", "ft_address", "FULLTEXT KEY ft_address (address)", online=False),
+        AddIndex("Customers", "ft_customer_search",
+                 "FULLTEXT KEY ft_customer_search (fName, lName, email, companyName)", online=False),
+    ]),
+    Migration(3, "keyset pagination indexes", [
+        AddIndex("Spot", "idx_spot_price", "KEY idx_spot_price (price, spotID)"),
+        AddIndex("Spot", "idx_spot_views", "KEY idx_spot_views (estViewPerMonth, spotID)"),
+        AddIndex("Spot", "idx_spot_status", "KEY idx_spot_status (status, spotID)"),
+        AddIndex("Orders", "idx_orders_date", "KEY idx_orders_date (date, orderID)"),
+        AddIndex("ProcessedOrder", "idx_processed_time", "KEY idx_processed_time (processTime, orderID)"),
+    ]),
+    Migration(4, "orders by customer", [
+        AddIndex("Orders", "idx_orders_customer_date", "KEY idx_orders_customer_date (cID, date)"),
+    ]),
+    Migration(5, "daily order rollup", [
+        CreateTable("OrderDailyRollup", """
+            CREATE TABLE IF NOT EXISTS OrderDailyRollup (
+              day DATE PRIMARY KEY,
+              orders INT NOT NULL DEFAULT 0,
+              revenue BIGINT NOT NULL DEFAULT 0,
+              customers INT NOT NULL DEFAULT 0
+            )"""),
+    ]),
+    Migration(6, "spot regions and region rollup", [
+        AddColumn("Spot", "region", "region VARCHAR(64) AFTER longitude"),
+        AddIndex("Spot", "idx_spot_region", "KEY idx_spot_region (region, status)"),
+        CreateTable("RegionDailyRollup", """
+            CREATE TABLE IF NOT EXISTS RegionDailyRollup (
+              day DATE NOT NULL,
+              region VARCHAR(64) NOT NULL,
+              orders INT NOT NULL DEFAULT 0,
+              revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+              PRIMARY KEY (day, region)
+            )"""),
+        Run(_backfill_rollups, "rebuild order/region rollups"),
+    ]),
+    Migration(7, "hot path keys", [
+        Run(_dedupe_spot_order, "remove duplicate SpotOrder rows"),
+        AddIndex("SpotOrder", "PRIMARY",
+                 "PRIMARY KEY (orderID, spotID)", online=False),
+        AddIndex("SpotOrder", "idx_spotorder_spot", "KEY idx_spotorder_spot (spotID, orderID)"),
+        AddIndex("Spot", "idx_spot_end", "KEY idx_spot_end (endTimeOfCurrentOrder)"),
+        AddIndex("Reviews", "idx_reviews_spot_updated", "KEY idx_reviews_spot_updated (spotID, lastUpdate)"),
+    ]),
+    Migration(8, "background jobs", [
+        CreateTable("Job", JOB_TABLE_DDL),
+    ]),
+    Migration(9, "report retention index", [
+        AddIndex("Report", "idx_report_date", "KEY idx_report_date (date, rID)"),
+    ]),
+    Migration(10, "cross-worker cache versions", [
+        CreateTable("CacheVersion", CACHE_VERSION_DDL),
+    ]),
+]
+
+
+def applied_versions(cur):
+    if not _table_exists(cur, "SchemaMigration"):
+        return set()
+    cur.execute("SELECT version FROM SchemaMigration")
+    return {r["version"] for r in cur.fetchall()}
+
+
+def missing_objects(cur):
+    """Expected tables/columns/indexes that are not in the database."""
+    return [str(step) for m in MIGRATIONS for step in m.steps
+            if getattr(step, "expected", True) and not step.present(cur)]
+
+
+def pending(cur):
+    done = applied_versions(cur)
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+def migrate(conn, log=print):
+    """Apply pending migrations in version order; returns the versions applied."""
+    cur = conn.cursor()
+    applied = []
+    try:
+        cur.execute(_TRACKING_TABLE)
+        for m in pending(cur):
+            started = time.perf_counter()
+            for step in m.steps:
+                if step.present(cur):
+                    continue
+                log(f"  {m.version:04d} {m.name}: {step}")
+                step.apply(conn, cur)
+            elapsed_ms = int((time.perf_counter() - started) * 1000)
+            cur.execute("INSERT INTO SchemaMigration (version, name, duration_ms) VALUES (%s, %s, %s)",
+                        (m.version, m.name, elapsed_ms))
+            conn.commit()
+            log(f"{m.version:04d} {m.name}: applied in {elapsed_ms} ms")
+            applied.append(m.version)
+    finally:
+        cur.close()
+    return applied
+
+
+def init_app(app):
+    """Warn about missing indexes/pending migrations (or apply them if MIGRATE_ON_STARTUP)."""
+    if not app.config.get("SCHEMA_CHECK_ON_STARTUP", True):
+        return
+    try:
+        conn = db.connect()
+    except Exception as e:
+        app.logger.warning(f"schema check skipped, database unavailable: {e}")
+        return
+    try:
+        if app.config.get("MIGRATE_ON_STARTUP"):
+            migrate(conn, log=app.logger.info)
+        cur = conn.cursor()
+        try:
+            missing = missing_objects(cur)
+            todo = pending(cur)
+        finally:
+            cur.close()
+        conn.commit()
+        if missing:
+            app.logger.warning(
+                "schema: %s expected index(es)/column(s) missing: %s - run `flask --app backend_app migrate`",
+                len(missing), ", ".join(missing),
+            )
+        elif todo:
+            app.logger.info("schema: indexes present, %s migration(s) not recorded yet", len(todo))
+    except Exception as e:
+        app.logger.warning(f"schema check failed: {e}")
+    finally:
+        conn.close()
+
+
+@click.command("migrate")
+@click.option("--check", is_flag=True, help="Only report pending migrations and missing indexes.")
+@with_appcontext
+def migrate_command(check):
+    """Apply pending schema migrations."""
+    conn = db.connect()
+    try:
+        if check:
+            cur = conn.cursor()
+            try:
+                todo, missing = pending(cur), missing_objects(cur)
+            finally:
+                cur.close()
+            for m in todo:
+                click.echo(f"pending {m.version:04d} {m.name}")
+            for name in missing:
+                click.echo(f"missing {name}")
+            if not todo and not missing:
+                click.echo("schema up to date")
+            return
+        applied = migrate(conn, log=click.echo)
+        click.echo(f"{len(applied)} migration(s) applied" if applied else "schema up to date")
+    finally:
+        conn.close()
@@ -0,0 +1,465 @@
+"""
+Bulk import for /o_and_m/bulk_import (spots, customers, orders).
+
+The request body is read as a stream and parsed row by row:
+  text/csv                header row + data rows
+  application/x-ndjson    one JSON object per line
+  application/json        an array of objects (or a single object)
+Each row is validated and coerced against ENTITIES; valid rows are written
+with cursor.executemany() in batches of `batch_size`, one transaction per
+batch. If a batch fails (e.g. a foreign key), it is rolled back and retried
+row by row so the bad rows are reported and the rest still go in.
+
+mode=update updates existing rows by primary key with the columns present
+in the first row (the CSV header).
+
+With async=1 the route spools the body to a temporary file and runs the
+import as a "bulk_import" job (backend/jobs/runner.py). The job checkpoints
+its counters after every committed batch; if its worker is recycled, a
+process on the same host (the spool file is local) resumes it, skipping
+the rows already handled.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+import io
+import itertools
+import json
+import os
+import time
+from datetime import date, datetime
+
+from pymysql import MySQLError
+
+from backend.cache import metrics_cache
+from backend.db_connection import db
+from backend.jobs.runner import JobInterrupted, handler
+from backend.orders.rollup import Contribution, apply_contributions, order_contributions
+from backend.spots.regions import region_map
+from backend.spots.spot_index import spot_index
+
+DEFAULT_BATCH = 1000
+MAX_BATCH = 10000
+MAX_REPORTED_ERRORS = 1000
+_READ_CHUNK = 64 * 1024
+
+
+class RowError(ValueError):
+    pass
+
+
+# ------------------------- coercion -------------------------
+
+def _blank(v):
+    return v is None or (isinstance(v, str) and v.strip() == "")
+
+
+def _int(v):
+    if isinstance(v, bool):
+        raise RowError("expected an integer")
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        raise RowError("expected an integer")
+    if f != int(f):
+        raise RowError("expected an integer")
+    return int(f)
+
+
+def _non_negative_int(v):
+    n = _int(v)
+    if n < 0:
+        raise RowError("must be >= 0")
+    return n
+
+
+def _float(v):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        raise RowError("expected a number")
+
+
+def _latitude(v):
+    f = _float(v)
+    if not -90 <= f <= 90:
+        raise RowError("latitude out of range")
+    return f
+
+
+def _longitude(v):
+    f = _float(v)
+    if not -180 <= f <= 180:
+        raise RowError("longitude out of range")
+    return f
+
+
+def _date(v):
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, date):
+        return v
+    try:
+        return datetime.strptime(str(v).strip()[:10], "%Y-%m-%d").date()
+    except ValueError:
+        raise RowError("expected a date YYYY-MM-DD")
+
+
+def _bool(v):
+    if isinstance(v, bool):
+        return v
+    s = str(v).strip().lower()
+    if s in ("1", "true", "yes", "y", "t"):
+        return True
+    if s in ("0", "false", "no", "n", "f"):
+        return False
+    raise RowError("expected true/false")
+
+
+def _text(max_len):
+    def coerce(v):
+        s = str(v).strip()
+        if len(s) > max_len:
+            raise RowError(f"longer than {max_len} characters")
+        return s
+    return coerce
+
+
+def _choice(*values):
+    def coerce(v):
+        s = str(v).strip()
+        if s not in values:
+            raise RowError(f"must be one of {', '.join(values)}")
+        return s
+    return coerce
+
+
+ENTITIES = {
+    "spots": {
+        "table": "Spot",
+        "key": "spotID",
+        "required": ["address", "price"],
+        "defaults": {"status": "free"},
+        "columns": {
+            "price": _non_negative_int,
+            "contactTel": _text(20),
+            "imageURL": _text(100),
+            "estViewPerMonth": _non_negative_int,
+            "monthlyRentCost": _non_negative_int,
+            "endTimeOfCurrentOrder": _date,
+            "status": _choice("free", "inuse", "w.issue", "planned"),
+            "address": _text(100),
+            "latitude": _latitude,
+            "longitude": _longitude,
+        },
+        "tag": "spots",
+    },
+    "customers": {
+        "table": "Customers",
+        "key": "cID",
+        "required": ["fName", "lName", "email"],
+        "defaults": {"totalOrderTimes": 0, "VIP": False, "balance": 0},
+        "columns": {
+            "fName": _text(50),
+            "lName": _text(50),
+            "email": _text(50),
+            "position": _text(50),
+            "companyName": _text(50),
+            "totalOrderTimes": _non_negative_int,
+            "VIP": _bool,
+            "avatarURL": _text(100),
+            "balance": _int,
+            "TEL": _text(20),
+        },
+        "tag": "customers",
+    },
+    "orders": {
+        "table": "Orders",
+        "key": "orderID",
+        "required": ["date", "total", "cID"],
+        "defaults": {},
+        "columns": {
+            "date": _date,
+            "total": _non_negative_int,
+            "cID": _int,
+        },
+        "tag": "orders",
+    },
+}
+
+
+def validate(spec, raw, columns, mode):
+    """Coerce one input row to a tuple in `columns` order; raises RowError."""
+    if not isinstance(raw, dict):
+        raise RowError("row is not an object")
+    row, problems = {}, []
+    for col in columns:
+        value = raw.get(col)
+        if _blank(value):
+            if mode == "insert" and col in spec["required"]:
+                problems.append(f"{col}: required")
+            row[col] = spec["defaults"].get(col) if mode == "insert" else None
+            continue
+        coerce = _int if col == spec["key"] else spec["columns"][col]
+        try:
+            row[col] = coerce(value)
+        except RowError as e:
+            problems.append(f"{col}: {e}")
+    if mode == "update" and row.get(spec["key"]) is None:
+        problems.append(f"{spec['key']}: required for update")
+    if problems:
+        raise RowError("; ".join(problems))
+    return tuple(row[c] for c in columns)
+
+
+# ------------------------- streaming parsers -------------------------
+
+def _iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    yield from csv.DictReader(text)
+
+
+def _iter_ndjson(stream):
+    for line in io.TextIOWrapper(stream, encoding="utf-8-sig"):
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield RowError(f"invalid JSON: {e.msg}")
+
+
+def _iter_json(stream):
+    """Objects of a JSON array (or a single object) without reading the whole body."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+    buf, pos, started = "", 0, False
+    while True:
+        chunk = stream.read(_READ_CHUNK)
+        eof = not chunk
+        buf = buf[pos:] + utf8.decode(chunk or b"", final=eof)
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                break
+            if not started:
+                started = True
+                if buf[pos] == "[":
+                    pos += 1
+                    continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"invalid JSON at character {e.pos}") from None
+                break  # object continues in the next chunk
+            yield obj
+        if eof:
+            return
+
+
+def iter_rows(stream, content_type):
+    ct = (content_type or "").split(";")[0].strip().lower()
+    if ct in ("text/csv", "application/csv"):
+        return _iter_csv(stream)
+    if ct in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        return _iter_ndjson(stream)
+    if ct == "application/json":
+        return _iter_json(stream)
+    raise ValueError("Content-Type must be text/csv, application/json or application/x-ndjson")
+
+
+# ------------------------- import -------------------------
+
+class BulkImport:
+    def __init__(self, conn, entity, mode="insert", batch_size=DEFAULT_BATCH, on_batch=None):
+        self.conn = conn
+        self.entity = entity
+        self.spec = ENTITIES[entity]
+        self.mode = mode
+        self.batch_size = batch_size
+        self.columns = None
+        self.sql = None
+        self.received = self.written = self.failed = self.batches = 0
+        self.errors = []
+        self.on_batch = on_batch
+
+    def _prepare(self, first_row):
+        spec = self.spec
+        if self.mode == "insert":
+            self.columns = list(spec["columns"])
+            cols = self.columns + (["region"] if self.entity == "spots" else [])
+            self.sql = (f"INSERT INTO {spec['table']} ({', '.join(cols)}) "
+                        f"VALUES ({', '.join(['%s'] * len(cols))})")
+        else:
+            given = [c for c in first_row if c in spec["columns"]] if isinstance(first_row, dict) else []
+            if not given:
+                raise ValueError(f"update needs {spec['key']} and at least one of: {', '.join(spec['columns'])}")
+            self.columns = given + [spec["key"]]
+            sets = ", ".join(f"{c} = %s" for c in given)
+            self.sql = f"UPDATE {spec['table']} SET {sets} WHERE {spec['key']} = %s"
+
+    def state(self):
+        """Counters after the last committed batch (a job checkpoint)."""
+        return {"columns": self.columns, "received": self.received, "written": self.written,
+                "failed": self.failed, "batches": self.batches, "errors": self.errors}
+
+    def _restore(self, state):
+        if state.get("columns"):
+            self._prepare(dict.fromkeys(state["columns"]))
+        self.received, self.written = state["received"], state["written"]
+        self.failed, self.batches = state["failed"], state["batches"]
+        self.errors = list(state["errors"])
+
+    def _error(self, row_no, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_no, "error": message})
+
+    def _params(self, values):
+        """Statement parameters; new spots get their region computed up front."""
+        if self.entity == "spots" and self.mode == "insert":
+            i_lat, i_lon = self.columns.index("latitude"), self.columns.index("longitude")
+            nan = float("nan")
+            regions = region_map.assign([v[i_lat] if v[i_lat] is not None else nan for v in values],
+                                        [v[i_lon] if v[i_lon] is not None else nan for v in values])
+            return [v + (r,) for v, r in zip(values, regions)]
+        return values
+
+    def _before(self, cur, values):
+        """Rollup contributions of the orders an update batch is about to change."""
+        if self.entity != "orders" or self.mode != "update":
+            return []
+        return order_contributions(cur, [v[-1] for v in values])
+
+    def _after_write(self, cur, values, before):
+        """Keep rollups / regions in step with the batch (same transaction)."""
+        if self.entity == "orders" and self.mode == "insert":
+            i_date, i_total = self.columns.index("date"), self.columns.index("total")
+            apply_contributions(cur, added=[Contribution(None, v[i_date], v[i_total], {}) for v in values])
+        elif self.entity == "orders":
+            keys = {v[-1] for v in values}
+            apply_contributions(cur, [c for c in before if c.orderID in keys], order_contributions(cur, keys))
+        elif self.entity == "spots" and self.mode == "update" and (
+                "latitude" in self.columns or "longitude" in self.columns):
+            region_map.assign_spots(cur, [v[-1] for v in values])
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        cur = self.conn.cursor()
+        values = [v for _, v in batch]
+        batch = list(batch)
+        try:
+            before = self._before(cur, values)
+            cur.executemany(self.sql, self._params(values))
+            self._after_write(cur, values, before)
+            self.conn.commit()
+            self.written += len(batch)
+        except MySQLError:
+            self.conn.rollback()
+            self._flush_rows(cur, batch)
+        finally:
+            cur.close()
+        self.batches += 1
+        if self.on_batch:
+            self.on_batch(self)
+
+    def _flush_rows(self, cur, batch):
+        """Row-by-row retry of a failed batch; a failed statement does not abort the transaction."""
+        good, bad = [], []
+        try:
+            before = self._before(cur, [v for _, v in batch])
+            for row_no, v in batch:
+                try:
+                    cur.execute(self.sql, self._params([v])[0])
+                    good.append(v)
+                except MySQLError as e:
+                    bad.append((row_no, str(e.args[1] if len(e.args) > 1 else e)))
+            if good:
+                self._after_write(cur, good, before)
+            self.conn.commit()
+        except MySQLError as e:
+            self.conn.rollback()
+            good, bad = [], [(row_no, str(e)) for row_no, _ in batch]
+        self.written += len(good)
+        for row_no, message in bad:
+            self._error(row_no, message)
+
+    def run(self, rows, resume=None):
+        """Import `rows`; with `resume` (a state()), skip the rows it already covers and carry on."""
+        started = time.perf_counter()
+        if resume:
+            self._restore(resume)
+            rows = itertools.islice(rows, self.received, None)
+        batch, aborted = [], None
+        try:
+            self._consume(rows, batch)
+        except ValueError as e:
+            # unreadable body or update without usable columns: keep what was parsed
+            aborted = str(e)
+        self._flush(batch)
+        return {
+            "entity": self.entity,
+            "mode": self.mode,
+            "received": self.received,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted": aborted,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+
+    def _consume(self, rows, batch):
+        for row_no, raw in enumerate(rows, start=self.received + 1):
+            self.received += 1
+            if isinstance(raw, Exception):
+                self._error(row_no, str(raw))
+                continue
+            if self.columns is None:
+                self._prepare(raw)
+            try:
+                batch.append((row_no, validate(self.spec, raw, self.columns, self.mode)))
+            except RowError as e:
+                self._error(row_no, str(e))
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch.clear()
+
+
+def after_import(entity, result):
+    """Drop cached aggregates (and the spot index) once rows were written."""
+    if result["written"]:
+        metrics_cache.invalidate(ENTITIES[entity]["tag"])
+        if entity == "spots":
+            spot_index.invalidate()
+
+
+@handler("bulk_import", resumable=True)
+def _bulk_import_job(job, path, entity, mode, batch_size, content_type, resume=None):
+    size = os.path.getsize(path) or 1
+    conn = db.connect()
+    interrupted = False
+    try:
+        with open(path, "rb") as fh:
+            def report(imp):
+                job.progress(fh.tell(), size, f"{imp.received} rows read, {imp.written} written, "
+                                              f"{imp.failed} failed")
+                job.checkpoint(imp.state())
+            result = BulkImport(conn, entity, mode, batch_size, report).run(iter_rows(fh, content_type), resume)
+    except JobInterrupted:
+        interrupted = True  # keep the spool file for the process that resumes the job
+        raise
+    finally:
+        conn.close()
+        if not interrupted:
+            os.remove(path)
+    after_import(entity, result)
+    return result
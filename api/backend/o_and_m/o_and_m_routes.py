@@ -1,30 +1,32 @@
-import mysql.connector as mysql
+import re
+import shutil
+import tempfile
+
 from flask import Blueprint, request, jsonify, current_app
-from mysql.connector import Error
+from pymysql import MySQLError as Error
 from datetime import datetime, timedelta
+from backend.cache import metrics_cache
+from backend.db_connection import db
+from backend.fanout import fan_out, max_time_hint
+from backend.jobs.runner import job_runner
+from backend.o_and_m import retention
+from backend.o_and_m.retention import DEFAULT_ARCHIVE_DAYS
+from backend.o_and_m.bulk_import import DEFAULT_BATCH, ENTITIES, MAX_BATCH, BulkImport, after_import, iter_rows
+from backend.orders.rollup import add_orders, daily_series, period_totals
+from backend.spots.regions import region_map
+from backend.spots.search_index import address_index
+from backend.spots.spot_index import spot_index
 
 
 o_and_m = Blueprint("o_and_m", __name__)
 
 
-def _get_database_connection():
-    """Get a fresh database connection using Flask config"""
-    cfg = current_app.config
-    return mysql.connect(
-        host=cfg.get("MYSQL_DATABASE_HOST", "127.0.0.1"),
-        port=int(cfg.get("MYSQL_DATABASE_PORT", 3306)),
-        user=cfg.get("MYSQL_DATABASE_USER", "root"),
-        password=cfg.get("MYSQL_DATABASE_PASSWORD", "changeme"),
-        database=cfg.get("MYSQL_DATABASE_DB", "SpotLight"),
-    )
-
-
-def _execute_query(query, params=None, fetch_one=False, fetch_all=False, dictionary=False):
+def _execute_query(query, params=None, fetch_one=False, fetch_all=False, dictionary=True):
     """Execute a database query with consistent error handling and connection management"""
     connection = None
     cursor = None
     try:
-        connection = _get_database_connection()
+        connection = db.connect()
         cursor = connection.cursor(dictionary=dictionary)
         cursor.execute(query, params or ())
         
@@ -63,70 +65,158 @@ def _parse_period_days(period_param: str, default_days: int = 90) -> int:
         return default_days
 
 
+# Global search: each entity is queried on its own pooled connection, all at
+# once, and the request answers within SEARCH_BUDGET_MS with whatever finished.
+SEARCH_LIMIT = 20
+SEARCH_COLUMNS = {
+    "spots": "spotID, address, status, price, estViewPerMonth, monthlyRentCost",
+    "customers": "cID, fName, lName, email, companyName, VIP",
+    "orders": "orderID, date, total, cID",
+}
+# InnoDB FULLTEXT ignores words shorter than innodb_ft_min_token_size and its
+# default stopwords; leaving them out of the boolean query keeps "+word*" from
+# excluding every row.
+FT_MIN_TOKEN = 3
+FT_STOPWORDS = {
+    "about", "and", "are", "com", "for", "from", "how", "not", "that", "the",
+    "this", "was", "what", "when", "where", "who", "will", "with", "und", "www",
+}
+_DATE_PREFIX_RE = re.compile(r"^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+
+
+def _fulltext_terms(q: str) -> str:
+    """Boolean-mode query requiring every word as a prefix, or '' if none qualify."""
+    words = [w for w in re.findall(r"\w+", q.lower())
+             if len(w) >= FT_MIN_TOKEN and w not in FT_STOPWORDS]
+    return " ".join(f"+{w}*" for w in words)
+
+
+def _date_range(q: str):
+    """[start, end) dates for 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD', else None."""
+    m = _DATE_PREFIX_RE.match(q)
+    if not m:
+        return None
+    try:
+        year, month, day = int(m.group(1)), m.group(2), m.group(3)
+        if day is not None:
+            start = datetime(year, int(month), int(day))
+            return start.date(), (start + timedelta(days=1)).date()
+        if month is not None:
+            start = datetime(year, int(month), 1)
+            end = datetime(year + (start.month == 12), start.month % 12 + 1, 1)
+            return start.date(), end.date()
+        return datetime(year, 1, 1).date(), datetime(year + 1, 1, 1).date()
+    except ValueError:
+        return None
+
+
+def _search_query(sql, params, budget_s):
+    """Run one search SELECT on a dedicated pooled connection."""
+    conn = db.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql.replace("SELECT", f"SELECT {max_time_hint(budget_s)}", 1), params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _search_spots(q, budget_s):
+    if spot_index.ready():
+        fields = SEARCH_COLUMNS["spots"].split(", ")
+        ranked = address_index.search(q, limit=SEARCH_LIMIT)
+        return [{k: row.get(k) for k in fields} for row in spot_index.rows(i for i, _ in ranked)]
+    terms = _fulltext_terms(q)
+    if terms:
+        return _search_query(
+            f"SELECT {SEARCH_COLUMNS['spots']} FROM Spot "
+            "WHERE MATCH(address) AGAINST (%s IN BOOLEAN MODE) LIMIT %s",
+            (terms, SEARCH_LIMIT), budget_s)
+    return _search_query(
+        f"SELECT {SEARCH_COLUMNS['spots']} FROM Spot WHERE address LIKE %s LIMIT %s",
+        (f"%{q}%", SEARCH_LIMIT), budget_s)
+
+
+def _search_customers(q, budget_s):
+    terms = _fulltext_terms(q)
+    if terms:
+        # ft_customer_search covers (fName, lName, email, companyName)
+        return _search_query(
+            f"SELECT {SEARCH_COLUMNS['customers']} FROM Customers "
+            "WHERE MATCH(fName, lName, email, companyName) AGAINST (%s IN BOOLEAN MODE) "
+            "LIMIT %s",
+            (terms, SEARCH_LIMIT), budget_s)
+    # Only short words / stopwords: substring scan, bounded by the time hint
+    like = f"%{q}%"
+    return _search_query(
+        f"SELECT {SEARCH_COLUMNS['customers']} FROM Customers "
+        "WHERE fName LIKE %s OR lName LIKE %s OR email LIKE %s OR companyName LIKE %s "
+        "LIMIT %s",
+        (like, like, like, like, SEARCH_LIMIT), budget_s)
+
+
+def _search_orders(q, budget_s):
+    if q.isdigit():
+        # Primary key / cID foreign key lookups (a 4-digit number may also be a year)
+        sql = f"SELECT {SEARCH_COLUMNS['orders']} FROM Orders WHERE orderID = %s OR cID = %s"
+        params = [int(q), int(q)]
+        span = _date_range(q)
+        if span:
+            sql += " OR (date >= %s AND date < %s)"
+            params += list(span)
+        return _search_query(sql + " LIMIT %s", (*params, SEARCH_LIMIT), budget_s)
+    span = _date_range(q)
+    if span:
+        # Range scan on idx_orders_date instead of DATE_FORMAT(date) LIKE ...
+        return _search_query(
+            f"SELECT {SEARCH_COLUMNS['orders']} FROM Orders "
+            "WHERE date >= %s AND date < %s ORDER BY date DESC LIMIT %s",
+            (*span, SEARCH_LIMIT), budget_s)
+    if re.fullmatch(r"[\d-]+", q):
+        # Partial date fragments such as "-05-" or "12-2"
+        return _search_query(
+            f"SELECT {SEARCH_COLUMNS['orders']} FROM Orders "
+            "WHERE DATE_FORMAT(date, '%%Y-%%m-%%d') LIKE %s LIMIT %s",
+            (f"%{q}%", SEARCH_LIMIT), budget_s)
+    return []  # no order field can match free text
+
+
 @o_and_m.route("/search", methods=["GET"])
 def full_db_search():
-    """Search across all entities (spots, customers, orders)"""
+    """
+    Search across all entities (spots, customers, orders).
+
+    The three searches run concurrently on separate pooled connections. An
+    entity that misses the budget comes back empty and is listed in
+    "timed_out"; one that fails is listed in "errors". "partial" is true in
+    either case.
+    """
     try:
         q = request.args.get("query", "").strip()
+        empty = {"spots": [], "customers": [], "orders": [], "partial": False, "timed_out": []}
         if not q:
-            return jsonify({"spots": [], "customers": [], "orders": []}), 200
-
-        connection = _get_database_connection()
-        cursor = connection.cursor()
-        
-        # Search spots: use FULLTEXT on address when possible, also fallback to LIKE
-        spots = []
-        try:
-            spots_query = (
-                "SELECT spotID, address, status, price, estViewPerMonth, monthlyRentCost "
-                "FROM Spot WHERE MATCH(address) AGAINST (%s IN NATURAL LANGUAGE MODE) "
-                "OR address LIKE %s LIMIT 20"
-            )
-            cursor.execute(spots_query, (q, f"%{q}%"))
-            spots = cursor.fetchall()
-        except Error:
-            # In case MATCH is unsupported in current mode
-            fallback_query = (
-                "SELECT spotID, address, status, price, estViewPerMonth, monthlyRentCost "
-                "FROM Spot WHERE address LIKE %s LIMIT 20"
-            )
-            cursor.execute(fallback_query, (f"%{q}%",))
-            spots = cursor.fetchall()
-
-        # Search customers: search by name/email/company
-        customers_query = (
-            "SELECT cID, fName, lName, email, companyName, VIP "
-            "FROM Customers "
-            "WHERE fName LIKE %s OR lName LIKE %s OR email LIKE %s OR companyName LIKE %s "
-            "LIMIT 20"
+            return jsonify(empty), 200
+
+        budget_s = current_app.config.get("SEARCH_BUDGET_MS", 800) / 1000.0
+        results, timed_out, errors = fan_out(
+            {
+                "spots": lambda: _search_spots(q, budget_s),
+                "customers": lambda: _search_customers(q, budget_s),
+                "orders": lambda: _search_orders(q, budget_s),
+            },
+            budget_s,
+            logger=current_app.logger,
         )
-        cursor.execute(customers_query, (f"%{q}%", f"%{q}%", f"%{q}%", f"%{q}%"))
-        customers = cursor.fetchall()
-
-        # Search orders: if numeric, try exact match on orderID or cID; else search by date string
-        orders = []
-        if q.isdigit():
-            orders_query = (
-                "SELECT orderID, date, total, cID "
-                "FROM Orders WHERE orderID = %s OR cID = %s LIMIT 20"
-            )
-            cursor.execute(orders_query, (int(q), int(q)))
-            orders = cursor.fetchall()
-        else:
-            orders_query = (
-                "SELECT orderID, date, total, cID "
-                "FROM Orders WHERE DATE_FORMAT(date, '%%Y-%%m-%%d') LIKE %s LIMIT 20"
-            )
-            cursor.execute(orders_query, (f"%{q}%",))
-            orders = cursor.fetchall()
+        body = {name: results.get(name, []) for name in ("spots", "customers", "orders")}
+        body["partial"] = bool(timed_out or errors)
+        body["timed_out"] = timed_out
+        if errors:
+            body["errors"] = errors
+        if len(errors) == 3:
+            return jsonify(body), 500
+        return jsonify(body), 200
 
-        cursor.close()
-        connection.close()
-        return jsonify({"spots": spots, "customers": customers, "orders": orders}), 200
-        
-    except Error as e:
-        current_app.logger.error(f"full_db_search error: {e}")
-        return jsonify({"error": str(e)}), 500
     except Exception as e:
         current_app.logger.error(f"full_db_search unexpected error: {e}")
         return jsonify({"error": "Internal server error"}), 500
@@ -169,13 +259,18 @@ def insert_data():
                 payload.get("longitude"),
             )
             
-            connection = _get_database_connection()
+            connection = db.connect()
             cursor = connection.cursor()
-            cursor.execute(query, data)
-            connection.commit()
-            new_id = cursor.lastrowid
-            cursor.close()
-            connection.close()
+            try:
+                cursor.execute(query, data)
+                new_id = cursor.lastrowid
+                region_map.assign_spots(cursor, [new_id])
+                connection.commit()
+                spot_index.refresh_spots([new_id], connection)
+            finally:
+                cursor.close()
+                connection.close()
+            metrics_cache.invalidate("spots")
             return jsonify({"message": "created", "spotID": new_id}), 201
 
         elif entity == "customer":
@@ -201,13 +296,16 @@ def insert_data():
                 payload.get("TEL"),
             )
             
-            connection = _get_database_connection()
+            connection = db.connect()
             cursor = connection.cursor()
-            cursor.execute(query, data)
-            connection.commit()
-            new_id = cursor.lastrowid
-            cursor.close()
-            connection.close()
+            try:
+                cursor.execute(query, data)
+                connection.commit()
+                new_id = cursor.lastrowid
+            finally:
+                cursor.close()
+                connection.close()
+            metrics_cache.invalidate("customers")
             return jsonify({"message": "created", "cID": new_id}), 201
 
         elif entity == "order":
@@ -219,13 +317,17 @@ def insert_data():
             query = "INSERT INTO Orders (date, total, cID) VALUES (%s, %s, %s)"
             data = (payload["date"], payload["total"], payload["cID"])
             
-            connection = _get_database_connection()
+            connection = db.connect()
             cursor = connection.cursor()
-            cursor.execute(query, data)
-            connection.commit()
-            new_id = cursor.lastrowid
-            cursor.close()
-            connection.close()
+            try:
+                cursor.execute(query, data)
+                new_id = cursor.lastrowid
+                add_orders(cursor, [new_id])
+                connection.commit()
+            finally:
+                cursor.close()
+                connection.close()
+            metrics_cache.invalidate("orders")
             return jsonify({"message": "created", "orderID": new_id}), 201
 
         else:
@@ -239,35 +341,126 @@ def insert_data():
         return jsonify({"error": "Internal server error"}), 500
 
 
-@o_and_m.route("/spots/metrics", methods=["GET"])
-def get_spots_metrics():
-    """Get metrics for all spots"""
+@o_and_m.route("/bulk_import", methods=["POST"])
+def bulk_import():
+    """
+    Stream a CSV / JSON array / NDJSON body into spots, customers or orders.
+    Query: entity=spots|customers|orders, mode=insert|update, batch_size=, async=1
+    Returns counts, per-row errors ({row, error}, 1-based) and timing; with
+    async=1 the body is spooled to disk and 202 + a jobID (poll /jobs/<id>)
+    is returned, the job result having the same shape.
+    """
+    entity = (request.args.get("entity") or "").strip().lower()
+    if entity not in ENTITIES:
+        return jsonify({"error": f"entity must be one of: {', '.join(ENTITIES)}"}), 400
+    mode = (request.args.get("mode") or "insert").strip().lower()
+    if mode not in ("insert", "update"):
+        return jsonify({"error": "mode must be insert or update"}), 400
+    try:
+        batch_size = int(request.args.get("batch_size") or current_app.config.get("BULK_IMPORT_BATCH", DEFAULT_BATCH))
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    batch_size = max(1, min(MAX_BATCH, batch_size))
+
     try:
-        connection = _get_database_connection()
-        cursor = connection.cursor(dictionary=True)
+        rows = iter_rows(request.stream, request.content_type)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("async", "").lower() in ("1", "true", "yes"):
+        try:
+            with tempfile.NamedTemporaryFile(prefix="bulk_import_", delete=False) as spool:
+                shutil.copyfileobj(request.stream, spool, 1024 * 1024)
+            job_id = job_runner.submit("bulk_import", {
+                "path": spool.name, "entity": entity, "mode": mode,
+                "batch_size": batch_size, "content_type": request.content_type,
+            })
+            return jsonify({"jobID": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}), 202
+        except Exception as e:
+            current_app.logger.error(f"bulk_import submit error: {e}")
+            return jsonify({"error": str(e)}), 500
+
+    try:
+        connection = db.connect()
+        try:
+            result = BulkImport(connection, entity, mode, batch_size).run(rows)
+        finally:
+            connection.close()
+        after_import(entity, result)
+        if result["aborted"] and not result["written"]:
+            return jsonify(result), 400
+        return jsonify(result), 200
+    except Error as e:
+        current_app.logger.error(f"bulk_import error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 
-        cursor.execute("SELECT COUNT(*) AS total FROM Spot")
-        total = cursor.fetchone()["total"]
+@o_and_m.route("/retention/purge", methods=["POST"])
+def retention_purge():
+    """
+    Delete orders and reports older than N days, in small batches, as a job.
+    Query: older_than_days (required), tables=orders,reports, batch=, sleep_ms=
+    Returns 202 + jobID (poll /jobs/<id>).
+    """
+    return retention.submit("retention_purge", request.args)
 
-        cursor.execute("SELECT COUNT(*) AS cnt FROM Spot WHERE status = 'inuse'")
-        in_use = cursor.fetchone()["cnt"]
 
-        cursor.execute("SELECT COUNT(*) AS cnt FROM Spot WHERE status = 'free'")
-        free = cursor.fetchone()["cnt"]
+@o_and_m.route("/retention/archive", methods=["POST"])
+def retention_archive():
+    """
+    Like /retention/purge, but deleted rows (children included) are first
+    written to gzip NDJSON files. older_than_days defaults to 365.
+    """
+    return retention.submit("retention_archive", request.args, DEFAULT_ARCHIVE_DAYS)
 
-        cursor.execute("SELECT COUNT(*) AS cnt FROM Spot WHERE status = 'w.issue'")
-        with_issue = cursor.fetchone()["cnt"]
 
+def _fetch_one(sql, params=()):
+    """One-row read on its own pooled connection (safe from cache refresh threads)."""
+    conn = db.connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchone() or {}
+    finally:
         cursor.close()
-        connection.close()
-        
-        return jsonify({
-            "total": total,
-            "in_use": in_use,
-            "free": free,
-            "with_issue": with_issue,
-        }), 200
-        
+        conn.close()
+
+
+def _load_spot_metrics():
+    row = _fetch_one(
+        "SELECT COUNT(*) AS total, "
+        "COALESCE(SUM(status = 'inuse'), 0) AS in_use, "
+        "COALESCE(SUM(status = 'free'), 0) AS free, "
+        "COALESCE(SUM(status = 'w.issue'), 0) AS with_issue "
+        "FROM Spot"
+    )
+    return {k: int(row.get(k) or 0) for k in ("total", "in_use", "free", "with_issue")}
+
+
+def _load_customer_metrics():
+    # One pass: each customer joined to its latest order date (idx_orders_customer_date)
+    row = _fetch_one(
+        "SELECT COUNT(*) AS total, "
+        "COALESCE(SUM(c.VIP = 1), 0) AS vip, "
+        "COALESCE(SUM(o.last_date IS NULL), 0) AS never_ordered, "
+        "AVG(DATEDIFF(CURDATE(), o.last_date)) AS avg_days "
+        "FROM Customers c "
+        "LEFT JOIN (SELECT cID, MAX(date) AS last_date FROM Orders GROUP BY cID) o "
+        "ON o.cID = c.cID"
+    )
+    return {
+        "total": int(row.get("total") or 0),
+        "vip": int(row.get("vip") or 0),
+        "never_ordered": int(row.get("never_ordered") or 0),
+        "avg_order_time": float(row["avg_days"]) if row.get("avg_days") is not None else 0,
+    }
+
+
+@o_and_m.route("/spots/metrics", methods=["GET"])
+def get_spots_metrics():
+    """Get metrics for all spots (cached; refreshed on spot writes)"""
+    try:
+        return jsonify(metrics_cache.get("spots_metrics", _load_spot_metrics, tags=("spots",))), 200
     except Error as e:
         current_app.logger.error(f"get_spots_metrics error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -275,81 +468,60 @@ def get_spots_metrics():
 
 @o_and_m.route("/customers/metrics", methods=["GET"])
 def get_customers_metrics():
-    """Get metrics for all customers"""
+    """Get metrics for all customers (cached; refreshed on customer/order writes)"""
     try:
-        connection = _get_database_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("SELECT COUNT(*) AS total FROM Customers")
-        total = cursor.fetchone()["total"]
-
-        cursor.execute("SELECT COUNT(*) AS vip FROM Customers WHERE VIP = 1")
-        vip = cursor.fetchone()["vip"]
-
-        cursor.execute(
-            "SELECT COUNT(*) AS never_ordered FROM Customers c "
-            "LEFT JOIN Orders o ON o.cID = c.cID WHERE o.orderID IS NULL"
-        )
-        never_ordered = cursor.fetchone()["never_ordered"]
-
-        # Average days since last order across customers having at least 1 order
-        cursor.execute(
-            "SELECT AVG(days_since) AS avg_days FROM ("
-            "  SELECT DATEDIFF(CURDATE(), MAX(o.date)) AS days_since"
-            "  FROM Orders o GROUP BY o.cID"
-            ") t"
-        )
-        row = cursor.fetchone()
-        avg_order_time = row["avg_days"] if row and row["avg_days"] is not None else 0
-
-        cursor.close()
-        connection.close()
-        
-        return jsonify({
-            "total": total,
-            "vip": vip,
-            "never_ordered": never_ordered,
-            "avg_order_time": avg_order_time,
-        }), 200
-        
+        data = metrics_cache.get("customers_metrics", _load_customer_metrics,
+                                 tags=("customers", "orders"))
+        return jsonify(data), 200
     except Error as e:
         current_app.logger.error(f"get_customers_metrics error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+def _load_order_metrics(days):
+    conn = db.connect()
+    cursor = conn.cursor()
+    try:
+        totals = period_totals(cursor, days)
+    finally:
+        cursor.close()
+        conn.close()
+    return {
+        "total": totals["orders"],
+        "avg_price": totals["avg_order_value"],
+        "last_period": totals["period_orders"],
+        "revenue": totals["revenue"],
+        "revenue_last_period": totals["period_revenue"],
+        "period_days": days,
+    }
+
+
 @o_and_m.route("/orders/metrics", methods=["GET"])
 def get_orders_metrics():
-    """Get metrics for all orders with optional time period"""
+    """Get metrics for all orders with optional time period (served from OrderDailyRollup)"""
     try:
         period_param = request.args.get("period", "90d")
         days = _parse_period_days(period_param, 90)
+        data = metrics_cache.get(("orders_metrics", days), lambda: _load_order_metrics(days),
+                                 tags=("orders",))
+        return jsonify(data), 200
 
-        connection = _get_database_connection()
-        cursor = connection.cursor(dictionary=True)
-
-        cursor.execute("SELECT COUNT(*) AS total FROM Orders")
-        total = cursor.fetchone()["total"]
-
-        cursor.execute("SELECT AVG(total) AS avg_price FROM Orders")
-        avg_price = cursor.fetchone()["avg_price"]
+    except Error as e:
+        current_app.logger.error(f"get_orders_metrics error: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        cursor.execute(
-            "SELECT COUNT(*) AS last_period FROM Orders WHERE date >= (CURDATE() - INTERVAL %s DAY)",
-            (days,),
-        )
-        last_period = cursor.fetchone()["last_period"]
 
+@o_and_m.route("/orders/daily", methods=["GET"])
+def get_orders_daily():
+    """Per-day orders / revenue / distinct customers for the period (OrderDailyRollup)"""
+    try:
+        days = _parse_period_days(request.args.get("period", "90d"), 90)
+        cursor = db.get_db().cursor()
+        rows = daily_series(cursor, days)
         cursor.close()
-        connection.close()
-        
-        return jsonify({
-            "total": total,
-            "avg_price": avg_price,
-            "last_period": last_period,
-        }), 200
-        
+        return jsonify([{**r, "day": str(r["day"])} for r in rows]), 200
     except Error as e:
-        current_app.logger.error(f"get_orders_metrics error: {e}")
+        current_app.logger.error(f"get_orders_daily error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -466,4 +638,9 @@ def update_report_status(r_id: int):
         
     except Exception as e:
         current_app.logger.error(f"update_report_status error: {e}")
-        return jsonify({"error": "Internal server error"}), 500
\ No newline at end of file
+        return jsonify({"error": "Internal server error"}), 500
+
+@o_and_m.route("/db/pool", methods=["GET"])
+def db_pool_stats():
+    """Connection pool statistics for this worker process"""
+    return jsonify(db.stats()), 200
@@ -0,0 +1,233 @@
+"""
+Retention for old orders and reports (/o_and_m/retention/*, /owner/retention/*).
+
+    purge:   delete Orders / Report rows dated before CURDATE() - N days
+             (orders still in ToBeProcessedOrder, i.e. unpaid work, are kept)
+    archive: the same, after writing every deleted row (children included)
+             to gzip-compressed NDJSON files under RETENTION_ARCHIVE_DIR
+
+Rows go in batches of RETENTION_BATCH, oldest first, through
+idx_orders_date / idx_report_date, one short transaction per batch with
+RETENTION_SLEEP_MS between batches, so locks are held briefly and the undo
+log stays small while the API keeps serving. Each batch locks its parent
+rows (FOR UPDATE) and reads their children with FOR SHARE, so a child
+written concurrently either waits for the batch or is in the archive
+before the cascade deletes it. Deleting an order cascades to SpotOrder,
+ProcessedOrder and InvalidSpotReport; a report cascades to
+InvalidSpotReport. Order batches refresh the daily rollups of their days
+in the same transaction.
+
+Both run as background jobs ("retention_purge" / "retention_archive").
+They checkpoint the cutoff and counts after every batch, so a job whose
+worker is recycled carries on in another process where it stopped.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app, jsonify
+
+from backend.cache import metrics_cache
+from backend.db_connection import db
+from backend.jobs.runner import handler, job_runner
+from backend.orders.rollup import refresh_days
+
+DEFAULT_BATCH = 500
+DEFAULT_SLEEP_MS = 100
+DEFAULT_ARCHIVE_DIR = "archive"
+DEFAULT_ARCHIVE_DAYS = 365
+TABLES = ("orders", "reports")
+
+# parent table, key, date column, child tables archived with it (table, key column),
+# condition for rows that must stay ({lock} is the locking clause of the batch select)
+_TARGETS = {
+    "orders": ("Orders", "orderID", "date",
+               [("SpotOrder", "orderID"), ("ProcessedOrder", "orderID"), ("InvalidSpotReport", "orderID")],
+               "NOT EXISTS (SELECT 1 FROM ToBeProcessedOrder t WHERE t.orderID = Orders.orderID{lock})"),
+    "reports": ("Report", "rID", "date",
+                [("InvalidSpotReport", "rID")], None),
+}
+
+settings = {"batch": DEFAULT_BATCH, "sleep_ms": DEFAULT_SLEEP_MS, "archive_dir": DEFAULT_ARCHIVE_DIR}
+
+
+def init_app(app):
+    settings["batch"] = int(app.config.get("RETENTION_BATCH", DEFAULT_BATCH))
+    settings["sleep_ms"] = int(app.config.get("RETENTION_SLEEP_MS", DEFAULT_SLEEP_MS))
+    settings["archive_dir"] = app.config.get("RETENTION_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR
+
+
+class _Archive:
+    """One .ndjson.gz file per table for a run, flushed after every batch."""
+
+    def __init__(self, directory, stamp):
+        self.directory, self.stamp = directory, stamp
+        self.files = {}
+        self.rows = {}
+
+    def write(self, table, rows):
+        if not rows:
+            return
+        fh = self.files.get(table)
+        if fh is None:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{table}-{self.stamp}.ndjson.gz")
+            fh = self.files[table] = gzip.open(path, "at", encoding="utf-8")
+        for row in rows:
+            fh.write(json.dumps(row, default=str) + "\n")
+        self.rows[table] = self.rows.get(table, 0) + len(rows)
+
+    def flush(self):
+        for fh in self.files.values():
+            fh.flush()
+
+    def summary(self):
+        return {os.path.basename(fh.name): self.rows[t] for t, fh in self.files.items()}
+
+    def close(self):
+        for fh in self.files.values():
+            fh.close()
+        return self.summary()
+
+
+def _purge_table(conn, name, cutoff, batch, sleep_s, archive=None, progress=None, on_batch=None):
+    table, key, date_col, children, keep = _TARGETS[name]
+    def where(lock=""):
+        return f"{date_col} < %s" + (f" AND {keep.format(lock=lock)}" if keep else "")
+
+    cur = conn.cursor()
+    deleted = 0
+    try:
+        cur.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE {where()}", (cutoff,))
+        total = cur.fetchone()["n"]
+        conn.commit()
+        while True:
+            cur.execute(
+                f"SELECT {'*' if archive else f'{key}, {date_col}'} FROM {table} "
+                f"WHERE {where(' FOR SHARE')} ORDER BY {date_col}, {key} LIMIT %s FOR UPDATE",
+                (cutoff, batch),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                conn.rollback()  # release the gap locks of the empty batch
+                break
+            ids = [r[key] for r in rows]
+            marks = ",".join(["%s"] * len(ids))
+            if archive:
+                for child, fk in children:
+                    cur.execute(f"SELECT * FROM {child} WHERE {fk} IN ({marks}) FOR SHARE", tuple(ids))
+                    archive.write(child, cur.fetchall())
+                archive.write(table, rows)
+                archive.flush()
+            cur.execute(f"DELETE FROM {table} WHERE {key} IN ({marks})", tuple(ids))
+            if table == "Orders":
+                refresh_days(cur, {r[date_col] for r in rows})
+            conn.commit()
+            deleted += len(ids)
+            if progress:
+                progress(deleted, total, f"{table}: {deleted} of {total}")
+            if on_batch:
+                on_batch(deleted)
+            if len(rows) < batch:
+                break
+            time.sleep(sleep_s)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return deleted
+
+
+def run_retention(older_than_days, tables=TABLES, archive=False, batch=None, sleep_ms=None,
+                  progress=None, checkpoint=None, resume=None):
+    """
+    Purge (or archive and purge) rows older than the cutoff; returns a summary.
+    checkpoint(state) is called after every batch; passing that state back
+    as `resume` continues the run with the same cutoff and counts.
+    """
+    batch = batch or settings["batch"]
+    sleep_s = (settings["sleep_ms"] if sleep_ms is None else sleep_ms) / 1000.0
+    resume = resume or {}
+    if resume.get("cutoff"):
+        cutoff = date.fromisoformat(resume["cutoff"])
+    else:
+        cutoff = date.today() - timedelta(days=int(older_than_days))
+    started = time.perf_counter()
+    store = _Archive(settings["archive_dir"], datetime.now().strftime("%Y%m%dT%H%M%S")) if archive else None
+    deleted = dict(resume.get("deleted") or {})
+    earlier_files = resume.get("files") or {}
+    conn = db.connect()
+    try:
+        for name in tables:
+            done = deleted.get(name, 0)
+
+            def on_batch(n, name=name, done=done):
+                deleted[name] = done + n
+                if checkpoint:
+                    checkpoint({"cutoff": str(cutoff), "deleted": deleted,
+                                "files": {**earlier_files, **(store.summary() if store else {})}})
+
+            deleted[name] = done + _purge_table(conn, name, cutoff, batch, sleep_s, store, progress, on_batch)
+    finally:
+        conn.close()
+        files = {**earlier_files, **store.close()} if store else None
+        if any(deleted.values()):
+            metrics_cache.invalidate("orders")
+    out = {
+        "cutoff": str(cutoff),
+        "deleted": deleted,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    if archive:
+        out["archive_dir"] = os.path.abspath(settings["archive_dir"])
+        out["files"] = files
+    return out
+
+
+@handler("retention_purge", resumable=True)
+def _purge_job(job, older_than_days, tables=TABLES, batch=None, sleep_ms=None, resume=None):
+    return run_retention(older_than_days, tables, False, batch, sleep_ms, job.progress, job.checkpoint, resume)
+
+
+@handler("retention_archive", resumable=True)
+def _archive_job(job, older_than_days, tables=TABLES, batch=None, sleep_ms=None, resume=None):
+    return run_retention(older_than_days, tables, True, batch, sleep_ms, job.progress, job.checkpoint, resume)
+
+
+def parse_request(args, default_days=None):
+    """Job params from query args; raises ValueError on bad input."""
+    raw = args.get("older_than_days", default_days)
+    if raw in (None, ""):
+        raise ValueError("older_than_days is required")
+    older_than_days = int(raw)
+    if older_than_days < 1:
+        raise ValueError("older_than_days must be >= 1")
+    tables = [t.strip() for t in (args.get("tables") or ",".join(TABLES)).split(",") if t.strip()]
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        raise ValueError(f"tables must be among: {', '.join(TABLES)}")
+    params = {"older_than_days": older_than_days, "tables": tables}
+    if args.get("batch"):
+        params["batch"] = max(1, min(10000, int(args["batch"])))
+    if args.get("sleep_ms"):
+        params["sleep_ms"] = max(0, min(10000, int(args["sleep_ms"])))
+    return params
+
+
+def submit(kind, args, default_days=None):
+    """Queue a retention job from request args; the (response, status) pair for both route sets."""
+    try:
+        params = parse_request(args, default_days)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        job_id = job_runner.submit(kind, params)
+        return jsonify({"jobID": job_id, "status": "queued", "poll": f"/jobs/{job_id}", **params}), 202
+    except Exception as e:
+        current_app.logger.error(f"{kind} submit error: {e}")
+        return jsonify({"error": str(e)}), 500
@@ -1,24 +1,62 @@
+from datetime import datetime
+
 from flask import Blueprint, request, jsonify, current_app
 from backend.db_connection import db
-from mysql.connector import Error
+from backend.orders.rollup import add_orders, apply_contributions, order_contributions, remove_orders
+from backend.cache import metrics_cache
+from backend.pagination import CursorError, decode_cursor, keyset_predicate, page_limit, paginate
+from pymysql import MySQLError as Error
 
 
 orders = Blueprint("orders", __name__)
 
+MAX_CHECKOUT_SPOTS = 200
+MAX_STATUS_IDS = 1000
+
+# Payment status of an order `o`: queued (unpaid) or processed (paid).
+# Both joins are primary-key lookups.
+ORDER_STATUS_COLUMNS = (
+    "CASE WHEN t.orderID IS NOT NULL THEN 'UNPAID' "
+    "WHEN p.orderID IS NOT NULL THEN 'PAID' ELSE 'UNKNOWN' END AS paymentStatus, "
+    "t.status AS queueStatus, p.processTime"
+)
+ORDER_STATUS_JOINS = (
+    "LEFT JOIN ToBeProcessedOrder t ON t.orderID = o.orderID "
+    "LEFT JOIN ProcessedOrder p ON p.orderID = o.orderID"
+)
+
 
 @orders.route("/processed_orders", methods=["GET"])
 def list_processed_orders():
+    """
+    Optional: cursor=<next_cursor> (empty for the first page) & limit=
+    for keyset pagination over (processTime, orderID); returns {data, next_cursor}.
+    """
     try:
+        query = "SELECT orderID, processTime, processorID FROM ProcessedOrder"
+        params = []
+        keyset = "cursor" in request.args
+        scope = "processed_orders"
+        if keyset:
+            limit = page_limit(request.args, default=500)
+            after = decode_cursor(request.args.get("cursor", ""), scope)
+            if after is not None:
+                pred, params = keyset_predicate("processTime", "orderID", True, after)
+                query += f" WHERE {pred}"
+        query += " ORDER BY processTime DESC, orderID DESC"
+        if keyset:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
         cursor = db.get_db().cursor()
-        cursor.execute(
-            (
-                "SELECT orderID, processTime, processorID "
-                "FROM ProcessedOrder ORDER BY processTime DESC, orderID DESC"
-            )
-        )
+        cursor.execute(query, tuple(params))
         data = cursor.fetchall()
         cursor.close()
+        if keyset:
+            return jsonify(paginate(data, limit, scope, lambda r: [r["processTime"], r["orderID"]])), 200
         return jsonify(data), 200
+    except CursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Error as e:
         current_app.logger.error(f"list_processed_orders error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -26,6 +64,11 @@ def list_processed_orders():
 
 @orders.route("/orders", methods=["GET"])
 def list_orders():
+    """
+    Optional filters: cID, start_date, end_date.
+    Optional: cursor=<next_cursor> (empty for the first page) & limit=
+    for keyset pagination over (date, orderID); returns {data, next_cursor}.
+    """
     try:
         c_id = request.args.get("cID")
         start_date = request.args.get("start_date")
@@ -42,13 +85,30 @@ def list_orders():
         if end_date:
             query += " AND date <= %s"
             params.append(end_date)
+
+        keyset = "cursor" in request.args
+        scope = "orders"
+        if keyset:
+            limit = page_limit(request.args, default=500)
+            after = decode_cursor(request.args.get("cursor", ""), scope)
+            if after is not None:
+                pred, pred_params = keyset_predicate("date", "orderID", True, after)
+                query += f" AND {pred}"
+                params += pred_params
         query += " ORDER BY date DESC, orderID DESC"
+        if keyset:
+            query += " LIMIT %s"
+            params.append(limit + 1)
 
         cursor = db.get_db().cursor()
         cursor.execute(query, tuple(params))
         rows = cursor.fetchall()
         cursor.close()
+        if keyset:
+            return jsonify(paginate(rows, limit, scope, lambda r: [r["date"], r["orderID"]])), 200
         return jsonify(rows), 200
+    except CursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Error as e:
         current_app.logger.error(f"list_orders error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -74,14 +134,111 @@ def create_order():
             "INSERT INTO ToBeProcessedOrder (orderID, status) VALUES (%s, %s)",
             (new_id, "in_chart"),
         )
+        add_orders(cursor, [new_id])
         db.get_db().commit()
         cursor.close()
+        metrics_cache.invalidate("orders")
         return jsonify({"message": "created", "orderID": new_id}), 201
     except Error as e:
         current_app.logger.error(f"create_order error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@orders.route("/orders/checkout", methods=["POST"])
+def checkout():
+    """
+    Create an order for a cart in one transaction.
+    Body: {"cID": 1, "date": "2025-01-31", "spotIDs": [3, 7, 9]}
+    The spots are locked, checked for availability (status 'free' and not
+    on another unprocessed order) and priced from their current price; then
+    Orders, SpotOrder (one multi-row insert) and ToBeProcessedOrder are
+    written and committed together. Unavailable spots give 409 and nothing
+    is written.
+    """
+    payload = request.get_json(silent=True) or {}
+    missing = [f for f in ("cID", "date", "spotIDs") if f not in payload]
+    if missing:
+        return jsonify({"error": f"Missing fields: {', '.join(missing)}"}), 400
+    raw_ids = payload["spotIDs"]
+    if not isinstance(raw_ids, list) or not all(
+        isinstance(s, int) and not isinstance(s, bool) for s in raw_ids
+    ):
+        return jsonify({"error": "spotIDs must be a list of integers"}), 400
+    try:
+        order_date = datetime.strptime(str(payload["date"]), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    spot_ids = sorted(set(raw_ids))
+    if not spot_ids:
+        return jsonify({"error": "spotIDs is empty"}), 400
+    if len(spot_ids) > MAX_CHECKOUT_SPOTS:
+        return jsonify({"error": f"at most {MAX_CHECKOUT_SPOTS} spots per order"}), 400
+
+    conn = db.get_db()
+    cursor = conn.cursor()
+    try:
+        # Start a fresh transaction and lock the spots before any plain read:
+        # under REPEATABLE READ the first plain read fixes the snapshot, so a
+        # checkout that waited on these locks must not have taken one yet.
+        conn.begin()
+        marks = ",".join(["%s"] * len(spot_ids))
+        cursor.execute(
+            f"SELECT spotID, price, status FROM Spot WHERE spotID IN ({marks}) FOR UPDATE",
+            tuple(spot_ids),
+        )
+        spots = {r["spotID"]: r for r in cursor.fetchall()}
+        # Locking read: sees (and holds) the rows of checkouts committed while we waited
+        cursor.execute(
+            "SELECT DISTINCT so.spotID FROM SpotOrder so "
+            "JOIN ToBeProcessedOrder t ON t.orderID = so.orderID "
+            f"WHERE so.spotID IN ({marks}) FOR SHARE",
+            tuple(spot_ids),
+        )
+        pending = {r["spotID"] for r in cursor.fetchall()}
+
+        cursor.execute("SELECT 1 FROM Customers WHERE cID = %s", (payload["cID"],))
+        if not cursor.fetchone():
+            conn.rollback()
+            return jsonify({"error": "Customer not found"}), 404
+
+        unavailable = []
+        for sid in spot_ids:
+            if sid not in spots:
+                unavailable.append({"spotID": sid, "reason": "not found"})
+            elif spots[sid]["status"] != "free":
+                unavailable.append({"spotID": sid, "reason": f"status {spots[sid]['status']}"})
+            elif sid in pending:
+                unavailable.append({"spotID": sid, "reason": "on another open order"})
+        if unavailable:
+            conn.rollback()
+            return jsonify({"error": "Some spots are not available", "unavailable": unavailable}), 409
+
+        total = sum(spots[sid]["price"] or 0 for sid in spot_ids)
+        cursor.execute(
+            "INSERT INTO Orders (date, total, cID) VALUES (%s, %s, %s)",
+            (order_date, total, payload["cID"]),
+        )
+        new_id = cursor.lastrowid
+        cursor.execute(
+            "INSERT INTO SpotOrder (orderID, spotID) VALUES " + ",".join(["(%s, %s)"] * len(spot_ids)),
+            tuple(v for sid in spot_ids for v in (new_id, sid)),
+        )
+        cursor.execute(
+            "INSERT INTO ToBeProcessedOrder (orderID, status) VALUES (%s, %s)",
+            (new_id, "in_chart"),
+        )
+        add_orders(cursor, [new_id])
+        conn.commit()
+        metrics_cache.invalidate("orders")
+        return jsonify({"message": "created", "orderID": new_id, "total": total, "spotIDs": spot_ids}), 201
+    except Error as e:
+        conn.rollback()
+        current_app.logger.error(f"checkout error: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        cursor.close()
+
+
 @orders.route("/orders", methods=["PUT"])
 def update_order_start_date():
     try:
@@ -102,12 +259,15 @@ def update_order_start_date():
             cursor.close()
             return jsonify({"error": "Order is already processed or does not exist"}), 400
 
+        before = order_contributions(cursor, [payload["orderID"]])
         cursor.execute(
             "UPDATE Orders SET date = %s WHERE orderID = %s",
             (payload["date"], payload["orderID"]),
         )
+        apply_contributions(cursor, before, order_contributions(cursor, [payload["orderID"]]))
         db.get_db().commit()
         cursor.close()
+        metrics_cache.invalidate("orders")
         return jsonify({"message": "updated", "orderID": payload["orderID"]}), 200
     except Error as e:
         current_app.logger.error(f"update_order_start_date error: {e}")
@@ -132,15 +292,48 @@ def delete_unprocessed_order():
             cursor.close()
             return jsonify({"error": "Order is already processed or does not exist"}), 400
 
+        remove_orders(cursor, [order_id])
         cursor.execute("DELETE FROM Orders WHERE orderID = %s", (order_id,))
         db.get_db().commit()
         cursor.close()
+        metrics_cache.invalidate("orders")
         return jsonify({"message": "deleted", "orderID": int(order_id)}), 200
     except Error as e:
         current_app.logger.error(f"delete_unprocessed_order error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@orders.route("/orders/status", methods=["GET"])
+def order_status():
+    """
+    Payment status for the given orders only.
+    Query: ids=1,2,3 (or repeated ids=); at most MAX_STATUS_IDS.
+    Returns [{orderID, paymentStatus: PAID|UNPAID|UNKNOWN, queueStatus, processTime}]
+    for the ids that exist.
+    """
+    try:
+        ids = sorted({int(x) for raw in request.args.getlist("ids") for x in raw.split(",") if x.strip()})
+    except ValueError:
+        return jsonify({"error": "ids must be comma-separated integers"}), 400
+    if not ids:
+        return jsonify([]), 200
+    if len(ids) > MAX_STATUS_IDS:
+        return jsonify({"error": f"at most {MAX_STATUS_IDS} ids"}), 400
+    try:
+        cursor = db.get_db().cursor()
+        cursor.execute(
+            f"SELECT o.orderID, {ORDER_STATUS_COLUMNS} FROM Orders o {ORDER_STATUS_JOINS} "
+            f"WHERE o.orderID IN ({','.join(['%s'] * len(ids))}) ORDER BY o.orderID",
+            tuple(ids),
+        )
+        rows = cursor.fetchall()
+        cursor.close()
+        return jsonify(rows), 200
+    except Error as e:
+        current_app.logger.error(f"order_status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @orders.route("/orders/<int:order_id>", methods=["GET"])
 def get_order(order_id: int):
     try:
@@ -161,14 +354,35 @@ def get_order(order_id: int):
 
 @orders.route("/to_be_processed_order", methods=["GET"])
 def list_to_be_processed_orders():
+    """
+    Optional: cursor=<next_cursor> (empty for the first page) & limit=
+    for keyset pagination over orderID; returns {data, next_cursor}.
+    """
     try:
+        query = "SELECT orderID, status FROM ToBeProcessedOrder"
+        params = []
+        keyset = "cursor" in request.args
+        scope = "to_be_processed_order"
+        if keyset:
+            limit = page_limit(request.args, default=500)
+            after = decode_cursor(request.args.get("cursor", ""), scope)
+            if after is not None:
+                pred, params = keyset_predicate(None, "orderID", True, after)
+                query += f" WHERE {pred}"
+        query += " ORDER BY orderID DESC"
+        if keyset:
+            query += " LIMIT %s"
+            params.append(limit + 1)
+
         cursor = db.get_db().cursor()
-        cursor.execute(
-            "SELECT orderID, status FROM ToBeProcessedOrder ORDER BY orderID DESC"
-        )
+        cursor.execute(query, tuple(params))
         data = cursor.fetchall()
         cursor.close()
+        if keyset:
+            return jsonify(paginate(data, limit, scope, lambda r: [r["orderID"]])), 200
         return jsonify(data), 200
+    except CursorError as e:
+        return jsonify({"error": str(e)}), 400
     except Error as e:
         current_app.logger.error(f"list_to_be_processed_orders error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,239 @@
+"""
+Order processing: moves orders from ToBeProcessedOrder to ProcessedOrder.
+
+A worker repeatedly claims a batch of pending orders with
+    SELECT ... FROM ToBeProcessedOrder ORDER BY orderID LIMIT n
+    FOR UPDATE SKIP LOCKED
+so several workers (threads, processes or hosts) each get different orders
+without waiting on one another. In the same transaction it records the
+orders in ProcessedOrder with the processor's eID, marks their spots 'inuse'
+until the latest order date (Orders.date is the order's end date), and
+deletes the claimed ToBeProcessedOrder rows. Spot rows are locked in spotID
+order, so two batches sharing a spot queue up instead of deadlocking.
+
+Checkout (orders_routes.py) locks Spot rows before the pending orders, the
+opposite order, so a checkout for a spot of an order being processed can
+deadlock with a batch (or time out waiting for it). MySQL rolls the batch
+back; it is retried up to BATCH_RETRIES times before the worker gives up,
+and errors are reported to the caller (HTTP 500 / CLI exit status).
+
+Run from the command line:
+    flask --app backend_app process-orders --processor 1 [--workers 4] [--batch 100]
+or through POST /salesman/orders/process. Throughput counters for this
+process are in processing_stats (GET /salesman/orders/process/stats).
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+import click
+from flask.cli import with_appcontext
+from pymysql import MySQLError
+
+from backend.cache import metrics_cache
+from backend.db_connection import db
+from backend.spots.spot_index import spot_index
+
+DEFAULT_BATCH = 100
+MAX_BATCH = 1000
+BATCH_RETRIES = 5
+RETRY_BACKOFF_S = 0.05
+# deadlock found / lock wait timeout: the batch was rolled back and can simply run again
+_RETRYABLE = (1213, 1205)
+
+
+class ProcessingStats:
+    """Counters since process start, shared by every worker thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.batches = 0
+        self.orders = 0
+        self.spots = 0
+        self.errors = 0
+        self.busy_s = 0.0
+        self.last_error = None
+        self.last_run_at = None
+
+    def record(self, orders=0, spots=0, elapsed=0.0, error=None):
+        with self._lock:
+            if error is not None:
+                self.errors += 1
+                self.last_error = error
+            else:
+                self.batches += 1
+                self.orders += orders
+                self.spots += spots
+            self.busy_s += elapsed
+            self.last_run_at = time.time()
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "orders": self.orders,
+                "spots": self.spots,
+                "errors": self.errors,
+                "busy_s": round(self.busy_s, 3),
+                "orders_per_s": round(self.orders / self.busy_s, 1) if self.busy_s else None,
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "last_run_at": self.last_run_at,
+                "last_error": self.last_error,
+            }
+
+
+processing_stats = ProcessingStats()
+
+
+def _in(values):
+    return ",".join(["%s"] * len(values))
+
+
+def process_batch(conn, processor_id: int, batch: int = DEFAULT_BATCH):
+    """
+    Claim and process up to `batch` pending orders in one transaction.
+    Returns (orders processed, spot ids updated); (0, []) when none are left.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT orderID FROM ToBeProcessedOrder ORDER BY orderID LIMIT %s "
+            "FOR UPDATE SKIP LOCKED",
+            (batch,),
+        )
+        order_ids = [r["orderID"] for r in cur.fetchall()]
+        if not order_ids:
+            conn.rollback()
+            return 0, []
+
+        cur.execute(
+            "SELECT so.spotID, MAX(o.date) AS end_date FROM SpotOrder so "
+            "JOIN Orders o ON o.orderID = so.orderID "
+            f"WHERE so.orderID IN ({_in(order_ids)}) GROUP BY so.spotID ORDER BY so.spotID",
+            tuple(order_ids),
+        )
+        ends = cur.fetchall()
+        spot_ids = [r["spotID"] for r in ends]
+        if spot_ids:
+            cur.execute(
+                f"SELECT spotID FROM Spot WHERE spotID IN ({_in(spot_ids)}) ORDER BY spotID FOR UPDATE",
+                tuple(spot_ids),
+            )
+            # GREATEST() is NULL if either side is; keep the old end date then
+            cur.executemany(
+                "UPDATE Spot SET status = 'inuse', endTimeOfCurrentOrder = COALESCE("
+                "GREATEST(COALESCE(endTimeOfCurrentOrder, %s), %s), endTimeOfCurrentOrder) "
+                "WHERE spotID = %s",
+                [(r["end_date"], r["end_date"], r["spotID"]) for r in ends],
+            )
+
+        cur.execute(
+            "INSERT INTO ProcessedOrder (orderID, processTime, processorID) "
+            f"SELECT orderID, NOW(), %s FROM ToBeProcessedOrder WHERE orderID IN ({_in(order_ids)}) "
+            "ON DUPLICATE KEY UPDATE processTime = ProcessedOrder.processTime",
+            (processor_id, *order_ids),
+        )
+        cur.execute(
+            f"DELETE FROM ToBeProcessedOrder WHERE orderID IN ({_in(order_ids)})",
+            tuple(order_ids),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    spot_index.refresh_spots(spot_ids, conn)
+    return len(order_ids), spot_ids
+
+
+def _process_with_retry(conn, processor_id, batch, logger=None):
+    for attempt in range(BATCH_RETRIES + 1):
+        try:
+            return process_batch(conn, processor_id, batch)
+        except MySQLError as e:
+            if not (e.args and e.args[0] in _RETRYABLE) or attempt == BATCH_RETRIES:
+                raise
+            if logger:
+                logger.warning(f"order processing batch retried after: {e}")
+            time.sleep(RETRY_BACKOFF_S * (2 ** attempt))
+
+
+def run_worker(processor_id: int, batch: int = DEFAULT_BATCH, max_batches: int | None = None,
+               logger=None):
+    """
+    Process batches until the queue is empty (or max_batches).
+    Returns (orders processed, error message or None).
+    """
+    conn = db.connect()
+    total = done = 0
+    error = None
+    try:
+        while max_batches is None or done < max_batches:
+            started = time.perf_counter()
+            try:
+                n, spot_ids = _process_with_retry(conn, processor_id, batch, logger)
+            except Exception as e:
+                error = str(e)
+                processing_stats.record(elapsed=time.perf_counter() - started, error=error)
+                if logger:
+                    logger.error(f"order processing batch error: {e}")
+                break
+            if not n:
+                break
+            processing_stats.record(n, len(spot_ids), time.perf_counter() - started)
+            metrics_cache.invalidate("orders", "spots")
+            total += n
+            done += 1
+    finally:
+        conn.close()
+    return total, error
+
+
+def run_workers(processor_id: int, workers: int = 1, batch: int = DEFAULT_BATCH,
+                max_batches: int | None = None, logger=None):
+    """Run `workers` threads against the queue; returns (orders processed, [errors])."""
+    if workers <= 1:
+        n, error = run_worker(processor_id, batch, max_batches, logger)
+        return n, [error] if error else []
+    results = [(0, None)] * workers
+
+    def work(i):
+        results[i] = run_worker(processor_id, batch, max_batches, logger)
+
+    threads = [threading.Thread(target=work, args=(i,), name=f"order-worker-{i}", daemon=True)
+               for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(n for n, _ in results), [e for _, e in results if e]
+
+
+@click.command("process-orders")
+@click.option("--processor", "processor_id", required=True, type=int, help="SalesMan eID recorded as processor.")
+@click.option("--workers", default=1, show_default=True, help="Parallel worker threads.")
+@click.option("--batch", default=DEFAULT_BATCH, show_default=True, help="Orders claimed per transaction.")
+@click.option("--max-batches", default=None, type=int, help="Stop each worker after this many batches.")
+@click.option("--follow", is_flag=True, help="Keep polling for new orders instead of exiting when idle.")
+@click.option("--interval", default=5.0, show_default=True, help="Seconds between polls with --follow.")
+@with_appcontext
+def process_orders_command(processor_id, workers, batch, max_batches, follow, interval):
+    """Move pending orders to ProcessedOrder and mark their spots in use."""
+    batch = max(1, min(MAX_BATCH, batch))
+    while True:
+        n, errors = run_workers(processor_id, workers, batch, max_batches)
+        stats = processing_stats.as_dict()
+        click.echo(f"processed {n} order(s); totals: {stats['orders']} orders, "
+                   f"{stats['batches']} batches, {stats['errors']} errors, "
+                   f"{stats['orders_per_s']} orders/s")
+        for error in errors:
+            click.echo(f"worker stopped: {error}", err=True)
+        if not follow:
+            if errors:
+                raise click.exceptions.Exit(1)
+            break
+        time.sleep(interval)
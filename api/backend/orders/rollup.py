@@ -0,0 +1,351 @@
+"""
+Daily order rollups, so period metrics read a few hundred rollup rows
+instead of scanning Orders:
+  OrderDailyRollup:  day -> orders, revenue, distinct customers
+  RegionDailyRollup: (day, region) -> orders, revenue, through SpotOrder;
+                     an order's total is split evenly across its spots and
+                     orders without spots have no region.
+
+Writes update the rollups incrementally, in the same transaction as the
+orders: the contribution of each order touched (its day, total, and spots
+per region) is read before and after the change, and only the difference
+is added with INSERT ... ON DUPLICATE KEY UPDATE:
+
+    before = order_contributions(cursor, [order_id])
+    ...UPDATE Orders / SpotOrder / Spot.region...
+    apply_contributions(cursor, before, order_contributions(cursor, [order_id]))
+
+(add_orders / remove_orders for plain inserts and deletes). A write only
+locks its own orders and the rollup rows of their days, taken in day
+order, so concurrent orders on the same day queue briefly on the rollup
+row instead of re-aggregating the day. The distinct customer count cannot
+be kept incrementally; customer_counts recounts the touched days in a
+background thread shortly after the write commits.
+
+refresh_days(cursor, days) still rebuilds whole days; it is meant for
+retention and backfill. Orders with a NULL date have no rollup row;
+period_totals() adds them to the all-time figures directly.
+
+Backfill (after importing orders by hand, or on an existing database):
+    flask --app backend_app backfill-rollup [--since YYYY-MM-DD]
+"""
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+
+from backend.db_connection import db
+
+BACKFILL_CHUNK_DAYS = 366
+CUSTOMER_COUNT_DELAY = 2.0
+
+# one order's share of the rollups: regions maps region -> number of its spots there
+Contribution = namedtuple("Contribution", "orderID day total regions")
+
+_ORDER_ROLLUP_SELECT = (
+    "SELECT date, COUNT(*), COALESCE(SUM(total), 0), COUNT(DISTINCT cID) FROM Orders "
+)
+_REGION_ROLLUP_SELECT = (
+    "SELECT COALESCE(s.region, 'Unassigned'), o.date, COUNT(DISTINCT o.orderID), "
+    "COALESCE(SUM(o.total / (SELECT COUNT(*) FROM SpotOrder x WHERE x.orderID = o.orderID)), 0) "
+    "FROM Orders o JOIN SpotOrder so ON so.orderID = o.orderID JOIN Spot s ON s.spotID = so.spotID "
+)
+
+
+def _rebuild(cursor, where_orders, where_region, where_day, params):
+    cursor.execute(f"DELETE FROM OrderDailyRollup WHERE {where_day}", params)
+    cursor.execute(f"DELETE FROM RegionDailyRollup WHERE {where_day}", params)
+    written = cursor.execute(
+        "INSERT INTO OrderDailyRollup (day, orders, revenue, customers) "
+        f"{_ORDER_ROLLUP_SELECT} WHERE {where_orders} GROUP BY date",
+        params,
+    )
+    cursor.execute(
+        "INSERT INTO RegionDailyRollup (region, day, orders, revenue) "
+        f"{_REGION_ROLLUP_SELECT} WHERE {where_region} "
+        "GROUP BY COALESCE(s.region, 'Unassigned'), o.date",
+        params,
+    )
+    return written
+
+
+def _day(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def refresh_days(cursor, days) -> None:
+    """Recompute the rollup rows of the given order dates (None is ignored)."""
+    days = sorted({d for d in (_day(v) for v in days) if d is not None})
+    if not days:
+        return
+    marks = ",".join(["%s"] * len(days))
+    _rebuild(cursor, f"date IN ({marks})", f"o.date IN ({marks})", f"day IN ({marks})", tuple(days))
+
+
+def order_contributions(cursor, order_ids):
+    """
+    Current rollup contribution of each dated order. The Orders rows are
+    locked (the caller is about to change them) and the spot/region read is
+    a locking read, so both see the latest committed state.
+    """
+    ids = sorted({int(i) for i in order_ids if i is not None})
+    if not ids:
+        return []
+    marks = ",".join(["%s"] * len(ids))
+    cursor.execute(
+        f"SELECT orderID, date, total FROM Orders WHERE orderID IN ({marks}) ORDER BY orderID FOR UPDATE",
+        tuple(ids),
+    )
+    orders = [r for r in cursor.fetchall() if r["date"] is not None]
+    if not orders:
+        return []
+    cursor.execute(
+        "SELECT so.orderID, COALESCE(s.region, 'Unassigned') AS region, COUNT(*) AS n "
+        "FROM SpotOrder so JOIN Spot s ON s.spotID = so.spotID "
+        f"WHERE so.orderID IN ({marks}) GROUP BY so.orderID, COALESCE(s.region, 'Unassigned') FOR SHARE",
+        tuple(ids),
+    )
+    regions = defaultdict(dict)
+    for r in cursor.fetchall():
+        regions[r["orderID"]][r["region"]] = int(r["n"])
+    return [Contribution(r["orderID"], _day(r["date"]), r["total"], regions.get(r["orderID"], {}))
+            for r in orders]
+
+
+def apply_contributions(cursor, removed=(), added=()) -> None:
+    """Add the difference between the `added` and `removed` contributions to the rollups."""
+    orders = defaultdict(lambda: [0, Decimal(0)])
+    regions = defaultdict(lambda: [0, Decimal(0)])
+    for sign, contributions in ((-1, removed), (1, added)):
+        for c in contributions:
+            if c.day is None:
+                continue
+            total = Decimal(str(c.total or 0))
+            orders[c.day][0] += sign
+            orders[c.day][1] += sign * total
+            spots = sum(c.regions.values())
+            for region, n in c.regions.items():
+                regions[(c.day, region)][0] += sign
+                regions[(c.day, region)][1] += sign * total * n / spots
+    order_rows = [(day, n, revenue) for day, (n, revenue) in sorted(orders.items()) if n or revenue]
+    region_rows = [(day, region, n, round(revenue, 2))
+                   for (day, region), (n, revenue) in sorted(regions.items()) if n or revenue]
+    if order_rows:
+        cursor.executemany(
+            "INSERT INTO OrderDailyRollup (day, orders, revenue, customers) VALUES (%s, %s, %s, 0) AS d "
+            "ON DUPLICATE KEY UPDATE orders = OrderDailyRollup.orders + d.orders, "
+            "revenue = OrderDailyRollup.revenue + d.revenue",
+            order_rows,
+        )
+    if region_rows:
+        cursor.executemany(
+            "INSERT INTO RegionDailyRollup (day, region, orders, revenue) VALUES (%s, %s, %s, %s) AS d "
+            "ON DUPLICATE KEY UPDATE orders = RegionDailyRollup.orders + d.orders, "
+            "revenue = RegionDailyRollup.revenue + d.revenue",
+            region_rows,
+        )
+    emptied = sorted({row[0] for row in order_rows + region_rows if row[-2] < 0})
+    if emptied:  # drop rows whose last order went away, as a rebuild would
+        marks = ",".join(["%s"] * len(emptied))
+        cursor.execute(f"DELETE FROM OrderDailyRollup WHERE day IN ({marks}) AND orders = 0", tuple(emptied))
+        cursor.execute(f"DELETE FROM RegionDailyRollup WHERE day IN ({marks}) AND orders = 0", tuple(emptied))
+    customer_counts.mark({c.day for group in (removed, added) for c in group})
+
+
+def add_orders(cursor, order_ids) -> None:
+    """Count newly written orders (call after their Orders/SpotOrder rows are inserted)."""
+    apply_contributions(cursor, added=order_contributions(cursor, order_ids))
+
+
+def remove_orders(cursor, order_ids) -> None:
+    """Take orders out of the rollups (call before deleting them)."""
+    apply_contributions(cursor, removed=order_contributions(cursor, order_ids))
+
+
+class CustomerCounts:
+    """
+    Recounts OrderDailyRollup.customers for days whose orders changed, off
+    the request path: mark() queues the days and a background thread
+    recounts them CUSTOMER_COUNT_DELAY seconds later, on its own connection
+    and after the writer has committed. The recount is a plain consistent
+    read, so it takes no locks on Orders.
+    """
+
+    def __init__(self, delay=CUSTOMER_COUNT_DELAY):
+        self.delay = delay
+        self.logger = None
+        self._lock = threading.Lock()
+        self._days = set()
+        self._thread = None
+        atexit.register(self.flush)
+
+    def init_app(self, app):
+        self.logger = app.logger
+        self.delay = float(app.config.get("ROLLUP_CUSTOMER_DELAY", self.delay))
+
+    def mark(self, days):
+        days = {d for d in days if d is not None}
+        if not days:
+            return
+        with self._lock:
+            self._days |= days
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="rollup-customers", daemon=True)
+                self._thread.start()
+
+    def _take(self):
+        with self._lock:
+            days, self._days = self._days, set()
+            return days
+
+    def _run(self):
+        while True:
+            time.sleep(self.delay)
+            days = self._take()
+            if not days:
+                with self._lock:
+                    if not self._days:
+                        self._thread = None
+                        return
+                continue
+            try:
+                self.recount(days)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"rollup customer recount failed, retrying: {e}")
+                with self._lock:
+                    self._days |= days
+
+    def flush(self):
+        """Recount queued days now (process exit, CLI commands)."""
+        days = self._take()
+        if days:
+            try:
+                self.recount(days)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"rollup customer recount failed: {e}")
+
+    def recount(self, days):
+        days = sorted(days)
+        conn = db.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT date, COUNT(DISTINCT cID) AS n FROM Orders "
+                f"WHERE date IN ({','.join(['%s'] * len(days))}) GROUP BY date",
+                tuple(days),
+            )
+            counts = {_day(r["date"]): int(r["n"]) for r in cursor.fetchall()}
+            cursor.executemany("UPDATE OrderDailyRollup SET customers = %s WHERE day = %s",
+                               [(counts.get(d, 0), d) for d in days])
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+
+customer_counts = CustomerCounts()
+
+
+def spot_order_ids(cursor, spot_ids):
+    """Ids of the orders the given spots belong to."""
+    ids = [int(i) for i in spot_ids]
+    if not ids:
+        return []
+    cursor.execute(
+        f"SELECT DISTINCT orderID FROM SpotOrder WHERE spotID IN ({','.join(['%s'] * len(ids))})",
+        tuple(ids),
+    )
+    return [r["orderID"] for r in cursor.fetchall()]
+
+
+def backfill(conn, since=None) -> int:
+    """Rebuild the rollups from Orders, one chunk of days per transaction."""
+    cursor = conn.cursor()
+    try:
+        if since is None:
+            cursor.execute("DELETE FROM OrderDailyRollup")
+            cursor.execute("DELETE FROM RegionDailyRollup")
+        cursor.execute("SELECT MIN(date) AS lo, MAX(date) AS hi FROM Orders")
+        bounds = cursor.fetchone() or {}
+        lo, hi = _day(bounds.get("lo")), _day(bounds.get("hi"))
+        if lo is None:
+            return 0
+        lo = max(lo, _day(since)) if since else lo
+
+        written = 0
+        start = lo
+        while start <= hi:
+            end = date.fromordinal(min(start.toordinal() + BACKFILL_CHUNK_DAYS, hi.toordinal() + 1))
+            written += _rebuild(cursor, "date >= %s AND date < %s", "o.date >= %s AND o.date < %s",
+                                "day >= %s AND day < %s", (start, end))
+            conn.commit()
+            start = end
+        return written
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def period_totals(cursor, days: int) -> dict:
+    """All-time and last-`days` order figures, read from the rollup."""
+    cursor.execute(
+        "SELECT COALESCE(SUM(orders), 0) AS orders, COALESCE(SUM(revenue), 0) AS revenue, "
+        "COALESCE(SUM(CASE WHEN day >= CURDATE() - INTERVAL %s DAY THEN orders END), 0) AS period_orders, "
+        "COALESCE(SUM(CASE WHEN day >= CURDATE() - INTERVAL %s DAY THEN revenue END), 0) AS period_revenue "
+        "FROM OrderDailyRollup",
+        (days, days),
+    )
+    row = cursor.fetchone()
+    # Undated orders are not in the rollup (served by idx_orders_date)
+    cursor.execute(
+        "SELECT COUNT(*) AS orders, COALESCE(SUM(total), 0) AS revenue FROM Orders WHERE date IS NULL"
+    )
+    undated = cursor.fetchone()
+    orders = int(row["orders"]) + int(undated["orders"])
+    revenue = int(row["revenue"]) + int(undated["revenue"])
+    return {
+        "orders": orders,
+        "revenue": revenue,
+        "avg_order_value": (revenue / orders) if orders else None,
+        "period_orders": int(row["period_orders"]),
+        "period_revenue": int(row["period_revenue"]),
+    }
+
+
+def daily_series(cursor, days: int):
+    cursor.execute(
+        "SELECT day, orders, revenue, customers FROM OrderDailyRollup "
+        "WHERE day >= CURDATE() - INTERVAL %s DAY ORDER BY day",
+        (days,),
+    )
+    return cursor.fetchall()
+
+
+@click.command("backfill-rollup")
+@click.option("--since", default=None, help="Only rebuild days on/after YYYY-MM-DD.")
+@with_appcontext
+def backfill_rollup_command(since):
+    """Rebuild OrderDailyRollup and RegionDailyRollup from Orders."""
+    conn = db.connect()
+    try:
+        n = backfill(conn, since)
+    finally:
+        conn.close()
+    click.echo(f"OrderDailyRollup: {n} day(s) written")
@@ -1,20 +1,21 @@
 #owner_route.py
+from dataclasses import asdict
+
 from flask import Blueprint, request, jsonify, current_app
-import mysql.connector as mysql
+from backend.db_connection import db
+from backend.cache import metrics_cache
+from backend.customers.clients import SORTS, client_stats, period_days
+from backend.customers.scores import customer_scores
+from backend.jobs.runner import job_runner
+from backend.o_and_m import retention
+from backend.o_and_m.retention import DEFAULT_ARCHIVE_DAYS
+from backend.spots.pricing import BULK_CHUNK, PriceFilters, bulk_update, price_snapshot
+from backend.spots.regions import region_map
+from backend.spots.spot_index import spot_index
 
 owner_bp = Blueprint("owner", __name__, url_prefix="/owner")
 owner_bp.strict_slashes = False
 
-def _get_conn():
-    cfg = current_app.config
-    return mysql.connect(
-        host=cfg.get("MYSQL_DATABASE_HOST", "127.0.0.1"),
-        port=int(cfg.get("MYSQL_DATABASE_PORT", 3306)),
-        user=cfg.get("MYSQL_DATABASE_USER", "root"),
-        password=cfg.get("MYSQL_DATABASE_PASSWORD", "changeme"),
-        database=cfg.get("MYSQL_DATABASE_DB", "SpotLight"),
-    )
-
 def _table_exists(cur, name):
     cur.execute("SHOW TABLES LIKE %s", (name,))
     return cur.fetchone() is not None
@@ -27,71 +28,320 @@ def _column_exists(cur, table, column):
 def metrics():
     """High-level counts for the ads company owner."""
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        out = {}
-        for t in ("Spot", "Customers", "Orders", "Reviews", "Employee", "SalesMan"):
-            cur.execute("SELECT COUNT(*) AS n FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", (t,))
-            if cur.fetchone()["n"]:
-                cur.execute(f"SELECT COUNT(*) AS cnt FROM `{t}`")
-                out[f"{t.lower()}_count"] = cur.fetchone()["cnt"]
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            out = {}
+            for t in ("Spot", "Customers", "Orders", "Reviews", "Employee", "SalesMan"):
+                cur.execute("SELECT COUNT(*) AS n FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s", (t,))
+                if cur.fetchone()["n"]:
+                    cur.execute(f"SELECT COUNT(*) AS cnt FROM `{t}`")
+                    out[f"{t.lower()}_count"] = cur.fetchone()["cnt"]
+
+            # Spot status breakdown (only if column exists)
+            if _table_exists(cur, "Spot") and _column_exists(cur, "Spot", "status"):
+                cur.execute("SELECT status, COUNT(*) AS cnt FROM Spot GROUP BY status ORDER BY cnt DESC")
+                out["spot_status"] = cur.fetchall()
 
-        # Spot status breakdown (only if column exists)
-        if _table_exists(cur, "Spot") and _column_exists(cur, "Spot", "status"):
-            cur.execute("SELECT status, COUNT(*) AS cnt FROM Spot GROUP BY status ORDER BY cnt DESC")
-            out["spot_status"] = cur.fetchall()
+            return jsonify(out), 200
+        finally:
+            cur.close(); conn.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
+def _period_days(default=90):
+    """?period=90d / 90 -> 90 (falls back to `default`)."""
+    return period_days(request.args.get("period"), default)
+
+def _load_overview(days):
+    """Owner KPIs in one statement: spot counts, VIPs and period revenue (OrderDailyRollup)."""
+    conn = db.connect(); cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(
+            "SELECT s.total, s.in_use, s.free, s.with_issue, c.vip, r.orders, r.revenue "
+            "FROM (SELECT COUNT(*) AS total, "
+            "             COALESCE(SUM(status = 'inuse'), 0) AS in_use, "
+            "             COALESCE(SUM(status = 'free'), 0) AS free, "
+            "             COALESCE(SUM(status = 'w.issue'), 0) AS with_issue FROM Spot) s "
+            "CROSS JOIN (SELECT COALESCE(SUM(VIP = 1), 0) AS vip FROM Customers) c "
+            "CROSS JOIN (SELECT COALESCE(SUM(orders), 0) AS orders, COALESCE(SUM(revenue), 0) AS revenue "
+            "            FROM OrderDailyRollup WHERE day >= CURDATE() - INTERVAL %s DAY) r",
+            (days,),
+        )
+        row = cur.fetchone()
+    finally:
         cur.close(); conn.close()
-        return jsonify(out), 200
+    orders, revenue = int(row["orders"]), int(row["revenue"])
+    return {
+        "spots_total": int(row["total"]),
+        "spots_in_use": int(row["in_use"]),
+        "spots_free": int(row["free"]),
+        "spots_with_issue": int(row["with_issue"]),
+        "vip_count": int(row["vip"]),
+        f"orders_{days}d": orders,
+        f"revenue_{days}d": revenue,
+        "avg_order_value": round(revenue / orders, 2) if orders else 0,
+        "period_days": days,
+    }
+
+@owner_bp.get("/overview")
+def overview():
+    """
+    Owner home KPIs in one request (?period=90d). Served from the metrics
+    cache; any spot, customer or order write refreshes it.
+    """
+    days = _period_days(90)
+    try:
+        data = metrics_cache.get(("owner_overview", days), lambda: _load_overview(days),
+                                 tags=("spots", "customers", "orders"))
+        return jsonify(data), 200
     except Exception as e:
+        current_app.logger.error(f"owner overview error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def _load_region_rollup(days):
+    conn = db.connect(); cur = conn.cursor(dictionary=True)
+    try:
+        # idx_spot_region covers this GROUP BY
+        cur.execute(
+            "SELECT COALESCE(region, 'Unassigned') AS region, COUNT(*) AS spots_total, "
+            "COALESCE(SUM(status = 'inuse'), 0) AS spots_in_use, "
+            "COALESCE(SUM(estViewPerMonth), 0) AS views_month "
+            "FROM Spot GROUP BY COALESCE(region, 'Unassigned')"
+        )
+        spots = {r["region"]: r for r in cur.fetchall()}
+        cur.execute(
+            "SELECT region, SUM(orders) AS orders, SUM(revenue) AS revenue FROM RegionDailyRollup "
+            "WHERE day >= CURDATE() - INTERVAL %s DAY GROUP BY region",
+            (days,),
+        )
+        sales = {r["region"]: r for r in cur.fetchall()}
+    finally:
+        cur.close(); conn.close()
+
+    out = []
+    for region in sorted(set(spots) | set(sales)):
+        sp, sa = spots.get(region, {}), sales.get(region, {})
+        total, in_use = int(sp.get("spots_total") or 0), int(sp.get("spots_in_use") or 0)
+        out.append({
+            "region": region,
+            "spots_total": total,
+            "spots_in_use": in_use,
+            "in_use_pct": round(100.0 * in_use / total, 1) if total else 0.0,
+            f"orders_{days}d": int(sa.get("orders") or 0),
+            f"revenue_{days}d": round(float(sa.get("revenue") or 0), 2),
+            # estViewPerMonth scaled to the period
+            f"views_{days}d": int(float(sp.get("views_month") or 0) * days / 30),
+        })
+    out.sort(key=lambda r: r[f"revenue_{days}d"], reverse=True)
+    return out
+
+@owner_bp.get("/regions/rollup")
+def regions_rollup():
+    """
+    Per-region spots, in-use %, orders, revenue and views (?period=90d).
+    Regions are precomputed on Spot.region; orders/revenue come from
+    RegionDailyRollup, never from scanning Orders.
+    """
+    days = _period_days(90)
+    try:
+        region_map.ensure_assigned()
+        data = metrics_cache.get(("regions_rollup", days), lambda: _load_region_rollup(days),
+                                 tags=("spots", "orders"))
+        return jsonify(data), 200
+    except Exception as e:
+        current_app.logger.error(f"regions rollup error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@owner_bp.get("/clients/top")
+def top_clients():
+    """
+    Top clients by spend in the period, names included.
+    Query: period=90d, limit=10 (max 500), min_orders=1, sort=spend|orders|recent
+    """
+    days = _period_days(90)
+    try:
+        limit = max(1, min(500, int(request.args.get("limit", 10))))
+        min_orders = max(1, int(request.args.get("min_orders", 1)))
+    except ValueError:
+        return jsonify({"error": "limit/min_orders must be integers"}), 400
+    sort = request.args.get("sort", "spend")
+    if sort not in SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORTS)}"}), 400
+    try:
+        return jsonify(client_stats(days, min_orders, limit, sort)), 200
+    except Exception as e:
+        current_app.logger.error(f"top clients error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@owner_bp.get("/customers/scores")
+def customers_scores():
+    """
+    RFM scores for customers with orders in the period, best first.
+    Query: period=90d, limit (optional, >= 1), suggest_only=1 (VIP suggestions only)
+    """
+    days = _period_days(90)
+    try:
+        limit = max(1, int(request.args["limit"])) if request.args.get("limit") else None
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        rows = customer_scores(days)
+        if request.args.get("suggest_only") in ("1", "true", "yes"):
+            rows = [r for r in rows if r["suggest_vip"]]
+        return jsonify(rows[:limit] if limit else rows), 200
+    except Exception as e:
+        current_app.logger.error(f"customer scores error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+def _parse_bool(value):
+    """JSON true/false, 1/0 or "true"/"false"/"yes"/"no"; ValueError otherwise."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    s = str(value).strip().lower()
+    if s in ("1", "true", "yes"):
+        return True
+    if s in ("0", "false", "no"):
+        return False
+    raise ValueError("VIP must be true or false")
+
+@owner_bp.put("/customers/<int:cid>/vip")
+def set_customer_vip(cid: int):
+    """Body: {"VIP": true|false}"""
+    body = request.get_json(silent=True) or {}
+    if "VIP" not in body:
+        return jsonify({"error": "VIP is required"}), 400
+    try:
+        vip = _parse_bool(body["VIP"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute("SELECT 1 FROM Customers WHERE cID=%s", (cid,))
+            if cur.fetchone() is None:
+                return jsonify({"error": "customer not found"}), 404
+            cur.execute("UPDATE Customers SET VIP=%s WHERE cID=%s", (1 if vip else 0, cid))
+            conn.commit()
+            metrics_cache.invalidate("customers")
+            return jsonify({"cID": cid, "VIP": vip}), 200
+        finally:
+            cur.close(); conn.close()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _price_action(data):
+    """(percent, set_price) from a request mapping; exactly one must be given."""
+    has_pct = data.get("percent") not in (None, "")
+    has_set = data.get("set") not in (None, "")
+    if has_pct == has_set:
+        raise ValueError("give exactly one of percent or set")
+    if has_pct:
+        return float(data["percent"]), None
+    value = float(data["set"])
+    if value < 0:
+        raise ValueError("set must be >= 0")
+    return None, value
+
+@owner_bp.get("/price/simulate")
+def price_simulate():
+    """
+    Preview a bulk price change without writing anything.
+    Query: regions (repeat or comma-separated), status, price_min, price_max,
+           min_views, percent | set, bins=20, preview=0 (rows to return)
+    Returns affected count, current/projected totals and averages and a
+    histogram of current vs projected prices.
+    """
+    try:
+        filters = PriceFilters.from_mapping(request.args)
+        percent, set_price = _price_action(request.args)
+        bins = max(1, min(100, int(request.args.get("bins", 20))))
+        preview = max(0, min(2000, int(request.args.get("preview", 0))))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(price_snapshot.simulate(filters, percent, set_price, bins, preview)), 200
+    except Exception as e:
+        current_app.logger.error(f"price simulate error: {e}")
         return jsonify({"error": str(e)}), 500
 
 @owner_bp.post("/spots/bulk-price")
 def bulk_price():
     """
-    Bulk price update by percentage.
+    Bulk price update, committed in chunks of matching spots (spotID order).
     Body:
-      { "percent": 10, "status": "free" }  -> +10% for all Spot with status='free'
+      { "filters": {"regions": [...], "status": "free", "price_min": 100,
+                    "price_max": 900, "min_views": 1000},
+        "percent": 10 | "set": 500, "chunk": 500, "async": false }
+    A top-level "status" is still accepted. Returns the number of spots
+    updated and price summaries before and after the change; with
+    "async": true returns 202 and a jobID to poll at /jobs/<id> instead.
     """
     body = request.get_json(silent=True) or {}
     try:
-        pct = float(body.get("percent", 0))
-    except Exception:
-        return jsonify({"error": "percent must be a number"}), 400
-    status = body.get("status")
-
-    try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        if not _table_exists(cur, "Spot"):
-            return jsonify({"error": "table Spot not found"}), 400
-        if not _column_exists(cur, "Spot", "price"):
-            return jsonify({"error": "column 'price' not found on Spot"}), 400
+        filters = PriceFilters.from_mapping({**body, **(body.get("filters") or {})})
+        percent, set_price = _price_action(body)
+        chunk = max(1, min(5000, int(body.get("chunk", BULK_CHUNK))))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
 
-        if status:
-            cur.execute("UPDATE Spot SET price = ROUND(price * (1 + %s/100), 2) WHERE status=%s", (pct, status))
-        else:
-            cur.execute("UPDATE Spot SET price = ROUND(price * (1 + %s/100), 2)", (pct,))
-        conn.commit()
+    if body.get("async"):
+        try:
+            job_id = job_runner.submit("bulk_price", {"filters": asdict(filters), "percent": percent,
+                                                      "set_price": set_price, "chunk": chunk})
+            return jsonify({"jobID": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}), 202
+        except Exception as e:
+            current_app.logger.error(f"bulk price submit error: {e}")
+            return jsonify({"error": str(e)}), 500
 
-        # return summary
-        cur.execute("SELECT COUNT(*) AS n, MIN(price) AS min_price, MAX(price) AS max_price, AVG(price) AS avg_price FROM Spot")
-        summary = cur.fetchone()
-        cur.close(); conn.close()
-        return jsonify({"updated_percent": pct, "status_filter": status, "summary": summary}), 200
+    try:
+        conn = db.connect()
+        try:
+            result = bulk_update(conn, filters, percent, set_price, chunk)
+        finally:
+            conn.close()
+        metrics_cache.invalidate("spots")
+        result.update({"filters": asdict(filters), "percent": percent, "set": set_price})
+        if not result["complete"]:
+            current_app.logger.error(f"bulk price error after {result['updated']} spots: {result['error']}")
+            return jsonify(result), 500
+        return jsonify(result), 200
     except Exception as e:
+        current_app.logger.error(f"bulk price error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@owner_bp.post("/retention/purge")
+def retention_purge():
+    """
+    Delete orders and reports older than N days, in small batches, as a job.
+    Query: older_than_days (required), tables=orders,reports, batch=, sleep_ms=
+    Returns 202 + jobID (poll /jobs/<id>).
+    """
+    return retention.submit("retention_purge", request.args)
+
+@owner_bp.post("/retention/archive")
+def retention_archive():
+    """
+    Like /retention/purge, but deleted rows (children included) are first
+    written to gzip NDJSON files. older_than_days defaults to 365.
+    """
+    return retention.submit("retention_archive", request.args, DEFAULT_ARCHIVE_DAYS)
+
 @owner_bp.get("/orders/recent")
 def recent_orders():
     """Recent orders (top 50)."""
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        if not _table_exists(cur, "Orders"):
-            return jsonify({"data": [], "note": "table Orders not found"}), 200
-        # Avoid assuming column names: select * with limit
-        cur.execute("SELECT * FROM Orders ORDER BY 1 DESC LIMIT 50")
-        rows = cur.fetchall()
-        cur.close(); conn.close()
-        return jsonify(rows), 200
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            if not _table_exists(cur, "Orders"):
+                return jsonify({"data": [], "note": "table Orders not found"}), 200
+            # Avoid assuming column names: select * with limit
+            cur.execute("SELECT * FROM Orders ORDER BY 1 DESC LIMIT 50")
+            rows = cur.fetchall()
+            return jsonify(rows), 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -99,13 +349,15 @@ def recent_orders():
 def delete_review(rid: int):
     """Moderate a review (owner deletes)."""
     try:
-        conn = _get_conn(); cur = conn.cursor()
-        if not _table_exists(cur, "Reviews"):
-            return jsonify({"error": "table Reviews not found"}), 400
-        cur.execute("DELETE FROM Reviews WHERE rID=%s", (rid,))
-        conn.commit()
-        cur.close(); conn.close()
-        return jsonify({"deleted": rid}), 200
+        conn = db.connect(); cur = conn.cursor()
+        try:
+            if not _table_exists(cur, "Reviews"):
+                return jsonify({"error": "table Reviews not found"}), 400
+            cur.execute("DELETE FROM Reviews WHERE rID=%s", (rid,))
+            conn.commit()
+            return jsonify({"deleted": rid}), 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -120,15 +372,19 @@ def update_spot_status(spot_id: int):
     if not new_status:
         return {"error": "Missing 'status' in JSON body"}, 400
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        cur.execute("UPDATE Spot SET status=%s WHERE spotID=%s", (new_status, spot_id))
-        conn.commit()
-        cur.execute("SELECT spotID, address, status, latitude, longitude FROM Spot WHERE spotID=%s", (spot_id,))
-        row = cur.fetchone()
-        cur.close(); conn.close()
-        if not row:
-            return {"error": f"spotID {spot_id} not found"}, 404
-        return row, 200
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute("UPDATE Spot SET status=%s WHERE spotID=%s", (new_status, spot_id))
+            conn.commit()
+            spot_index.refresh_spots([spot_id], conn)
+            metrics_cache.invalidate("spots")
+            cur.execute("SELECT spotID, address, status, latitude, longitude FROM Spot WHERE spotID=%s", (spot_id,))
+            row = cur.fetchone()
+            if not row:
+                return {"error": f"spotID {spot_id} not found"}, 404
+            return row, 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return {"error": str(e)}, 500
 
@@ -0,0 +1,116 @@
+"""
+Keyset (cursor) pagination shared by the list endpoints.
+
+Instead of LIMIT/OFFSET, a page remembers the (sort value, id) of its last row
+and the next page starts strictly after it:
+
+    WHERE (sort_col, id) > (last_sort, last_id) ORDER BY sort_col, id LIMIT n
+
+With a composite (sort_col, id) index every page is an index range scan, so
+page 1000 costs the same as page 1 and rows inserted meanwhile don't shift
+the pages. The cursor handed to clients is an opaque base64 token.
+
+Endpoints opt in when the request carries a `cursor` argument (empty for the
+first page) and then answer {"data": [...], "next_cursor": "<token>" | null}.
+Requests without it keep the old plain-list response.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class CursorError(ValueError):
+    """Raised for a malformed cursor or one issued for a different listing."""
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return str(value)  # 'YYYY-MM-DD[ HH:MM:SS]' compares correctly in MySQL
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(scope: str, values) -> str:
+    raw = json.dumps({"s": scope, "k": [_plain(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, scope: str):
+    """Key values stored in `token`, or None for an empty (first page) token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        values = data["k"]
+    except Exception:
+        raise CursorError("invalid cursor")
+    if data.get("s") != scope:
+        raise CursorError("cursor does not match this listing (sort/order changed?)")
+    return values
+
+
+def keyset_predicate(sort_col: str | None, id_col: str, descending: bool, after, enum_values=None):
+    """
+    SQL predicate (and params) selecting rows strictly after the key `after`
+    for ORDER BY sort_col <dir>, id_col <dir>. MySQL sorts NULLs first in
+    ascending order and last in descending order; both cases are handled so
+    nullable sort columns (price, status, ...) paginate correctly.
+
+    ENUM columns sort by declaration order, not alphabetically, so pass the
+    declared values as `enum_values`; "after" then becomes an IN list.
+    """
+    if len(after) != (1 if sort_col is None else 2):
+        raise CursorError("invalid cursor")
+    if sort_col is None:
+        (last_id,) = after
+        return f"{id_col} {'<' if descending else '>'} %s", [last_id]
+
+    last_val, last_id = after
+    cmp = "<" if descending else ">"
+    tie = f"({sort_col} = %s AND {id_col} {cmp} %s)"
+    if last_val is None:
+        if descending:
+            return f"({sort_col} IS NULL AND {id_col} < %s)", [last_id]
+        return f"(({sort_col} IS NULL AND {id_col} > %s) OR {sort_col} IS NOT NULL)", [last_id]
+
+    if enum_values is not None:
+        if last_val not in enum_values:
+            raise CursorError("invalid cursor")
+        pos = list(enum_values).index(last_val)
+        later = list(enum_values[:pos]) if descending else list(enum_values[pos + 1:])
+        parts, params = [tie], [last_val, last_id]
+        if later:
+            parts.insert(0, f"{sort_col} IN ({','.join(['%s'] * len(later))})")
+            params = later + params
+        if descending:
+            parts.append(f"{sort_col} IS NULL")
+        return "(" + " OR ".join(parts) + ")", params
+
+    if descending:
+        return f"({sort_col} < %s OR {tie} OR {sort_col} IS NULL)", [last_val, last_val, last_id]
+    return f"({sort_col} > %s OR {tie})", [last_val, last_val, last_id]
+
+
+def page_limit(args, default: int = 300, maximum: int = 1000) -> int:
+    try:
+        return max(1, min(maximum, int(args.get("limit", default))))
+    except (TypeError, ValueError):
+        raise CursorError("limit must be an integer")
+
+
+def paginate(rows, limit: int, scope: str, key):
+    """
+    Trim a LIMIT n+1 result to n rows and build the response envelope;
+    `key(row)` returns the key values of a row.
+    """
+    rows = list(rows)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(scope, key(rows[-1]))
+    return {"data": rows, "next_cursor": next_cursor}
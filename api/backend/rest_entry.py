@@ -4,11 +4,22 @@ import os
 import logging
 from logging.handlers import RotatingFileHandler
 
+from backend import compression, fanout, json_provider, migrations
+from backend.cache import metrics_cache
+from backend.cache_sync import cache_sync
 from backend.db_connection import db
+from backend.spots.spot_index import spot_index
 from backend.o_and_m.o_and_m_routes import o_and_m
+from backend.o_and_m import retention
 from backend.customers.customer_routes import customer
 from backend.spots.spots_route import spots
 from backend.orders.orders_routes import orders
+from backend.jobs.jobs_routes import jobs
+from backend.export.export_routes import export
+from backend.jobs.runner import job_runner
+from backend.orders.processing import process_orders_command
+from backend.orders.rollup import backfill_rollup_command, customer_counts
+from backend.spots.regions import assign_regions_command, region_map
 from backend.salesman.salesman_route import salesman_bp
 from backend.owner.owner_route import owner_bp
 
@@ -28,6 +39,7 @@ def get_env(*keys, default=None, cast=None):
 
 def create_app():
     app = Flask(__name__)
+    json_provider.init_app(app)
 
     # 1) Logging first (so we see startup/debug info)
     setup_logging(app)
@@ -65,27 +77,104 @@ def create_app():
         default="SpotLight"
     )
 
+    # Server processes (set by gunicorn.conf.py under SERVER_MODE=production)
+    app.config["SERVER_WORKERS"] = get_env("SERVER_WORKERS", default=1, cast=int)
+    app.config["SERVER_THREADS"] = get_env("SERVER_THREADS", default=None, cast=int)
+
+    # Connection pool (per worker process): one idle connection per request
+    # thread by default; DB_MAX_CONNECTIONS caps the total across all workers
+    app.config["DB_POOL_SIZE"] = get_env("DB_POOL_SIZE", default=app.config["SERVER_THREADS"] or 5, cast=int)
+    app.config["DB_POOL_MAX_OVERFLOW"] = get_env("DB_POOL_MAX_OVERFLOW", default=5, cast=int)
+    app.config["DB_POOL_TIMEOUT"] = get_env("DB_POOL_TIMEOUT", default=10, cast=float)
+    app.config["DB_POOL_RECYCLE"] = get_env("DB_POOL_RECYCLE", default=1800, cast=int)
+    app.config["DB_POOL_PING_INTERVAL"] = get_env("DB_POOL_PING_INTERVAL", default=30, cast=int)
+    app.config["DB_MAX_CONNECTIONS"] = get_env("DB_MAX_CONNECTIONS", default=None, cast=int)
+
+    # In-memory spot index (map / radius queries)
+    app.config["SPOT_INDEX_ENABLED"] = get_env("SPOT_INDEX_ENABLED", default="1") not in ("0", "false", "no")
+    app.config["SPOT_INDEX_MAX_AGE"] = get_env("SPOT_INDEX_MAX_AGE", default=300, cast=int)
+
+    # Cross-worker cache invalidation: seconds between checks of the CacheVersion counters
+    app.config["CACHE_SYNC_ENABLED"] = get_env("CACHE_SYNC_ENABLED", default="1") not in ("0", "false", "no")
+    app.config["CACHE_SYNC_INTERVAL"] = get_env("CACHE_SYNC_INTERVAL", default=1.0, cast=float)
+
+    # Dashboard metrics cache (seconds fresh / extra seconds served stale while refreshing)
+    app.config["METRICS_CACHE_TTL"] = get_env("METRICS_CACHE_TTL", default=30, cast=float)
+    app.config["METRICS_CACHE_STALE"] = get_env("METRICS_CACHE_STALE", default=300, cast=float)
+
+    # Spot regions: GeoJSON polygons if REGIONS_FILE is set, else a lat/lon grid
+    app.config["REGIONS_FILE"] = get_env("REGIONS_FILE", default=None)
+    app.config["REGION_GRID_DEG"] = get_env("REGION_GRID_DEG", default=0.1, cast=float)
+
+    # Global search fan-out (/o_and_m/search)
+    app.config["SEARCH_BUDGET_MS"] = get_env("SEARCH_BUDGET_MS", default=800, cast=int)
+    app.config["FANOUT_WORKERS"] = get_env("FANOUT_WORKERS", default=None, cast=int)
+
+    # Schema: warn about missing indexes at startup; optionally apply migrations
+    app.config["SCHEMA_CHECK_ON_STARTUP"] = get_env("SCHEMA_CHECK_ON_STARTUP", default="1") not in ("0", "false", "no")
+    app.config["MIGRATE_ON_STARTUP"] = get_env("MIGRATE_ON_STARTUP", default="0") not in ("0", "false", "no")
+
+    # Order rollups: seconds after a write before its days' distinct customer counts are recounted
+    app.config["ROLLUP_CUSTOMER_DELAY"] = get_env("ROLLUP_CUSTOMER_DELAY", default=2, cast=float)
+
+    # Rows per executemany transaction in /o_and_m/bulk_import
+    app.config["BULK_IMPORT_BATCH"] = get_env("BULK_IMPORT_BATCH", default=1000, cast=int)
+
+    # Background jobs (bulk import / repricing / retention): worker threads per process
+    app.config["JOB_WORKERS"] = get_env("JOB_WORKERS", default=2, cast=int)
+
+    # Retention purge/archive: rows per batch, pause between batches, archive file location
+    app.config["RETENTION_BATCH"] = get_env("RETENTION_BATCH", default=500, cast=int)
+    app.config["RETENTION_SLEEP_MS"] = get_env("RETENTION_SLEEP_MS", default=100, cast=int)
+    app.config["RETENTION_ARCHIVE_DIR"] = get_env("RETENTION_ARCHIVE_DIR", default="archive")
+
+    # Response compression (br/gzip by Accept-Encoding) for bodies >= COMPRESS_MIN_SIZE bytes
+    app.config["COMPRESS_ENABLED"] = get_env("COMPRESS_ENABLED", default="1") not in ("0", "false", "no")
+    app.config["COMPRESS_MIN_SIZE"] = get_env("COMPRESS_MIN_SIZE", default=1024, cast=int)
+    app.config["COMPRESS_LEVEL"] = get_env("COMPRESS_LEVEL", default=6, cast=int)
+    app.config["COMPRESS_BR_QUALITY"] = get_env("COMPRESS_BR_QUALITY", default=4, cast=int)
+
     # Log the resolved (non-sensitive) connection info for debugging
     app.logger.info(
-        "DB config -> host=%s port=%s user=%s db=%s",
+        "DB config -> host=%s port=%s user=%s db=%s pool=%s+%s",
         app.config['MYSQL_DATABASE_HOST'],
         app.config['MYSQL_DATABASE_PORT'],
         app.config['MYSQL_DATABASE_USER'],
         app.config['MYSQL_DATABASE_DB'],
+        app.config['DB_POOL_SIZE'],
+        app.config['DB_POOL_MAX_OVERFLOW'],
     )
 
     # 4) Initialize DB and register blueprints
     app.logger.info("current_app(): starting the database connection")
     db.init_app(app)
+    migrations.init_app(app)
+    cache_sync.init_app(app)
+    spot_index.init_app(app)
+    region_map.init_app(app)
+    fanout.init_app(app)
+    metrics_cache.init_app(app)
+    job_runner.init_app(app)
+    customer_counts.init_app(app)
+    retention.init_app(app)
+    compression.init_app(app)
 
     app.logger.info("create_app(): registering blueprints with Flask app object.")
     app.register_blueprint(o_and_m, url_prefix="/o_and_m")
     app.register_blueprint(customer, url_prefix="/customer")
     app.register_blueprint(spots, url_prefix="/spots")
     app.register_blueprint(orders)
+    app.register_blueprint(jobs)
+    app.register_blueprint(export)
     app.register_blueprint(salesman_bp)
     app.register_blueprint(owner_bp)
 
+    app.cli.add_command(backfill_rollup_command)
+    app.cli.add_command(assign_regions_command)
+    app.cli.add_command(process_orders_command)
+    app.cli.add_command(migrations.migrate_command)
+    app.cli.add_command(json_provider.bench_json_command)
+
     return app
 
 
@@ -1,20 +1,16 @@
 # salesman_route.py
 from flask import Blueprint, request, jsonify, current_app
-import mysql.connector as mysql
+from backend.db_connection import db
+from backend.cache import metrics_cache
+from backend.customers.clients import SORTS, client_stats, period_days
+from backend.orders.processing import DEFAULT_BATCH, MAX_BATCH, processing_stats, run_workers
+from backend.orders.rollup import apply_contributions, order_contributions
+from backend.spots.geo import DISTANCE_KM_SQL, MBR_FILTER_SQL, radius_polygon_wkt
+from backend.spots.spot_index import spot_index
 
 salesman_bp = Blueprint("salesman", __name__, url_prefix="/salesman")
 salesman_bp.strict_slashes = False
 
-def _get_conn():
-    cfg = current_app.config
-    return mysql.connect(
-        host=cfg.get("MYSQL_DATABASE_HOST", "127.0.0.1"),
-        port=int(cfg.get("MYSQL_DATABASE_PORT", 3306)),
-        user=cfg.get("MYSQL_DATABASE_USER", "root"),
-        password=cfg.get("MYSQL_DATABASE_PASSWORD", "changeme"),
-        database=cfg.get("MYSQL_DATABASE_DB", "SpotLight"),
-    )
-
 def _table_exists(cur, name):
     cur.execute("SHOW TABLES LIKE %s", (name,))
     return cur.fetchone() is not None
@@ -23,20 +19,75 @@ def _column_exists(cur, table, column):
     cur.execute(f"SHOW COLUMNS FROM `{table}` LIKE %s", (column,))
     return cur.fetchone() is not None
 
+def _map_row(row, distance_km=None):
+    """Shape an index row like the SQL result of /salesman/spots."""
+    out = {
+        "spotID": row["spotID"],
+        "address": row["address"],
+        "latitude": row["latitude"],
+        "longitude": row["longitude"],
+        "status": row["status"] or "",
+    }
+    if distance_km is not None:
+        out["distance_km"] = distance_km
+    return out
+
 @salesman_bp.get("/orders/pending")
 def pending_orders():
     """List 'to-be-processed' orders for a salesman."""
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        if not _table_exists(cur, "ToBeProcessedOrder"):
-            return jsonify({"data": [], "note": "table ToBeProcessedOrder not found"}), 200
-        cur.execute("SELECT * FROM ToBeProcessedOrder ORDER BY orderID DESC LIMIT 100")
-        rows = cur.fetchall()
-        cur.close(); conn.close()
-        return jsonify(rows), 200
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            if not _table_exists(cur, "ToBeProcessedOrder"):
+                return jsonify({"data": [], "note": "table ToBeProcessedOrder not found"}), 200
+            cur.execute("SELECT * FROM ToBeProcessedOrder ORDER BY orderID DESC LIMIT 100")
+            rows = cur.fetchall()
+            return jsonify(rows), 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@salesman_bp.post("/orders/process")
+def process_orders():
+    """
+    Process pending orders now (same work as `flask process-orders`).
+    Body: {"processorID": <SalesMan eID>, "batch": 100, "max_batches": 10, "workers": 1}
+    Returns: {"processed": N, "stats": {...throughput counters...}}; 500 with
+    the same fields plus "errors" when a worker stopped on an error.
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        processor_id = int(body["processorID"])
+        batch = max(1, min(MAX_BATCH, int(body.get("batch", DEFAULT_BATCH))))
+        max_batches = max(1, min(1000, int(body.get("max_batches", 10))))
+        workers = max(1, min(8, int(body.get("workers", 1))))
+    except KeyError:
+        return jsonify({"error": "Missing 'processorID' in JSON body"}), 400
+    except (TypeError, ValueError):
+        return jsonify({"error": "processorID/batch/max_batches/workers must be integers"}), 400
+    try:
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute("SELECT 1 FROM SalesMan WHERE eID = %s", (processor_id,))
+            found = cur.fetchone()
+        finally:
+            cur.close(); conn.close()
+        if not found:
+            return jsonify({"error": f"processorID {processor_id} is not a salesman"}), 400
+        n, errors = run_workers(processor_id, workers, batch, max_batches, current_app.logger)
+        if errors:
+            return jsonify({"processed": n, "errors": errors, "stats": processing_stats.as_dict()}), 500
+        return jsonify({"processed": n, "stats": processing_stats.as_dict()}), 200
+    except Exception as e:
+        current_app.logger.error(f"process orders error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@salesman_bp.get("/orders/process/stats")
+def process_orders_stats():
+    """Order processing throughput counters for this API process."""
+    return jsonify(processing_stats.as_dict()), 200
+
 @salesman_bp.put("/spots/<int:spot_id>/status")
 def update_spot_status(spot_id: int):
     """Update a spot's status (e.g., free, inuse, planned, w.issue)."""
@@ -45,19 +96,23 @@ def update_spot_status(spot_id: int):
     if not new_status:
         return jsonify({"error": "Missing 'status' in JSON body"}), 400
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        if not _table_exists(cur, "Spot"):
-            return jsonify({"error": "table Spot not found"}), 400
-        if not _column_exists(cur, "Spot", "status"):
-            return jsonify({"error": "column 'status' not found on Spot"}), 400
-        cur.execute("UPDATE Spot SET status=%s WHERE spotID=%s", (new_status, spot_id))
-        conn.commit()
-        cur.execute("SELECT * FROM Spot WHERE spotID=%s", (spot_id,))
-        row = cur.fetchone()
-        cur.close(); conn.close()
-        if not row:
-            return jsonify({"error": f"spotID {spot_id} not found"}), 404
-        return jsonify(row), 200
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            if not _table_exists(cur, "Spot"):
+                return jsonify({"error": "table Spot not found"}), 400
+            if not _column_exists(cur, "Spot", "status"):
+                return jsonify({"error": "column 'status' not found on Spot"}), 400
+            cur.execute("UPDATE Spot SET status=%s WHERE spotID=%s", (new_status, spot_id))
+            conn.commit()
+            spot_index.refresh_spots([spot_id], conn)
+            metrics_cache.invalidate("spots")
+            cur.execute("SELECT * FROM Spot WHERE spotID=%s", (spot_id,))
+            row = cur.fetchone()
+            if not row:
+                return jsonify({"error": f"spotID {spot_id} not found"}), 404
+            return jsonify(row), 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -67,58 +122,76 @@ def salesman_spots():
     Search/list spots for a salesman.
     - /salesman/spots?status=inuse
     - /salesman/spots?lat=29.65&lng=-82.32&radius_km=8
+    - /salesman/spots?bbox=minLon,minLat,maxLon,maxLat
+    Radius and bbox queries are answered from the in-memory spot index when it
+    is available, and from MySQL otherwise.
     """
     status = request.args.get("status")
     lat = request.args.get("lat", type=float)
     lng = request.args.get("lng", type=float)
     radius_km = request.args.get("radius_km", type=float)
+    bbox = (request.args.get("bbox") or "").strip()
+
+    if bbox:
+        try:
+            min_lon, min_lat, max_lon, max_lat = [float(x) for x in bbox.split(",")]
+        except ValueError:
+            return jsonify({"error": "bbox must be 'minLon,minLat,maxLon,maxLat'"}), 400
+        if not spot_index.ready():
+            return jsonify({"error": "spot index unavailable"}), 503
+        rows = spot_index.bbox(min_lat, min_lon, max_lat, max_lon, status=status, limit=2000)
+        return jsonify([_map_row(r) for r in rows]), 200
+
+    if lat is not None and lng is not None and radius_km is not None and spot_index.ready():
+        hits = spot_index.radius(lat, lng, radius_km, status=status, limit=200)
+        return jsonify([_map_row(r, d) for r, d in hits]), 200
 
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-        if not _table_exists(cur, "Spot"):
-            return jsonify({"data": [], "note": "table Spot not found"}), 200
-
-        if lat is not None and lng is not None and radius_km is not None:
-            # Haversine (km)
-            q = """
-                SELECT
-                  spotID, address, latitude, longitude,
-                  IFNULL(status,'') AS status,
-                  (6371 * 2 * ASIN(SQRT(
-                      POWER(SIN(RADIANS(%s - latitude)/2), 2) +
-                      COS(RADIANS(latitude)) * COS(RADIANS(%s)) *
-                      POWER(SIN(RADIANS(%s - longitude)/2), 2)
-                  ))) AS distance_km
-                FROM Spot
-                {where}
-                HAVING distance_km <= %s
-                ORDER BY distance_km
-                LIMIT 200
-            """
-            where = ""
-            params = [lat, lat, lng]
-            if status:
-                where = "WHERE status = %s"
-                params.append(status)
-            q = q.format(where=where)
-            params.append(radius_km)
-            cur.execute(q, tuple(params))
-        else:
-            if status:
-                cur.execute(
-                    "SELECT spotID, address, latitude, longitude, IFNULL(status,'') AS status "
-                    "FROM Spot WHERE status=%s ORDER BY spotID DESC LIMIT 200",
-                    (status,),
-                )
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
+        try:
+            if not _table_exists(cur, "Spot"):
+                return jsonify({"data": [], "note": "table Spot not found"}), 200
+
+            if lat is not None and lng is not None and radius_km is not None:
+                # MBR prefilter on Spot.location (SPATIAL INDEX), then exact distance
+                q = f"""
+                    SELECT
+                      spotID, address, latitude, longitude,
+                      IFNULL(status,'') AS status,
+                      {DISTANCE_KM_SQL} AS distance_km
+                    FROM Spot
+                    WHERE {MBR_FILTER_SQL}
+                      AND latitude IS NOT NULL AND longitude IS NOT NULL
+                      {{status_filter}}
+                    HAVING distance_km <= %s
+                    ORDER BY distance_km
+                    LIMIT 200
+                """
+                status_filter = ""
+                params = [lat, lng, radius_polygon_wkt(lat, lng, radius_km)]
+                if status:
+                    status_filter = "AND status = %s"
+                    params.append(status)
+                q = q.format(status_filter=status_filter)
+                params.append(radius_km)
+                cur.execute(q, tuple(params))
             else:
-                cur.execute(
-                    "SELECT spotID, address, latitude, longitude, IFNULL(status,'') AS status "
-                    "FROM Spot ORDER BY spotID DESC LIMIT 200"
-                )
+                if status:
+                    cur.execute(
+                        "SELECT spotID, address, latitude, longitude, IFNULL(status,'') AS status "
+                        "FROM Spot WHERE status=%s ORDER BY spotID DESC LIMIT 200",
+                        (status,),
+                    )
+                else:
+                    cur.execute(
+                        "SELECT spotID, address, latitude, longitude, IFNULL(status,'') AS status "
+                        "FROM Spot ORDER BY spotID DESC LIMIT 200"
+                    )
 
-        rows = cur.fetchall()
-        cur.close(); conn.close()
-        return jsonify(rows), 200
+            rows = cur.fetchall()
+            return jsonify(rows), 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -129,14 +202,19 @@ def add_spot_to_order(spot_id: int, order_id: int):
     Returns: {"added": {"orderID": ..., "spotID": ...}}
     """
     try:
-        conn = _get_conn(); cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO SpotOrder (orderID, spotID) VALUES (%s, %s)",
-            (order_id, spot_id)
-        )
-        conn.commit()
-        cur.close(); conn.close()
-        return {"added": {"orderID": order_id, "spotID": spot_id}}, 201
+        conn = db.connect(); cur = conn.cursor()
+        try:
+            before = order_contributions(cur, [order_id])
+            cur.execute(
+                "INSERT INTO SpotOrder (orderID, spotID) VALUES (%s, %s)",
+                (order_id, spot_id)
+            )
+            apply_contributions(cur, before, order_contributions(cur, [order_id]))
+            conn.commit()
+            metrics_cache.invalidate("orders")
+            return {"added": {"orderID": order_id, "spotID": spot_id}}, 201
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return {"error": str(e)}, 500
 
@@ -147,18 +225,45 @@ def remove_spot_from_order(spot_id: int, order_id: int):
     Returns: {"deleted": {"orderID": ..., "spotID": ...}, "rows_affected": N}
     """
     try:
-        conn = _get_conn(); cur = conn.cursor()
-        cur.execute(
-            "DELETE FROM SpotOrder WHERE orderID=%s AND spotID=%s",
-            (order_id, spot_id)
-        )
-        rows = cur.rowcount
-        conn.commit()
-        cur.close(); conn.close()
-        return {"deleted": {"orderID": order_id, "spotID": spot_id}, "rows_affected": rows}, 200
+        conn = db.connect(); cur = conn.cursor()
+        try:
+            before = order_contributions(cur, [order_id])
+            cur.execute(
+                "DELETE FROM SpotOrder WHERE orderID=%s AND spotID=%s",
+                (order_id, spot_id)
+            )
+            rows = cur.rowcount
+            apply_contributions(cur, before, order_contributions(cur, [order_id]))
+            conn.commit()
+            metrics_cache.invalidate("orders")
+            return {"deleted": {"orderID": order_id, "spotID": spot_id}, "rows_affected": rows}, 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return {"error": str(e)}, 500
     
+@salesman_bp.get("/clients/repeat")
+def repeat_clients():
+    """
+    Clients with repeat orders in the period, with spend, last order date and
+    last order total (for same-price renewals).
+    Query: period=730d, min_orders=2, limit=200 (max 1000), sort=orders|spend|recent
+    """
+    days = period_days(request.args.get("period"), 730)
+    try:
+        min_orders = max(1, int(request.args.get("min_orders", 2)))
+        limit = max(1, min(1000, int(request.args.get("limit", 200))))
+    except ValueError:
+        return jsonify({"error": "min_orders/limit must be integers"}), 400
+    sort = request.args.get("sort", "orders")
+    if sort not in SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORTS)}"}), 400
+    try:
+        return jsonify(client_stats(days, min_orders, limit, sort)), 200
+    except Exception as e:
+        current_app.logger.error(f"repeat clients error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @salesman_bp.get("/orders/history")
 def orders_history():
     """
@@ -166,37 +271,39 @@ def orders_history():
     Falls back to Orders if ProcessedOrder table doesn't exist.
     """
     try:
-        conn = _get_conn(); cur = conn.cursor(dictionary=True)
-
-        # Use ProcessedOrder if available
+        conn = db.connect(); cur = conn.cursor(dictionary=True)
         try:
-            cur.execute("SHOW TABLES LIKE 'ProcessedOrder'")
-            has_po = cur.fetchone() is not None
-        except Exception:
-            has_po = False
 
-        if has_po:
-            cur.execute(
-                """
-                SELECT *
-                FROM ProcessedOrder
-                ORDER BY orderID DESC
-                LIMIT 100
-                """
-            )
-        else:
-            cur.execute(
-                """
-                SELECT *
-                FROM Orders
-                ORDER BY orderID DESC
-                LIMIT 100
-                """
-            )
+            # Use ProcessedOrder if available
+            try:
+                cur.execute("SHOW TABLES LIKE 'ProcessedOrder'")
+                has_po = cur.fetchone() is not None
+            except Exception:
+                has_po = False
+
+            if has_po:
+                cur.execute(
+                    """
+                    SELECT *
+                    FROM ProcessedOrder
+                    ORDER BY orderID DESC
+                    LIMIT 100
+                    """
+                )
+            else:
+                cur.execute(
+                    """
+                    SELECT *
+                    FROM Orders
+                    ORDER BY orderID DESC
+                    LIMIT 100
+                    """
+                )
 
-        rows = cur.fetchall()
-        cur.close(); conn.close()
-        return rows, 200
+            rows = cur.fetchall()
+            return rows, 200
+        finally:
+            cur.close(); conn.close()
     except Exception as e:
         return {"error": str(e)}, 500
 
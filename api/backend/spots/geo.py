@@ -0,0 +1,72 @@
+"""
+Geo helpers shared by the radius endpoints (/spots/near, /salesman/spots).
+
+Spot.location is a POINT SRID 4326 generated from latitude/longitude and
+backed by a SPATIAL INDEX. Radius queries first narrow the rows with an MBR
+(bounding box) test that MySQL answers from the R-tree, then compute the exact
+great-circle distance with ST_Distance_Sphere on the survivors only.
+
+haversine_km is the in-process equivalent used by the spot index.
+
+Note: SRID 4326 uses latitude-first axis order, so points are built as
+POINT(lat, lon) and WKT coordinates are written "lat lon".
+"""
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+# SQL fragments — parameters: (lat, lon) for the center point, WKT for the box.
+CENTER_POINT_SQL = "ST_SRID(POINT(%s, %s), 4326)"
+DISTANCE_KM_SQL = f"ST_Distance_Sphere(location, {CENTER_POINT_SQL}) / 1000"
+MBR_FILTER_SQL = "MBRContains(ST_GeomFromText(%s, 4326), location)"
+
+
+def radius_bbox(lat: float, lon: float, radius_km: float):
+    """
+    Bounding box (min_lat, min_lon, max_lat, max_lon) that contains every point
+    within radius_km of (lat, lon). Padded slightly because the box edges are
+    geodesics, not parallels, once MySQL evaluates them on the ellipsoid.
+    """
+    r = max(0.0, float(radius_km)) * 1.01
+    dlat = r / KM_PER_DEG_LAT
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6:
+        dlon = 180.0
+    else:
+        dlon = min(180.0, r / (KM_PER_DEG_LAT * cos_lat))
+
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180.0 or max_lon > 180.0:
+        # Box wraps the antimeridian — give up on the longitude bound.
+        min_lon, max_lon = -180.0, 180.0
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def bbox_polygon_wkt(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> str:
+    """WKT polygon (lat-lon axis order) for an MBR filter on Spot.location."""
+    ring = [
+        (min_lat, min_lon),
+        (min_lat, max_lon),
+        (max_lat, max_lon),
+        (max_lat, min_lon),
+        (min_lat, min_lon),
+    ]
+    return "POLYGON((" + ", ".join(f"{a:.7f} {b:.7f}" for a, b in ring) + "))"
+
+
+def radius_polygon_wkt(lat: float, lon: float, radius_km: float) -> str:
+    return bbox_polygon_wkt(*radius_bbox(lat, lon, radius_km))
+
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts floats or NumPy arrays."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
@@ -0,0 +1,374 @@
+"""
+Bulk price simulation (/owner/price/simulate) on a column snapshot of Spot.
+
+PriceSnapshot keeps spotID / price / estViewPerMonth / status / region as
+NumPy columns. It subscribes to the spot index, so spot writes and reloads
+reach it; the columns are rebuilt lazily on the first simulation after a
+change. When the spot index is disabled the snapshot is read from MySQL and
+kept for SNAPSHOT_TTL seconds, or until another worker publishes a spot
+write (backend/cache_sync.py).
+
+A simulation is one boolean mask over the columns (PriceFilters) and one
+vectorized price change, so it runs in milliseconds for any filter.
+
+bulk_update applies the same change in MySQL, walking the matching rows in
+spotID order BULK_CHUNK rows at a time and committing after each chunk, so
+no single transaction holds row locks on a large part of the catalog.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from backend.cache import metrics_cache
+from backend.cache_sync import cache_sync
+from backend.db_connection import db
+from backend.jobs.runner import handler
+from backend.spots.spot_index import NO_STATUS, SPOT_SELECT_SQL, STATUS_CODES, spot_index
+
+SNAPSHOT_TTL = 60
+HISTOGRAM_BINS = 20
+BULK_CHUNK = 500
+
+
+@dataclass
+class PriceFilters:
+    """Spot selection shared by the simulation and the bulk price update."""
+    regions: list = field(default_factory=list)
+    status: str | None = None
+    price_min: float | None = None
+    price_max: float | None = None
+    min_views: int | None = None
+
+    @classmethod
+    def from_mapping(cls, data):
+        """
+        Build from query args (regions may repeat or be comma separated) or a
+        JSON "filters" object. Raises ValueError on bad input.
+        """
+        if hasattr(data, "getlist"):
+            raw_regions = data.getlist("regions") or data.getlist("region")
+        else:
+            raw_regions = data.get("regions") or data.get("region") or []
+        if isinstance(raw_regions, str):
+            raw_regions = [raw_regions]
+        regions = [r.strip() for item in raw_regions for r in str(item).split(",") if r.strip()]
+
+        status = data.get("status") or None
+        if status in ("any", "all"):
+            status = None
+        if status is not None and status not in STATUS_CODES:
+            raise ValueError(f"status must be one of {', '.join(STATUS_CODES)}")
+
+        def num(key, cast=float):
+            value = data.get(key)
+            if value in (None, ""):
+                return None
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a number")
+
+        price_min, price_max = num("price_min"), num("price_max")
+        if price_min is not None and price_max is not None and price_min > price_max:
+            raise ValueError("price_min must not be greater than price_max")
+        return cls(regions, status, price_min, price_max, num("min_views", int))
+
+    def is_empty(self):
+        return not (self.regions or self.status or self.price_min is not None
+                    or self.price_max is not None or self.min_views)
+
+
+def _like(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def filter_sql(f: PriceFilters, percent=None):
+    """(WHERE clause, params) equivalent to PriceSnapshot._mask for the filters."""
+    where, params = [], []
+    if f.status:
+        where.append("status = %s")
+        params.append(f.status)
+    if f.price_min is not None:
+        where.append("price >= %s")
+        params.append(f.price_min)
+    if f.price_max is not None:
+        where.append("price <= %s")
+        params.append(f.price_max)
+    if f.min_views:
+        where.append("estViewPerMonth >= %s")
+        params.append(f.min_views)
+    if f.regions:
+        ors = ["region IN (" + ",".join(["%s"] * len(f.regions)) + ")"]
+        params.extend(f.regions)
+        for name in f.regions:
+            ors.append("address LIKE %s")
+            params.append(_like(name))
+        where.append("(" + " OR ".join(ors) + ")")
+    if percent is not None:
+        where.append("price IS NOT NULL")
+    return " AND ".join(where) or "1=1", params
+
+
+def apply_change(price, percent=None, set_price=None):
+    """Projected prices, rounded like the integer Spot.price column."""
+    if set_price is not None:
+        return np.full(len(price), float(int(round(set_price))))
+    return np.round(price * (1 + float(percent) / 100.0))
+
+
+class PriceSnapshot:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = None          # spotID -> row, fed by the spot index
+        self._dirty = True
+        self._loaded_at = 0.0
+        self._clear()
+
+    def _clear(self):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.price = np.zeros(0)
+        self.views = np.zeros(0)
+        self.status = np.zeros(0, dtype=np.int8)
+        self.region = np.zeros(0, dtype=object)
+        self.address = np.zeros(0, dtype=str)
+
+    # ------------------------- spot index listener -------------------------
+
+    def on_reload(self, rows):
+        with self._lock:
+            self._rows = dict(rows)
+            self._dirty = True
+
+    def on_upsert(self, row):
+        with self._lock:
+            if self._rows is not None:
+                self._rows[int(row["spotID"])] = row
+                self._dirty = True
+
+    def on_remove(self, spot_id):
+        with self._lock:
+            if self._rows is not None and self._rows.pop(int(spot_id), None) is not None:
+                self._dirty = True
+
+    def expire(self):
+        """Re-read the MySQL snapshot on next use (spot written by another worker)."""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    # ------------------------- columns -------------------------
+
+    def _build(self, rows):
+        n = len(rows)
+
+        def col(key, dtype, default):
+            return np.fromiter((default if r.get(key) is None else r[key] for r in rows),
+                               dtype=dtype, count=n)
+
+        self.ids = col("spotID", np.int64, -1)
+        self.price = col("price", np.float64, np.nan)
+        self.views = col("estViewPerMonth", np.float64, 0.0)
+        self.status = np.fromiter((STATUS_CODES.get(r.get("status"), NO_STATUS) for r in rows),
+                                  dtype=np.int8, count=n)
+        self.region = np.array([(r.get("region") or "").lower() for r in rows], dtype=object)
+        self.address = np.array([(r.get("address") or "").lower() for r in rows], dtype=str)
+
+    def _ensure(self, index_ready):
+        if index_ready:
+            if self._dirty:
+                self._build(list(self._rows.values()) if self._rows else [])
+                self._dirty = False
+            return
+        # Index disabled/unavailable: read the columns straight from MySQL
+        if self._rows is None and time.monotonic() - self._loaded_at < SNAPSHOT_TTL:
+            return
+        conn = db.connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(SPOT_SELECT_SQL)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            conn.close()
+        self._rows = None
+        self._build(rows)
+        self._loaded_at = time.monotonic()
+
+    def _mask(self, f: PriceFilters):
+        mask = np.ones(len(self.ids), dtype=bool)
+        if f.status:
+            mask &= self.status == STATUS_CODES[f.status]
+        if f.price_min is not None:
+            mask &= self.price >= f.price_min
+        if f.price_max is not None:
+            mask &= self.price <= f.price_max
+        if f.min_views:
+            mask &= self.views >= f.min_views
+        if f.regions:
+            # a region name, or failing that a place mentioned in the address
+            names = [r.lower() for r in f.regions]
+            hit = np.isin(self.region, names)
+            for name in names:
+                hit |= np.char.find(self.address, name) >= 0
+            mask &= hit
+        return mask
+
+    def matching_ids(self, f: PriceFilters):
+        """spotIDs selected by the filters (sorted)."""
+        index_ready = spot_index.ready()  # may reload, which calls back into on_reload
+        with self._lock:
+            self._ensure(index_ready)
+            return np.sort(self.ids[self._mask(f)])
+
+    def simulate(self, f: PriceFilters, percent=None, set_price=None, bins=HISTOGRAM_BINS, preview=0):
+        started = time.perf_counter()
+        index_ready = spot_index.ready()
+        with self._lock:
+            self._ensure(index_ready)
+            mask = self._mask(f)
+            if percent is not None:
+                mask &= ~np.isnan(self.price)  # NULL * x stays NULL in the UPDATE
+            ids, price = self.ids[mask], self.price[mask]
+            region = self.region[mask] if preview else None
+
+        current = np.nan_to_num(price)
+        projected = apply_change(current, percent, set_price)
+        out = {
+            "affected": int(len(ids)),
+            "current_total": float(current.sum()),
+            "projected_total": float(projected.sum()),
+            "delta_total": float(projected.sum() - current.sum()),
+            "current_avg": float(current.mean()) if len(ids) else None,
+            "projected_avg": float(projected.mean()) if len(ids) else None,
+            "histogram": None,
+        }
+        if len(ids):
+            lo = float(min(current.min(), projected.min()))
+            hi = float(max(current.max(), projected.max()))
+            edges = np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+            out["histogram"] = {
+                "edges": np.round(edges, 2).tolist(),
+                "current": np.histogram(current, edges)[0].tolist(),
+                "projected": np.histogram(projected, edges)[0].tolist(),
+            }
+        if preview:
+            order = np.argsort(ids)[:preview]
+            out["preview"] = [
+                {"spotID": int(ids[i]), "region": region[i] or None,
+                 "price": None if np.isnan(price[i]) else float(price[i]),
+                 "new_price": float(projected[i])}
+                for i in order
+            ]
+        out["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return out
+
+
+class _Summary:
+    def __init__(self):
+        self.n = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        if value is None:
+            return
+        self.n += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def as_dict(self):
+        return {"priced": self.n, "total": int(self.total), "min": self.min, "max": self.max,
+                "avg": round(self.total / self.n, 2) if self.n else None}
+
+
+def bulk_update(conn, f: PriceFilters, percent=None, set_price=None, chunk=BULK_CHUNK, progress=None):
+    """
+    Apply a percent or absolute price change to the spots matching `f`, one
+    committed chunk of `chunk` rows at a time, continuing after the last
+    spotID of the previous chunk. Each chunk is locked with SELECT ...
+    FOR UPDATE, which also reads the old and new prices for the summary.
+    On a failure the chunks already committed stay applied and the result
+    has complete=False and the error. `progress(done, total, message)` is
+    called after each chunk with the rows updated out of those matching.
+    """
+    started = time.perf_counter()
+    where, params = filter_sql(f, percent)
+    if set_price is not None:
+        expr, expr_params = "%s", [int(round(set_price))]
+    else:
+        expr, expr_params = "ROUND(price * (1 + %s / 100))", [float(percent)]
+
+    cur = conn.cursor()
+    before, after = _Summary(), _Summary()
+    updated = chunks = 0
+    error = None
+    try:
+        cur.execute(f"SELECT COUNT(*) AS n FROM Spot WHERE {where}", tuple(params))
+        total = cur.fetchone()["n"]
+        conn.commit()
+        last_id = 0
+        while True:
+            cur.execute(
+                f"SELECT spotID, price, {expr} AS new_price FROM Spot "
+                f"WHERE spotID > %s AND {where} ORDER BY spotID LIMIT %s FOR UPDATE",
+                (*expr_params, last_id, *params, chunk),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                conn.rollback()
+                break
+            ids = [r["spotID"] for r in rows]
+            cur.execute(
+                f"UPDATE Spot SET price = {expr} WHERE spotID IN ({','.join(['%s'] * len(ids))})",
+                (*expr_params, *ids),
+            )
+            for r in rows:
+                before.add(r["price"])
+                after.add(r["new_price"])
+            updated += len(ids)
+            chunks += 1
+            conn.commit()
+            spot_index.refresh_spots(ids, conn)
+            if progress:
+                progress(updated, max(total, updated), f"{updated} spot(s) updated")
+            if len(rows) < chunk:
+                break
+            last_id = ids[-1]
+    except Exception as e:
+        # Chunks already committed stay applied; report how far we got.
+        conn.rollback()
+        error = str(e)
+    finally:
+        cur.close()
+    return {
+        "complete": error is None,
+        "error": error,
+        "updated": updated,
+        "chunks": chunks,
+        "before": before.as_dict(),
+        "after": after.as_dict(),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+@handler("bulk_price")
+def _bulk_price_job(job, filters, percent=None, set_price=None, chunk=BULK_CHUNK):
+    conn = db.connect()
+    try:
+        result = bulk_update(conn, PriceFilters(**filters), percent, set_price, chunk, job.progress)
+    finally:
+        conn.close()
+    metrics_cache.invalidate("spots")
+    if not result["complete"]:
+        raise RuntimeError(f"stopped after {result['updated']} spot(s): {result['error']}")
+    return result
+
+
+price_snapshot = PriceSnapshot()
+spot_index.subscribe(price_snapshot)
+cache_sync.subscribe("spots", price_snapshot.expire)
@@ -0,0 +1,242 @@
+"""
+Region assignment for spots.
+
+Every spot gets a region name stored in Spot.region (indexed), so per-region
+rollups are plain GROUP BYs. Regions come from, in order of preference:
+  - REGIONS_FILE: a GeoJSON FeatureCollection of Polygon / MultiPolygon
+    features named by properties.name (or properties.region); the first
+    feature containing the spot wins, spots outside every feature get
+    OUTSIDE_REGION;
+  - otherwise a lat/lon grid of REGION_GRID_DEG degrees ("Grid 29.60,-82.40"
+    names the cell by its south-west corner).
+Spots without coordinates are UNASSIGNED.
+
+Spot writes that can move a spot call region_map.assign_spots(cursor, ids)
+before committing; that also moves the region rollup share of the spot's
+orders to its new region. After changing the region configuration run
+    flask --app backend_app assign-regions --all
+"""
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+
+from backend.db_connection import db
+from backend.orders.rollup import apply_contributions, order_contributions, spot_order_ids
+from backend.spots.spot_index import spot_index
+
+UNASSIGNED = "Unassigned"
+OUTSIDE_REGION = "Other"
+ASSIGN_CHUNK = 1000
+ASSIGN_RETRY_SECONDS = 60
+
+
+def _points_in_ring(lat, lon, ring):
+    """Even-odd crossing test of many points against one ring of (lon, lat)."""
+    inside = np.zeros(len(lat), dtype=bool)
+    xs, ys = ring[:, 0], ring[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(len(ring)):
+            xi, yi, xj, yj = xs[i], ys[i], xs[i - 1], ys[i - 1]
+            crosses = (yi > lat) != (yj > lat)
+            inside ^= crosses & (lon < (xj - xi) * (lat - yi) / (yj - yi) + xi)
+    return inside
+
+
+class _Region:
+    def __init__(self, name, polygons):
+        self.name = name
+        self.polygons = [[np.asarray(r, dtype=np.float64)[:, :2] for r in poly] for poly in polygons]
+        pts = np.vstack([p[0] for p in self.polygons])
+        self.min_lon, self.min_lat = pts.min(axis=0)
+        self.max_lon, self.max_lat = pts.max(axis=0)
+
+    def contains(self, lat, lon):
+        hit = np.zeros(len(lat), dtype=bool)
+        near = (lat >= self.min_lat) & (lat <= self.max_lat) & (lon >= self.min_lon) & (lon <= self.max_lon)
+        if not near.any():
+            return hit
+        la, lo = lat[near], lon[near]
+        inside = np.zeros(len(la), dtype=bool)
+        for rings in self.polygons:
+            poly = np.zeros(len(la), dtype=bool)
+            for ring in rings:  # outer ring plus holes
+                poly ^= _points_in_ring(la, lo, ring)
+            inside |= poly
+        hit[near] = inside
+        return hit
+
+
+class RegionMap:
+    def __init__(self, grid_deg: float = 0.1):
+        self.grid_deg = grid_deg
+        self.regions = []
+        self.logger = None
+        self._pending = True
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.logger = app.logger
+        self.grid_deg = float(app.config.get("REGION_GRID_DEG", self.grid_deg))
+        path = app.config.get("REGIONS_FILE")
+        if path:
+            try:
+                self.regions = self._load_geojson(path)
+                app.logger.info("regions: %s polygons from %s", len(self.regions), path)
+            except Exception as e:
+                app.logger.error(f"regions file {path} not loaded, using grid: {e}")
+        self.ensure_assigned()
+
+    @staticmethod
+    def _load_geojson(path):
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+        regions = []
+        for i, feat in enumerate(data.get("features", [])):
+            geom = feat.get("geometry") or {}
+            props = feat.get("properties") or {}
+            name = str(props.get("name") or props.get("region") or f"Region {i + 1}")[:64]
+            if geom.get("type") == "Polygon":
+                regions.append(_Region(name, [geom["coordinates"]]))
+            elif geom.get("type") == "MultiPolygon":
+                regions.append(_Region(name, geom["coordinates"]))
+        return regions
+
+    # ------------------------- assignment -------------------------
+
+    def _grid_name(self, lat, lon):
+        d = self.grid_deg
+        return f"Grid {math.floor(lat / d) * d:.2f},{math.floor(lon / d) * d:.2f}"
+
+    def assign(self, lat, lon):
+        """Region names for arrays of lat/lon (NaN = no coordinates)."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        names = np.full(len(lat), UNASSIGNED, dtype=object)
+        located = ~(np.isnan(lat) | np.isnan(lon))
+        if self.regions:
+            todo = located.copy()
+            for region in self.regions:
+                if not todo.any():
+                    break
+                hit = np.zeros(len(lat), dtype=bool)
+                hit[todo] = region.contains(lat[todo], lon[todo])
+                names[hit] = region.name
+                todo &= ~hit
+            names[todo] = OUTSIDE_REGION
+        elif self.grid_deg > 0:
+            for i in np.flatnonzero(located):
+                names[i] = self._grid_name(lat[i], lon[i])
+        return names
+
+    def _assign_rows(self, cursor, rows):
+        """
+        Write regions for fetched (spotID, latitude, longitude, region) rows
+        and move the rollup share of the moved spots' orders in the same
+        transaction; returns the moved ids.
+        """
+        if not rows:
+            return []
+        lat = [float(r["latitude"]) if r["latitude"] is not None else math.nan for r in rows]
+        lon = [float(r["longitude"]) if r["longitude"] is not None else math.nan for r in rows]
+        changed = [(name, r["spotID"]) for r, name in zip(rows, self.assign(lat, lon))
+                   if name != r["region"]]
+        if not changed:
+            return []
+        moved = [spot_id for _, spot_id in changed]
+        order_ids = spot_order_ids(cursor, moved)
+        before = order_contributions(cursor, order_ids)
+        cursor.executemany("UPDATE Spot SET region = %s WHERE spotID = %s", changed)
+        if before:
+            apply_contributions(cursor, before, order_contributions(cursor, order_ids))
+        return moved
+
+    def assign_spots(self, cursor, spot_ids):
+        """
+        (Re)assign the given spots on the caller's cursor/transaction and
+        move the region rollup share of their orders along with them.
+        """
+        ids = [int(i) for i in spot_ids if i is not None]
+        if not ids:
+            return []
+        marks = ",".join(["%s"] * len(ids))
+        cursor.execute(
+            f"SELECT spotID, latitude, longitude, region FROM Spot WHERE spotID IN ({marks})", tuple(ids)
+        )
+        return self._assign_rows(cursor, cursor.fetchall())
+
+    def assign_all(self, conn, only_missing=True):
+        """
+        Assign spots in chunks (all, or just those without a region). Each
+        chunk commits together with the rollup share of its moved spots'
+        orders, so no rollup rebuild is needed afterwards. Returns the
+        number moved.
+        """
+        cursor = conn.cursor()
+        moved, last_id = 0, 0
+        try:
+            while True:
+                cursor.execute(
+                    "SELECT spotID, latitude, longitude, region FROM Spot WHERE spotID > %s "
+                    + ("AND region IS NULL " if only_missing else "")
+                    + "ORDER BY spotID LIMIT %s",
+                    (last_id, ASSIGN_CHUNK),
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                moved += len(self._assign_rows(cursor, rows))
+                conn.commit()
+                last_id = rows[-1]["spotID"]
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        if moved:
+            spot_index.invalidate()
+        return moved
+
+    def ensure_assigned(self):
+        """Assign spots that have no region yet (new database); retried with backoff."""
+        if not self._pending or time.monotonic() < self._retry_at:
+            return
+        with self._lock:
+            if not self._pending:
+                return
+            try:
+                conn = db.connect()
+                try:
+                    moved = self.assign_all(conn, only_missing=True)
+                finally:
+                    conn.close()
+                self._pending = False
+                if moved and self.logger:
+                    self.logger.info("regions: assigned %s spot(s)", moved)
+            except Exception as e:
+                self._retry_at = time.monotonic() + ASSIGN_RETRY_SECONDS
+                if self.logger:
+                    self.logger.warning(f"region assignment deferred: {e}")
+
+
+region_map = RegionMap()
+
+
+@click.command("assign-regions")
+@click.option("--all", "reassign_all", is_flag=True, help="Reassign every spot, not only unassigned ones.")
+@with_appcontext
+def assign_regions_command(reassign_all):
+    """Assign Spot.region and rebuild the region rollup."""
+    conn = db.connect()
+    try:
+        moved = region_map.assign_all(conn, only_missing=not reassign_all)
+    finally:
+        conn.close()
+    click.echo(f"regions: {moved} spot(s) reassigned")
@@ -0,0 +1,166 @@
+"""
+In-process inverted index over Spot.address for /spots/search and the
+/spots/suggest typeahead.
+
+Addresses are split into lowercase alphanumeric tokens. Two maps are kept:
+  postings:  token  -> spotIDs whose address contains the token
+  prefixes:  edge n-gram of a token (its first 1..MAX_PREFIX chars) -> tokens
+so a partially typed word expands to its completions with one dict lookup.
+
+The index subscribes to the spot index and is updated on every spot write
+or reload; it never queries MySQL itself.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+
+from backend.spots.spot_index import spot_index
+
+MAX_PREFIX = 12
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text) -> list:
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+class AddressSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._doc_tokens = {}
+        self._postings = defaultdict(set)
+        self._prefixes = defaultdict(set)
+
+    # ------------------------- spot index listener -------------------------
+
+    def on_reload(self, rows):
+        with self._lock:
+            self._clear()
+            for spot_id, row in rows.items():
+                self._add(spot_id, row.get("address"))
+
+    def on_upsert(self, row):
+        with self._lock:
+            spot_id = int(row["spotID"])
+            self._drop(spot_id)
+            self._add(spot_id, row.get("address"))
+
+    def on_remove(self, spot_id):
+        with self._lock:
+            self._drop(int(spot_id))
+
+    # ------------------------- internals -------------------------
+
+    def _add(self, spot_id, address):
+        tokens = frozenset(tokenize(address))
+        self._doc_tokens[spot_id] = tokens
+        for tok in tokens:
+            if not self._postings[tok]:
+                for n in range(1, min(len(tok), MAX_PREFIX) + 1):
+                    self._prefixes[tok[:n]].add(tok)
+            self._postings[tok].add(spot_id)
+
+    def _drop(self, spot_id):
+        for tok in self._doc_tokens.pop(spot_id, ()):
+            docs = self._postings.get(tok)
+            if docs is None:
+                continue
+            docs.discard(spot_id)
+            if docs:
+                continue
+            del self._postings[tok]
+            for n in range(1, min(len(tok), MAX_PREFIX) + 1):
+                toks = self._prefixes.get(tok[:n])
+                if toks is not None:
+                    toks.discard(tok)
+                    if not toks:
+                        del self._prefixes[tok[:n]]
+
+    def _completions(self, prefix):
+        toks = self._prefixes.get(prefix[:MAX_PREFIX], ())
+        if len(prefix) > MAX_PREFIX:
+            toks = [t for t in toks if t.startswith(prefix)]
+        return toks
+
+    def _idf(self, tok):
+        return math.log(1 + len(self._doc_tokens) / (1 + len(self._postings.get(tok, ()))))
+
+    def _last_word_groups(self, word, prefix):
+        """
+        (weight, token) pairs the last query word can match, best first: the
+        exact word at full idf, completions of a partial word at half idf.
+        """
+        groups = []
+        if word in self._postings:
+            groups.append((self._idf(word), word))
+        if prefix:
+            groups += [(0.5 * self._idf(tok), tok) for tok in self._completions(word) if tok != word]
+        groups.sort(key=lambda g: (-g[0], g[1]))
+        return groups
+
+    def _ranked(self, terms, prefix, limit=None):
+        """
+        [(spotID, score)] for documents containing every word (AND), best
+        first. Every candidate shares the score of the leading exact words, so
+        only the last word's match decides the order; walking its matches from
+        the highest weight down lets a limited query stop early.
+        """
+        *exact, last = terms
+        base = None
+        if exact:
+            sets = sorted((self._postings.get(t, set()) for t in exact), key=len)
+            base = set(sets[0]).intersection(*sets[1:])
+            if not base:
+                return []
+        base_score = sum(self._idf(t) for t in exact)
+
+        out, seen = [], set()
+        for weight, tok in self._last_word_groups(last, prefix):
+            docs = self._postings[tok]
+            docs = (docs & base if base is not None else docs) - seen
+            if not docs:
+                continue
+            need = None if limit is None else limit - len(out)
+            take = sorted(docs) if need is None else heapq.nsmallest(need, docs)
+            out += [(doc, base_score + weight) for doc in take]
+            seen.update(take)
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    # ------------------------- queries -------------------------
+
+    def search(self, text, limit=20):
+        """[(spotID, score)] best first; the last word may be partial."""
+        terms = tokenize(text)
+        if not terms:
+            return []
+        with self._lock:
+            return self._ranked(terms, True, limit)
+
+    def suggest(self, prefix, limit=10):
+        """Typeahead: best matching spotIDs and word completions for `prefix`."""
+        terms = tokenize(prefix)
+        if not terms:
+            return [], []
+        with self._lock:
+            completions = heapq.nsmallest(limit, self._completions(terms[-1]),
+                                          key=lambda t: (-len(self._postings[t]), t))
+            ranked = self._ranked(terms, True, limit)
+        return [doc for doc, _ in ranked], completions
+
+    def stats(self):
+        with self._lock:
+            return {"documents": len(self._doc_tokens), "tokens": len(self._postings),
+                    "prefixes": len(self._prefixes)}
+
+
+address_index = AddressSearchIndex()
+spot_index.subscribe(address_index)
@@ -0,0 +1,366 @@
+"""
+In-process spatial index of Spot rows.
+
+Every worker keeps a copy of the Spot table in memory: row dicts keyed by
+spotID plus NumPy arrays of latitude/longitude/status, bucketed into a fixed
+lat/lon grid. Radius, bounding-box and k-nearest queries only touch the grid
+cells that overlap the query, so map pages are answered without MySQL.
+
+Consistency:
+  - routes that write a spot call refresh_spots()/remove_spot() after commit
+    (write-through for this worker);
+  - invalidate() forces a full reload on next use (bulk updates);
+  - all three publish "spots" through backend/cache_sync.py, and the other
+    workers reload their index on next use once they see the new counter;
+  - the whole index is reloaded in the background once it is older than
+    SPOT_INDEX_MAX_AGE seconds, a backstop for writes made outside the API.
+
+Other in-memory structures derived from Spot rows register with subscribe()
+and receive on_reload(rows) / on_upsert(row) / on_remove(spot_id) calls under
+the index lock, so they always change together with the index.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from backend.cache_sync import cache_sync
+from backend.db_connection import db
+from backend.spots.geo import haversine_km, radius_bbox
+
+SPOT_COLUMNS = (
+    "spotID", "price", "contactTel", "estViewPerMonth", "monthlyRentCost",
+    "endTimeOfCurrentOrder", "status", "address", "longitude", "latitude", "imageURL", "region",
+)
+SPOT_SELECT_SQL = f"SELECT {', '.join(SPOT_COLUMNS)} FROM Spot"
+
+STATUS_CODES = {"free": 0, "inuse": 1, "planned": 2, "w.issue": 3}
+NO_STATUS = -1
+
+RELOAD_RETRY_SECONDS = 30
+
+# Above this many grid cells a query just scans every slot (vectorized).
+MAX_CELLS_PER_QUERY = 4096
+
+
+class SpotIndex:
+    def __init__(self, cell_deg: float = 0.05):
+        self.cell_deg = float(cell_deg)
+        self.enabled = True
+        self.max_age = 300.0
+        self.logger = None
+
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._stale = False
+        self._retry_at = 0.0
+        self.loaded_at = None
+        # Bumped on every change; caches built on top of the index key on it.
+        self.version = 0
+        self._listeners = []
+        self._clear()
+
+    def subscribe(self, listener):
+        """Register an object with on_reload/on_upsert/on_remove methods."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self.loaded:
+                listener.on_reload(dict(self._rows))
+
+    # ------------------------- lifecycle -------------------------
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("SPOT_INDEX_ENABLED", True))
+        self.max_age = float(app.config.get("SPOT_INDEX_MAX_AGE", 300))
+        self.cell_deg = float(app.config.get("SPOT_INDEX_CELL_DEG", self.cell_deg))
+        self.logger = app.logger
+        if not self.enabled:
+            return
+        try:
+            self.reload()
+            app.logger.info("spot index loaded: %s spots", len(self))
+        except Exception as e:
+            # DB may not be up yet (docker compose); load lazily on first query.
+            app.logger.warning(f"spot index not loaded at startup: {e}")
+
+    def _clear(self):
+        self._rows = {}
+        self._slot = {}
+        self._free = []
+        self._cells = defaultdict(set)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lat = np.zeros(0, dtype=np.float64)
+        self._lon = np.zeros(0, dtype=np.float64)
+        self._status = np.zeros(0, dtype=np.int8)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def loaded(self):
+        return self.loaded_at is not None
+
+    def reload(self, conn=None):
+        """Rebuild the whole index from MySQL."""
+        with self._reload_lock:
+            own = conn is None
+            conn = conn or db.connect()
+            cur = conn.cursor()
+            try:
+                cur.execute(SPOT_SELECT_SQL)
+                rows = cur.fetchall()
+            finally:
+                cur.close()
+                if own:
+                    conn.close()
+
+            with self._lock:
+                self._clear()
+                self._grow(len(rows))
+                for row in rows:
+                    self._insert(row)
+                for listener in self._listeners:
+                    listener.on_reload(dict(self._rows))
+                self._stale = False
+                self.loaded_at = time.monotonic()
+                self.version += 1
+
+    def invalidate(self):
+        """Drop everything on next use (e.g. after a bulk UPDATE), in every worker."""
+        self._mark_stale()
+        cache_sync.publish("spots")
+
+    def _mark_stale(self):
+        with self._lock:
+            self._stale = True
+            self.version += 1
+
+    def ready(self):
+        """
+        Make sure the index can answer a query. Returns False when it is
+        disabled or cannot be loaded, so callers fall back to SQL.
+        """
+        if not self.enabled:
+            return False
+        if not self.loaded or self._stale:
+            if time.monotonic() < self._retry_at:
+                return self.loaded
+            try:
+                self.reload()
+            except Exception as e:
+                # Back off so an unreachable DB doesn't cost every request a connect attempt.
+                self._retry_at = time.monotonic() + RELOAD_RETRY_SECONDS
+                if self.logger:
+                    self.logger.error(f"spot index reload failed: {e}")
+                return self.loaded
+        elif self.max_age > 0 and time.monotonic() - self.loaded_at > self.max_age:
+            self._reload_in_background()
+        return True
+
+    def _reload_in_background(self):
+        if self._reload_lock.locked():
+            return
+
+        def run():
+            try:
+                self.reload()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"spot index background reload failed: {e}")
+
+        threading.Thread(target=run, name="spot-index-reload", daemon=True).start()
+
+    # ------------------------- write-through -------------------------
+
+    def refresh_spots(self, spot_ids, conn=None):
+        """Re-read the given spots from MySQL after a committed write."""
+        ids = [int(i) for i in spot_ids if i is not None]
+        if ids:
+            cache_sync.publish("spots")
+        if not ids or not self.enabled or not self.loaded:
+            return
+        own = conn is None
+        try:
+            conn = conn or db.connect()
+            cur = conn.cursor()
+            try:
+                cur.execute(
+                    f"{SPOT_SELECT_SQL} WHERE spotID IN ({','.join(['%s'] * len(ids))})",
+                    tuple(ids),
+                )
+                rows = {int(r["spotID"]): r for r in cur.fetchall()}
+            finally:
+                cur.close()
+        except Exception as e:
+            # Never fail the write because of the cache; reload next time instead.
+            if self.logger:
+                self.logger.error(f"spot index refresh failed: {e}")
+            self._mark_stale()
+            return
+        finally:
+            if own and conn is not None:
+                conn.close()
+
+        with self._lock:
+            for spot_id in ids:
+                if spot_id in rows:
+                    self._upsert(rows[spot_id])
+                    for listener in self._listeners:
+                        listener.on_upsert(rows[spot_id])
+                else:
+                    self._remove(spot_id)
+                    for listener in self._listeners:
+                        listener.on_remove(spot_id)
+            self.version += 1
+
+    def remove_spot(self, spot_id):
+        cache_sync.publish("spots")
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove(int(spot_id))
+            for listener in self._listeners:
+                listener.on_remove(int(spot_id))
+            self.version += 1
+
+    # ------------------------- internals -------------------------
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def _grow(self, need):
+        size = len(self._ids)
+        used = size - len(self._free)
+        if used + need <= size:
+            return
+        new_size = max(1024, size * 2, used + need)
+        extra = new_size - size
+        self._ids = np.concatenate([self._ids, np.full(extra, -1, dtype=np.int64)])
+        self._lat = np.concatenate([self._lat, np.full(extra, np.nan)])
+        self._lon = np.concatenate([self._lon, np.full(extra, np.nan)])
+        self._status = np.concatenate([self._status, np.full(extra, NO_STATUS, dtype=np.int8)])
+        # Pop from the end so slots are filled in ascending order.
+        self._free.extend(range(new_size - 1, size - 1, -1))
+
+    def _insert(self, row):
+        spot_id = int(row["spotID"])
+        if not self._free:
+            self._grow(1)
+        slot = self._free.pop()
+        self._rows[spot_id] = row
+        self._slot[spot_id] = slot
+        self._ids[slot] = spot_id
+        self._status[slot] = STATUS_CODES.get(row.get("status"), NO_STATUS)
+        lat, lon = row.get("latitude"), row.get("longitude")
+        if lat is None or lon is None:
+            self._lat[slot] = self._lon[slot] = np.nan
+            return
+        lat, lon = float(lat), float(lon)
+        self._lat[slot], self._lon[slot] = lat, lon
+        self._cells[self._cell(lat, lon)].add(slot)
+
+    def _remove(self, spot_id):
+        slot = self._slot.pop(spot_id, None)
+        self._rows.pop(spot_id, None)
+        if slot is None:
+            return
+        lat, lon = self._lat[slot], self._lon[slot]
+        if not np.isnan(lat):
+            cell = self._cells.get(self._cell(lat, lon))
+            if cell is not None:
+                cell.discard(slot)
+                if not cell:
+                    del self._cells[self._cell(lat, lon)]
+        self._ids[slot] = -1
+        self._lat[slot] = self._lon[slot] = np.nan
+        self._status[slot] = NO_STATUS
+        self._free.append(slot)
+
+    def _upsert(self, row):
+        self._remove(int(row["spotID"]))
+        self._insert(row)
+
+    def _candidate_slots(self, min_lat, min_lon, max_lat, max_lon):
+        i0, j0 = self._cell(min_lat, min_lon)
+        i1, j1 = self._cell(max_lat, max_lon)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > MAX_CELLS_PER_QUERY:
+            return np.flatnonzero(~np.isnan(self._lat))
+        slots = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = self._cells.get((i, j))
+                if cell:
+                    slots.extend(cell)
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+    def _status_mask(self, slots, status):
+        if not status:
+            return np.ones(len(slots), dtype=bool)
+        wanted = [STATUS_CODES[s] for s in ([status] if isinstance(status, str) else status)
+                  if s in STATUS_CODES]
+        return np.isin(self._status[slots], wanted)
+
+    # ------------------------- queries -------------------------
+
+    def radius(self, lat, lon, radius_km, status=None, limit=None):
+        """[(row, distance_km)] within radius_km, nearest first."""
+        with self._lock:
+            slots = self._candidate_slots(*radius_bbox(lat, lon, radius_km))
+            slots = slots[self._status_mask(slots, status)]
+            dist = haversine_km(lat, lon, self._lat[slots], self._lon[slots])
+            keep = dist <= radius_km
+            slots, dist = slots[keep], dist[keep]
+            order = np.argsort(dist, kind="stable")[:limit]
+            ids = self._ids[slots[order]]
+            return [(self._rows[int(i)], float(d)) for i, d in zip(ids, dist[order])]
+
+    def bbox_arrays(self, min_lat, min_lon, max_lat, max_lon, status=None):
+        """(spotIDs, lat, lon, status codes) as arrays for points inside the box."""
+        with self._lock:
+            slots = self._candidate_slots(min_lat, min_lon, max_lat, max_lon)
+            lat, lon = self._lat[slots], self._lon[slots]
+            keep = ((lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+                    & self._status_mask(slots, status))
+            slots = slots[keep]
+            return self._ids[slots], lat[keep], lon[keep], self._status[slots]
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon, status=None, limit=None):
+        """Rows whose coordinates fall inside the box, by spotID."""
+        ids = np.sort(self.bbox_arrays(min_lat, min_lon, max_lat, max_lon, status)[0])[:limit]
+        return self.rows(ids)
+
+    def rows(self, spot_ids):
+        """Row dicts for the given spotIDs (missing ones are skipped)."""
+        with self._lock:
+            return [self._rows[int(i)] for i in spot_ids if int(i) in self._rows]
+
+    def nearest(self, lat, lon, k, status=None):
+        """
+        k nearest spots as [(row, distance_km)]. Grows the search radius until
+        at least k spots are inside it; the k closest of those are exact.
+        """
+        radius_km = 1.0
+        while radius_km < 2 * math.pi * 6371.0:
+            found = self.radius(lat, lon, radius_km, status=status, limit=k)
+            if len(found) >= k:
+                return found
+            radius_km *= 4
+        return self.radius(lat, lon, math.inf, status=status, limit=k)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "spots": len(self._rows),
+                "cells": len(self._cells),
+                "version": self.version,
+                "age_s": None if self.loaded_at is None else round(time.monotonic() - self.loaded_at, 1),
+            }
+
+
+spot_index = SpotIndex()
+cache_sync.subscribe("spots", spot_index._mark_stale)
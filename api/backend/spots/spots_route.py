@@ -1,12 +1,23 @@
 from __future__ import annotations
+import math
 from flask import Blueprint, request, jsonify, current_app
 from backend.db_connection import db  
+from backend.cache import metrics_cache
+from backend.orders.rollup import apply_contributions, order_contributions, spot_order_ids
+from backend.spots.geo import DISTANCE_KM_SQL, MBR_FILTER_SQL, radius_polygon_wkt
+from backend.spots.regions import region_map
+from backend.spots.spot_index import spot_index
+from backend.spots.search_index import address_index
+from backend.spots.tiles import MAX_ZOOM, get_tile
+from backend.pagination import CursorError, decode_cursor, keyset_predicate, paginate
 from typing import Any, List
 
 
 spots = Blueprint("spots", __name__)
 
 VALID_STATUSES = {"free", "inuse", "planned", "w.issue"}
+# Declaration order of the Spot.status ENUM (what ORDER BY status uses)
+STATUS_ENUM_ORDER = ("free", "inuse", "w.issue", "planned")
 
 # ------------------------- helpers -------------------------
 
@@ -14,10 +25,12 @@ def _valid_status(s: str | None) -> bool:
     return bool(s) and s in VALID_STATUSES
 
 def _numbers(*vals):
+    """Finite floats, or None if any value is not a number (nan/inf included)."""
     try:
-        return [float(v) for v in vals]
+        nums = [float(v) for v in vals]
     except Exception:
         return None
+    return nums if all(math.isfinite(n) for n in nums) else None
 
 def _close(cursor, conn):
     try:
@@ -40,6 +53,8 @@ def list_spots():
       q=<address contains> (also supports key_word=)
       sort=spotID|price|views|status   order=asc|desc
       limit (1..1000), offset (>=0)
+      cursor=<next_cursor from the previous page> (empty for the first page)
+        switches to keyset pagination and returns {data, next_cursor}
     """
     conn = cursor = None
     try:
@@ -71,6 +86,7 @@ def list_spots():
         # q / key_word
         q = (request.args.get("q") or request.args.get("key_word") or "").strip()
         if q:
+            # substring match; word-prefix matching lives in /spots/search and /spots/suggest
             where.append("address LIKE %s")
             params.append(f"%{q}%")
 
@@ -84,17 +100,42 @@ def list_spots():
         except ValueError:
             return jsonify({"error": "limit/offset must be integers"}), 400
 
+        keyset = "cursor" in request.args
+        sort_col = None if sort == "spotID" else sort
+        scope = f"spots:{sort}:{order}"
+        if keyset:
+            # (sort, spotID) keyset; backed by the composite indexes on Spot
+            try:
+                after = decode_cursor(request.args.get("cursor", ""), scope)
+            except CursorError as e:
+                return jsonify({"error": str(e)}), 400
+            if after is not None:
+                pred, pred_params = keyset_predicate(
+                    sort_col, "spotID", order == "DESC", after,
+                    enum_values=STATUS_ENUM_ORDER if sort_col == "status" else None,
+                )
+                where.append(pred)
+                params += pred_params
+
+        order_by = f"{sort} {order}" if sort_col is None else f"{sort} {order}, spotID {order}"
         sql = (
             "SELECT spotID, price, contactTel, estViewPerMonth, monthlyRentCost, "
             "endTimeOfCurrentOrder, status, address, longitude, latitude, imageURL "
-            f"FROM Spot WHERE {' AND '.join(where)} ORDER BY {sort} {order} LIMIT %s OFFSET %s"
+            f"FROM Spot WHERE {' AND '.join(where)} ORDER BY {order_by} LIMIT %s"
         )
-        params += [limit, offset]
+        if keyset:
+            params.append(limit + 1)
+        else:
+            sql += " OFFSET %s"
+            params += [limit, offset]
 
         conn = db.connect()
         cursor = conn.cursor()  # DictCursor set in db_connection
         cursor.execute(sql, tuple(params))
         rows = cursor.fetchall()
+        if keyset:
+            key = (lambda r: [r["spotID"]]) if sort_col is None else (lambda r: [r[sort_col], r["spotID"]])
+            return jsonify(paginate(rows, limit, scope, key)), 200
         return jsonify(rows), 200
 
     except Exception as e:
@@ -131,8 +172,12 @@ def create_spot():
                 payload["longitude"], payload["latitude"], payload.get("imageURL")
             ),
         )
+        new_id = cursor.lastrowid
+        region_map.assign_spots(cursor, [new_id])
         conn.commit()
-        return jsonify({"message": "created", "spotID": cursor.lastrowid}), 201
+        spot_index.refresh_spots([new_id], conn)
+        metrics_cache.invalidate("spots")
+        return jsonify({"message": "created", "spotID": new_id}), 201
     except Exception as e:
         current_app.logger.error(f"create_spot error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -191,7 +236,11 @@ def update_spot(spot_id: int):
         conn = db.connect()
         cursor = conn.cursor()
         cursor.execute(f"UPDATE Spot SET {sets} WHERE spotID=%s", tuple(values))
+        if "latitude" in keys or "longitude" in keys:
+            region_map.assign_spots(cursor, [spot_id])
         conn.commit()
+        spot_index.refresh_spots([spot_id], conn)
+        metrics_cache.invalidate("spots")
         return jsonify({"message": "updated", "spotID": spot_id}), 200
 
     except Exception as e:
@@ -207,8 +256,14 @@ def delete_spot(spot_id: int):
     try:
         conn = db.connect()
         cursor = conn.cursor()
+        order_ids = spot_order_ids(cursor, [spot_id])
+        before = order_contributions(cursor, order_ids)
         cursor.execute("DELETE FROM Spot WHERE spotID=%s", (spot_id,))
+        # its SpotOrder rows cascade away
+        apply_contributions(cursor, before, order_contributions(cursor, order_ids))
         conn.commit()
+        spot_index.remove_spot(spot_id)
+        metrics_cache.invalidate("spots", "orders")
         return jsonify({"message": "deleted", "spotID": spot_id}), 200
     except Exception as e:
         current_app.logger.error(f"delete_spot error: {e}")
@@ -240,13 +295,17 @@ def find_spots_near():
         if status and not _valid_status(status):
             return jsonify({"error": "Invalid status"}), 400
 
-        params: List[Any] = [lat, lon, lat]
+        if spot_index.ready():
+            hits = spot_index.radius(lat, lon, radius_km, status=status, limit=100)
+            return jsonify([dict(row, distance_km=d) for row, d in hits]), 200
+
+        # MBR prefilter on the spatial index, exact sphere distance on survivors
+        params: List[Any] = [lat, lon, radius_polygon_wkt(lat, lon, radius_km)]
         sql = (
             "SELECT spotID, price, contactTel, estViewPerMonth, monthlyRentCost, endTimeOfCurrentOrder, "
-            "status, address, longitude, latitude, "
-            "(6371 * acos( cos(radians(%s)) * cos(radians(latitude)) * "
-            "cos(radians(longitude) - radians(%s)) + sin(radians(%s)) * sin(radians(latitude)) )) AS distance_km "
-            "FROM Spot WHERE latitude IS NOT NULL AND longitude IS NOT NULL "
+            f"status, address, longitude, latitude, {DISTANCE_KM_SQL} AS distance_km "
+            f"FROM Spot WHERE {MBR_FILTER_SQL} "
+            "AND latitude IS NOT NULL AND longitude IS NOT NULL "
         )
         if status:
             sql += "AND status=%s "
@@ -267,11 +326,84 @@ def find_spots_near():
         _close(cursor, conn)
 
 
+@spots.route("/suggest", methods=["GET"])
+def suggest_spots():
+    """
+    GET /spots/suggest?prefix=nw 8t&limit=10
+    Typeahead over spot addresses:
+      { "prefix", "completions": [words], "spots": [{spotID, address, status}] }
+    """
+    prefix = (request.args.get("prefix") or request.args.get("q") or "").strip()
+    try:
+        limit = max(1, min(50, int(request.args.get("limit", "10"))))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not prefix:
+        return jsonify({"prefix": prefix, "completions": [], "spots": []}), 200
+    if not spot_index.ready():
+        return jsonify({"error": "spot index unavailable"}), 503
+
+    spot_ids, completions = address_index.suggest(prefix, limit=limit)
+    rows = spot_index.rows(spot_ids)
+    return jsonify({
+        "prefix": prefix,
+        "completions": completions,
+        "spots": [{"spotID": r["spotID"], "address": r["address"], "status": r["status"]} for r in rows],
+    }), 200
+
+
+@spots.route("/nearest", methods=["GET"])
+def find_spots_nearest():
+    """
+    GET /spots/nearest?lat=29.6516&lon=-82.3248&k=10&status=free
+    k nearest spots (k <= 200), served from the in-memory spot index.
+    """
+    lat_s = request.args.get("lat")
+    lon_s = request.args.get("lon") or request.args.get("lng")
+    status = request.args.get("status")
+    if not lat_s or not lon_s:
+        return jsonify({"error": "Missing required query params: lat, lon"}), 400
+    nums = _numbers(lat_s, lon_s)
+    if not nums:
+        return jsonify({"error": "lat, lon must be finite numbers"}), 400
+    lat, lon = nums
+    k = request.args.get("k", type=int) if request.args.get("k") else 10
+    if k is None:
+        return jsonify({"error": "k must be an integer"}), 400
+    k = max(1, min(200, k))
+    if status and not _valid_status(status):
+        return jsonify({"error": "Invalid status"}), 400
+    if not spot_index.ready():
+        return jsonify({"error": "spot index unavailable"}), 503
+
+    hits = spot_index.nearest(lat, lon, k, status=status)
+    return jsonify([dict(row, distance_km=d) for row, d in hits]), 200
+
+
+@spots.route("/tiles/<int:z>/<int:x>/<int:y>", methods=["GET"])
+def spot_tile(z: int, x: int, y: int):
+    """
+    GET /spots/tiles/<z>/<x>/<y>?status=free
+    Web Mercator tile of spots, clustered below street-level zoom:
+      { z, x, y, bbox, count, clusters: [{count, latitude, longitude, status:{..}}], points: [...] }
+    """
+    status = request.args.get("status")
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": "tile out of range"}), 400
+    if status and not _valid_status(status):
+        return jsonify({"error": "Invalid status"}), 400
+    if not spot_index.ready():
+        return jsonify({"error": "spot index unavailable"}), 503
+    return jsonify(get_tile(z, x, y, status)), 200
+
+
 @spots.route("/search", methods=["GET"])
 def search_spots():
     """
     GET /spots/search?q=Main&top_n=20
-    Also supports key_word=. Falls back to LIKE if FULLTEXT is unavailable.
+    Also supports key_word=. Ranked by the in-memory address index (every word
+    must match, the last one may be partial); falls back to MySQL FULLTEXT,
+    then LIKE, when the index is unavailable.
     """
     conn = cursor = None
     try:
@@ -284,6 +416,10 @@ def search_spots():
         except Exception:
             return jsonify({"error": "top_n must be an integer"}), 400
 
+        if spot_index.ready():
+            ranked = address_index.search(q, limit=top_n)
+            return jsonify(spot_index.rows(spot_id for spot_id, _ in ranked)), 200
+
         conn = db.connect()
         cursor = conn.cursor()
         try:
@@ -298,8 +434,8 @@ def search_spots():
                 "SELECT spotID, price, contactTel, estViewPerMonth, monthlyRentCost, endTimeOfCurrentOrder, "
                 "status, address, longitude, latitude "
                 "FROM Spot WHERE address LIKE %s LIMIT %s",
-                "(f\"%{q}%\", top_n)",
-                 )
+                (f"%{q}%", top_n),
+            )
         rows = cursor.fetchall()
         return jsonify(rows), 200
 
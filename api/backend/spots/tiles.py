@@ -0,0 +1,135 @@
+"""
+Pre-clustered map tiles for the pydeck pages: /spots/tiles/<z>/<x>/<y>.
+
+Tiles use the usual Web Mercator (slippy map) z/x/y scheme. Each 256px tile
+is split into a grid of CLUSTER_PX cells; spots in the same cell are merged
+into one cluster with a count, centroid and per-status breakdown. From
+POINTS_MIN_ZOOM upwards (street level) individual spots are returned instead.
+
+Tiles are built from the in-memory spot index and cached; the cache is keyed
+on spot_index.version, so any spot write invalidates it.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.spots.spot_index import STATUS_CODES, spot_index
+
+TILE_PX = 256
+CLUSTER_PX = 64
+POINTS_MIN_ZOOM = 15
+MAX_ZOOM = 22
+POINT_FIELDS = ("spotID", "address", "status", "price", "estViewPerMonth", "latitude", "longitude")
+
+_STATUS_NAMES = sorted(STATUS_CODES, key=STATUS_CODES.get)
+
+
+def tile_bounds(z: int, x: int, y: int):
+    """(min_lat, min_lon, max_lat, max_lon) of a slippy-map tile."""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def _pixels(z, x, y, lat, lon):
+    """Tile-local pixel coordinates for arrays of lat/lon."""
+    n = 2 ** z
+    px = ((lon + 180.0) / 360.0 * n - x) * TILE_PX
+    lat_r = np.radians(np.clip(lat, -85.05112878, 85.05112878))
+    py = ((1 - np.arcsinh(np.tan(lat_r)) / math.pi) / 2 * n - y) * TILE_PX
+    return px, py
+
+
+def build_tile(z: int, x: int, y: int, status=None) -> dict:
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+    ids, lat, lon, codes = spot_index.bbox_arrays(min_lat, min_lon, max_lat, max_lon, status)
+
+    # Half-open pixel ranges so a spot on a tile edge lands in exactly one tile.
+    px, py = _pixels(z, x, y, lat, lon)
+    keep = (px >= 0) & (px < TILE_PX) & (py >= 0) & (py < TILE_PX)
+    ids, lat, lon, codes, px, py = ids[keep], lat[keep], lon[keep], codes[keep], px[keep], py[keep]
+
+    tile = {
+        "z": z, "x": x, "y": y,
+        "bbox": [min_lon, min_lat, max_lon, max_lat],
+        "count": int(len(ids)),
+        "clusters": [],
+        "points": [],
+    }
+    if z >= POINTS_MIN_ZOOM:
+        tile["points"] = [{k: row.get(k) for k in POINT_FIELDS} for row in spot_index.rows(ids)]
+        return tile
+
+    per_side = TILE_PX // CLUSTER_PX
+    cell = (py // CLUSTER_PX).astype(np.int64) * per_side + (px // CLUSTER_PX).astype(np.int64)
+    n_cells = per_side * per_side
+    counts = np.bincount(cell, minlength=n_cells)
+    sum_lat = np.bincount(cell, weights=lat, minlength=n_cells)
+    sum_lon = np.bincount(cell, weights=lon, minlength=n_cells)
+    # Status codes are -1..3; shift by one so "no status" gets its own column.
+    n_status = len(_STATUS_NAMES) + 1
+    by_status = np.bincount(cell * n_status + (codes.astype(np.int64) + 1),
+                            minlength=n_cells * n_status).reshape(n_cells, n_status)
+
+    singles = []
+    for c in np.flatnonzero(counts):
+        if counts[c] == 1:
+            singles.append(int(ids[cell == c][0]))
+            continue
+        breakdown = {name: int(by_status[c, i + 1]) for i, name in enumerate(_STATUS_NAMES)
+                     if by_status[c, i + 1]}
+        if by_status[c, 0]:
+            breakdown["none"] = int(by_status[c, 0])
+        tile["clusters"].append({
+            "count": int(counts[c]),
+            "latitude": float(sum_lat[c] / counts[c]),
+            "longitude": float(sum_lon[c] / counts[c]),
+            "status": breakdown,
+        })
+    tile["points"] = [{k: row.get(k) for k in POINT_FIELDS} for row in spot_index.rows(singles)]
+    return tile
+
+
+class TileCache:
+    """Small LRU of built tiles, flushed whenever the spot index changes."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._tiles = OrderedDict()
+        self._version = None
+        self.hits = self.misses = 0
+
+    def get(self, key, version, build):
+        with self._lock:
+            if version != self._version:
+                self._tiles.clear()
+                self._version = version
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                self.hits += 1
+                return tile
+            self.misses += 1
+
+        tile = build()
+        with self._lock:
+            if version == self._version:
+                self._tiles[key] = tile
+                while len(self._tiles) > self.max_entries:
+                    self._tiles.popitem(last=False)
+        return tile
+
+
+tile_cache = TileCache()
+
+
+def get_tile(z: int, x: int, y: int, status=None) -> dict:
+    return tile_cache.get((z, x, y, status), spot_index.version, lambda: build_tile(z, x, y, status))
@@ -1,11 +1,23 @@
 ###
 # Main application interface
 ###
+import os
 
 # import the create app function 
 # that lives in src/__init__.py
 from backend.rest_entry import create_app
 
+# SERVER_MODE=production runs the API under gunicorn (multi-process,
+# threads per worker, worker recycling; settings in gunicorn.conf.py).
+# The default "dev" keeps the Werkzeug server with the reloader.
+SERVER_MODE = os.getenv("SERVER_MODE", "dev").strip().lower()
+
+if __name__ == '__main__' and SERVER_MODE == "production":
+    # replace this process with gunicorn, which imports backend_app:app itself
+    here = os.path.dirname(os.path.abspath(__file__))
+    os.execvp("gunicorn", ["gunicorn", "--chdir", here, "--config", os.path.join(here, "gunicorn.conf.py"),
+                           "backend_app:app"])
+
 # create the app object
 app = create_app()
 
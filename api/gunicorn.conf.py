@@ -0,0 +1,85 @@
+###
+# Production server settings (SERVER_MODE=production, see backend_app.py)
+#
+#   gunicorn -c gunicorn.conf.py backend_app:app
+#
+# Every value can be overridden from the environment. Workers are separate
+# processes (one per core by default), each with SERVER_THREADS request
+# threads and its own DB pool (backend/db_connection/pool.py). The app is
+# built once in the master and forked (preload), so startup work such as the
+# spot index load happens once and is shared copy-on-write. Each worker
+# keeps its own in-memory caches; writes reach the other workers through the
+# CacheVersion counters (backend/cache_sync.py, CACHE_SYNC_INTERVAL).
+#
+#   kill -HUP <master pid>    graceful reload: new workers start, old ones
+#                             finish their requests and exit
+#
+# Background jobs (backend/jobs/runner.py) run in the worker that accepted
+# them. A worker is not recycled by max_requests while it runs jobs. When it
+# stops anyway (HUP, shutdown), retention and bulk import jobs stop at their
+# next checkpoint and another worker resumes them; other jobs (bulk
+# repricing) are cut off after graceful_timeout and marked failed.
+###
+import multiprocessing
+import os
+import sys
+
+
+def _env(name, default, cast=int):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+
+bind = os.getenv("SERVER_BIND", "0.0.0.0:4000")
+workers = _env("SERVER_WORKERS", multiprocessing.cpu_count())
+threads = _env("SERVER_THREADS", 4)
+worker_class = "gthread"
+preload_app = os.getenv("SERVER_PRELOAD", "1") not in ("0", "false", "no")
+
+# recycle workers after N requests (+ jitter so they don't all restart at once)
+max_requests = _env("SERVER_MAX_REQUESTS", 2000)
+max_requests_jitter = _env("SERVER_MAX_REQUESTS_JITTER", 200)
+
+# gthread workers heartbeat from their main loop, so long streaming exports
+# are not cut off by `timeout`; graceful_timeout bounds reloads/recycling
+timeout = _env("SERVER_TIMEOUT", 120)
+graceful_timeout = _env("SERVER_GRACEFUL_TIMEOUT", 60)
+keepalive = _env("SERVER_KEEPALIVE", 5)
+
+accesslog = os.getenv("SERVER_ACCESS_LOG", "-")
+errorlog = "-"
+
+# create_app() reads these to size each worker's DB pool
+os.environ["SERVER_WORKERS"] = str(workers)
+os.environ["SERVER_THREADS"] = str(threads)
+
+
+def post_worker_init(worker):
+    # pick up resumable jobs left behind by the worker this one replaces
+    from backend.jobs.runner import job_runner
+    try:
+        job_runner.resume_orphans()
+    except Exception as e:
+        worker.log.warning("resuming jobs failed: %s", e)
+
+
+def pre_request(worker, req):
+    # defer max_requests recycling while this worker runs background jobs
+    from backend.jobs.runner import job_runner
+    if not hasattr(worker, "recycle_after"):
+        worker.recycle_after = worker.max_requests
+    worker.max_requests = sys.maxsize if job_runner.busy() else worker.recycle_after
+
+
+def worker_exit(server, worker):
+    # let resumable jobs reach a checkpoint and hand them to another worker
+    from backend.jobs.runner import job_runner
+    if job_runner.busy() and not job_runner.stop():
+        worker.log.warning("worker exiting with background jobs still running")
+
+
+def when_ready(server):
+    # connections opened while preloading belong to the master; workers open their own
+    from backend.db_connection import db
+    db.close_all()
+    server.log.info("SpotLight API: %s workers x %s threads on %s", workers, threads, bind)
@@ -0,0 +1,29 @@
+# Polling for background jobs started by the API (bulk import, bulk repricing,
+# retention). The API answers 202 + {"jobID": ...} at once; we follow
+# /jobs/<id> with a progress bar until the job succeeds or fails.
+
+import time
+
+import streamlit as st
+
+POLL_SECONDS = 1.0
+MAX_WAIT_SECONDS = 3600
+
+
+def wait_for_job(api, job_id, label="Working..."):
+    """Poll /jobs/<job_id> via the page's api() helper; returns the final job dict (or None)."""
+    bar = st.progress(0.0, text=label)
+    deadline = time.monotonic() + MAX_WAIT_SECONDS
+    job = None
+    while time.monotonic() < deadline:
+        code, job = api("GET", f"/jobs/{job_id}")
+        if code != 200 or not isinstance(job, dict):
+            bar.empty()
+            st.error(f"Could not read job {job_id}: {code} {job}")
+            return None
+        bar.progress(float(job.get("progress") or 0.0), text=f"{label} {job.get('message') or ''}".strip())
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(POLL_SECONDS)
+    bar.empty()
+    return job
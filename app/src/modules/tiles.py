@@ -0,0 +1,92 @@
+# Viewport-driven loading of pre-clustered spot tiles (/spots/tiles/<z>/<x>/<y>)
+# shared by the map pages. The page picks a center + zoom, we work out which
+# 256px tiles cover the visible area, fetch only those, and turn the result
+# into pydeck layers (cluster bubbles + individual spots).
+
+import math
+
+import pandas as pd
+import pydeck as pdk
+import requests
+import streamlit as st
+
+TILE_PX = 256
+POINTS_MIN_ZOOM = 15  # matches the API: individual spots from this zoom up
+CLUSTER_COLOR = [30, 110, 200, 160]
+POINT_COLOR = [220, 60, 60, 200]
+
+
+def tile_xy(lat, lng, zoom):
+    """Fractional slippy-map tile coordinates of a lat/lng at a zoom level."""
+    n = 2 ** zoom
+    lat = max(-85.05112878, min(85.05112878, lat))
+    x = (lng + 180.0) / 360.0 * n
+    y = (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    return x, y
+
+
+def tiles_for_view(lat, lng, zoom, width_px=1000, height_px=500):
+    """(z, x, y) of every tile overlapping a width x height viewport centered on lat/lng."""
+    zoom = int(zoom)
+    n = 2 ** zoom
+    cx, cy = tile_xy(lat, lng, zoom)
+    half_w, half_h = width_px / 2 / TILE_PX, height_px / 2 / TILE_PX
+    x0, x1 = int(math.floor(cx - half_w)), int(math.floor(cx + half_w))
+    y0, y1 = max(0, int(math.floor(cy - half_h))), min(n - 1, int(math.floor(cy + half_h)))
+    # x wraps around the antimeridian; at low zoom several offsets map to one tile
+    tiles = [(zoom, x % n, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+    return list(dict.fromkeys(tiles))
+
+
+def _fetch_tile(api_base, z, x, y, status):
+    params = {"status": status} if status else None
+    r = requests.get(f"{api_base.rstrip('/')}/spots/tiles/{z}/{x}/{y}", params=params, timeout=15)
+    r.raise_for_status()
+    return r.json()
+
+
+def load_view(api_base, lat, lng, zoom, status=None, width_px=1000, height_px=500):
+    """Fetch the tiles covering the viewport. Returns (clusters_df, points_df)."""
+    clusters, points = [], []
+    for z, x, y in tiles_for_view(lat, lng, zoom, width_px, height_px):
+        try:
+            tile = _fetch_tile(api_base, z, x, y, status)
+        except Exception as e:
+            st.error(f"Tile {z}/{x}/{y} failed: {e}")
+            continue
+        for c in tile.get("clusters", []):
+            c = dict(c)
+            c["label"] = ", ".join(f"{k}: {v}" for k, v in c.pop("status", {}).items())
+            clusters.append(c)
+        points.extend(tile.get("points", []))
+
+    cdf = pd.DataFrame(clusters, columns=["count", "latitude", "longitude", "label"])
+    pdf = pd.DataFrame(points)
+    cdf = cdf.rename(columns={"latitude": "lat", "longitude": "lng"})
+    pdf = pdf.rename(columns={"latitude": "lat", "longitude": "lng"})
+    return cdf, pdf
+
+
+def tile_layers(clusters_df, points_df):
+    """pydeck layers for a loaded view: cluster bubbles sized by count, plus points."""
+    layers = []
+    if not clusters_df.empty:
+        cdf = clusters_df.copy()
+        cdf["radius"] = cdf["count"].clip(lower=1).pow(0.5) * 40
+        cdf["text"] = cdf["count"].astype(str)
+        cdf["address"] = cdf["count"].astype(str) + " spots"
+        cdf["status"] = cdf["label"]
+        layers.append(pdk.Layer(
+            "ScatterplotLayer", cdf, get_position="[lng, lat]", get_radius="radius",
+            radius_min_pixels=8, radius_max_pixels=40, get_fill_color=CLUSTER_COLOR, pickable=True,
+        ))
+        layers.append(pdk.Layer(
+            "TextLayer", cdf, get_position="[lng, lat]", get_text="text", get_size=14,
+            get_color=[255, 255, 255, 255],
+        ))
+    if not points_df.empty:
+        layers.append(pdk.Layer(
+            "ScatterplotLayer", points_df, get_position="[lng, lat]", get_radius=60,
+            radius_min_pixels=3, get_fill_color=POINT_COLOR, pickable=True,
+        ))
+    return layers
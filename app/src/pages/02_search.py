@@ -14,7 +14,10 @@ def search_spots(query: str):
     try:
         r = requests.get(f"{API_URL}/search", params={"query": query}, timeout=10)
         if r.status_code == 200:
-            data = r.json().get("spots", [])
+            body = r.json()
+            if "spots" in body.get("timed_out", []):
+                st.warning("Search took too long; results may be incomplete.")
+            data = body.get("spots", [])
             return pd.DataFrame(data) if data else pd.DataFrame()
     except Exception as e:
         st.error(f"Search error: {e}")
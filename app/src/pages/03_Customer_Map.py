@@ -29,6 +29,7 @@ st.title("🗺️ Customer Map — Gainesville, FL")
 
 # ---- Customer sidebar (shared) ----
 from modules.nav import SideBarLinks
+from modules.tiles import POINTS_MIN_ZOOM, load_view, tile_layers
 SideBarLinks()
 
 
@@ -37,42 +38,24 @@ col1, col2, col3 = st.columns([1,1,2])
 with col1:
     status = st.selectbox("Spot status", ["any","free","inuse","planned","w.issue"], index=0)
 with col2:
-    radius_km = st.slider("Radius (km)", 1, 20, 8)
+    zoom = st.slider("Zoom", 9, 17, DEFAULT_ZOOM)
 with col3:
-    st.caption("Center fixed at Gainesville, FL (29.6516, -82.3248)")
-lat0, lng0 = 29.6516, -82.3248
+    st.caption(f"Center fixed at {DEFAULT_CITY} ({DEFAULT_LAT}, {DEFAULT_LNG}). "
+               f"Spots are grouped into clusters below zoom {POINTS_MIN_ZOOM}.")
+lat0, lng0 = DEFAULT_LAT, DEFAULT_LNG
 
-# Fetch spots from your salesman search endpoint
-params = f"lat={lat0}&lng={lng0}&radius_km={radius_km}"
-if status != "any":
-    params += f"&status={status}"
+# Fetch only the pre-clustered tiles covering the visible map
+clusters, points = load_view(API, lat0, lng0, zoom, None if status == "any" else status)
 
-data = api_get(f"/salesman/spots?{params}")
-
-if not isinstance(data, list) or len(data) == 0:
-    st.info("No spots returned. Try a larger radius or different status.")
-    st.stop()
-
-df = pd.DataFrame(data).rename(columns={"latitude":"lat","longitude":"lng"})
-# make sure required columns exist
-needed = {"lat","lng","address","spotID"}
-missing = needed - set(df.columns)
-if missing:
-    st.error(f"API response missing required columns: {missing}")
+if clusters.empty and points.empty:
+    st.info("No spots in view. Try zooming out or a different status.")
     st.stop()
 
 # Map
-layer = pdk.Layer(
-    "ScatterplotLayer",
-    df,
-    get_position="[lng, lat]",
-    get_radius=60,
-    pickable=True,
-)
-view_state = pdk.ViewState(latitude=lat0, longitude=lng0, zoom=12)
+view_state = pdk.ViewState(latitude=lat0, longitude=lng0, zoom=zoom)
 st.pydeck_chart(
     pdk.Deck(
-        layers=[layer],
+        layers=tile_layers(clusters, points),
         initial_view_state=view_state,
         map_provider="carto",
         map_style="light",        
@@ -82,6 +65,10 @@ st.pydeck_chart(
 
 # Table
 st.divider()
-st.caption(f"{len(df)} spots found")
-cols = [c for c in ["spotID","address","lat","lng","status","distance_km"] if c in df.columns]
-st.dataframe(df[cols], use_container_width=True, hide_index=True)
+in_view = (int(clusters["count"].sum()) if not clusters.empty else 0) + len(points)
+st.caption(f"{in_view} spots in view")
+if not points.empty:
+    cols = [c for c in ["spotID","address","lat","lng","status","price"] if c in points.columns]
+    st.dataframe(points[cols], use_container_width=True, hide_index=True)
+else:
+    st.caption("Zoom in to list individual spots.")
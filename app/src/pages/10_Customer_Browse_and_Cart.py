@@ -159,43 +159,17 @@ with st.form("place_order"):
     submitted = st.form_submit_button("🧾 Place Order", disabled=(len(st.session_state.cart)==0))
 
 if submitted:
-    # 4a) create order
-    payload = {"cID": int(cID), "total": float(total_price), "date": str(order_date)}
-    oc, odata = api("POST", "/orders", json=payload)
-    if oc not in (200,201):
-        st.error(f"Failed to create order via POST /orders. Response: {oc} {odata}")
-        st.stop()
-
-    # try to find orderID in response; fallback: pick latest customer order
-    order_id = None
-    if isinstance(odata, dict):
-        for k in ("orderID","id","created_id","createdId"):
-            if k in odata:
-                order_id = odata[k]
-                break
-    if not order_id:
-        # fallback—take most recent order for this customer
-        gc, gdata = api("GET", f"/customer/{cID}/orders")
-        if gc == 200 and isinstance(gdata, list) and len(gdata):
-            # assume highest/last is newest
-            order_id = sorted([row.get("orderID") for row in gdata if "orderID" in row])[-1]
-
-    if not order_id:
-        st.error("Order created but could not determine orderID from API response. Please verify your POST /orders returns orderID.")
-        st.stop()
-
-    # 4b) attach spots
-    failures = []
-    for sid in list(st.session_state.cart.keys()):
-        pc, pdata = api("POST", f"/salesman/spotorders/{sid}/{order_id}")
-        if pc not in (200,201):
-            failures.append({"spotID": sid, "code": pc, "resp": pdata})
-
-    if failures:
-        st.warning(f"Order {order_id} created, but some spots failed to attach.")
-        st.json(failures)
+    # One call: the API prices the spots and writes the order atomically
+    payload = {"cID": int(cID), "date": str(order_date), "spotIDs": [int(s) for s in st.session_state.cart]}
+    oc, odata = api("POST", "/orders/checkout", json=payload)
+    if oc == 409 and isinstance(odata, dict):
+        st.error("Some spots in your cart are no longer available. Nothing was ordered.")
+        st.dataframe(pd.DataFrame(odata.get("unavailable", [])), hide_index=True)
+    elif oc not in (200, 201):
+        st.error(f"Checkout failed: {oc} {odata}")
     else:
-        st.success(f"Order {order_id} created with {len(st.session_state.cart)} spot(s)!")
+        st.success(f"Order {odata['orderID']} created with {len(odata['spotIDs'])} spot(s), "
+                   f"total ${odata['total']:,.2f}!")
         # clear cart after success
         st.session_state.cart = {}
         time.sleep(0.5)
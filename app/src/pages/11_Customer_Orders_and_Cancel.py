@@ -41,31 +41,8 @@ cust_label = st.selectbox("Select customer", labels, index=default_idx)
 cust = cust_options[cust_label]
 cID = cust["cID"]
 
-# existing
-oc, odata = api("GET", f"/customer/{cID}/orders")
-if oc != 200 or not isinstance(odata, list): ...
-df = pd.DataFrame(odata)
-
-# NEW: pull paid/unpaid info
-tcode, tdata = api("GET", "/to_be_processed_order")  # unpaid/open
-pcode, pdata = api("GET", "/processed_orders")       # paid
-
-open_ids = set([row["orderID"] for row in tdata]) if tcode == 200 and isinstance(tdata, list) else set()
-paid_ids = set([row["orderID"] for row in pdata]) if pcode == 200 and isinstance(pdata, list) else set()
-
-def label_status(oid: int) -> str:
-    if oid in open_ids: return "UNPAID"
-    if oid in paid_ids: return "PAID"
-    return "UNKNOWN"  # e.g., created but not queued, or data gap
-
-df["paymentStatus"] = df["orderID"].map(label_status)
-
-cols = [c for c in ["orderID","date","total","paymentStatus","cID"] if c in df.columns]
-st.dataframe(df[cols], use_container_width=True, hide_index=True)
-
-
-# Load orders
-oc, odata = api("GET", f"/customer/{cID}/orders")
+# Load orders with their paid/unpaid status in one call
+oc, odata = api("GET", f"/customer/{cID}/orders?with_status=1")
 if oc != 200 or not isinstance(odata, list):
     st.error(f"Failed to load orders: {oc} {odata}")
     st.stop()
@@ -75,13 +52,13 @@ if not odata:
     st.stop()
 
 df = pd.DataFrame(odata)
-cols = [c for c in ["orderID","date","total","status","cID"] if c in df.columns]
+cols = [c for c in ["orderID","date","total","paymentStatus","cID"] if c in df.columns]
 st.dataframe(df[cols], use_container_width=True, hide_index=True)
 
 # Cancel an order
 st.subheader("Cancel an unpaid order")
 
-cancellable_ids = [oid for oid in df["orderID"].tolist() if oid in open_ids]
+cancellable_ids = df.loc[df["paymentStatus"] == "UNPAID", "orderID"].tolist()
 if not cancellable_ids:
     st.info("No unpaid (unprocessed) orders to cancel.")
 else:
@@ -71,6 +71,17 @@ with c3:
         st.error(f"{code} {data}")
 
 
+st.divider()
+st.subheader(f"Daily orders & revenue ({period})")
+code, data = api("GET", f"/o_and_m/orders/daily?period={period}")
+if code == 200 and isinstance(data, list) and data:
+    daily = pd.DataFrame(data)
+    daily["day"] = pd.to_datetime(daily["day"], errors="coerce")
+    st.line_chart(daily.set_index("day")[["orders", "customers"]])
+    st.bar_chart(daily.set_index("day")[["revenue"]])
+else:
+    st.info("No orders in this period.")
+
 st.divider()
 t1, t2, t3 = st.tabs(["Recent spots", "Recent customers", "Recent orders"])
 
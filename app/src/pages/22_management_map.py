@@ -1,5 +1,6 @@
 import os, requests, pandas as pd, streamlit as st, pydeck as pdk
 from modules.nav import SideBarLinks
+from modules.tiles import POINTS_MIN_ZOOM, load_view, tile_layers
 
 st.set_page_config(page_title="O&M Spots Manager", layout="wide")
 SideBarLinks()
@@ -23,31 +24,25 @@ DEFAULT_LAT, DEFAULT_LNG, DEFAULT_ZOOM = 29.6516, -82.3248, 12
 left, right = st.columns([1,3])
 with left:
     status = st.selectbox("Status", ["any","free","inuse","planned","w.issue"], index=0)
-    radius_km = st.slider("Radius (km)", 1, 20, 8)
+    zoom = st.slider("Zoom", 9, 17, DEFAULT_ZOOM)
     lat0 = st.number_input("Center lat", value=DEFAULT_LAT, format="%.6f")
     lng0 = st.number_input("Center lng", value=DEFAULT_LNG, format="%.6f")
     if st.button("Center on Gainesville"):
         lat0, lng0 = DEFAULT_LAT, DEFAULT_LNG
 with right:
-    st.caption("Use filters to fetch nearby spots. Click a point to see details in the table below.")
+    st.caption(f"Move the center / zoom to load the spots in view. Spots are clustered below zoom "
+               f"{POINTS_MIN_ZOOM}; zoom in to list them in the table below.")
 
-params = f"lat={lat0}&lng={lng0}&radius_km={radius_km}" + (f"&status={status}" if status != "any" else "")
-code, data = api("GET", f"/salesman/spots?{params}")
-if code != 200 or not isinstance(data, list):
-    st.error(f"Failed to load spots: {code} {data}")
-    st.stop()
-
-df = pd.DataFrame(data).rename(columns={"latitude":"lat","longitude":"lng"})
-if df.empty:
-    st.info("No spots returned for those filters.")
+clusters, points = load_view(API, float(lat0), float(lng0), zoom, None if status == "any" else status)
+if clusters.empty and points.empty:
+    st.info("No spots in view for those filters.")
     st.stop()
 
 # ----- map (force light basemap) -----
-layer = pdk.Layer("ScatterplotLayer", df, get_position="[lng, lat]", get_radius=60, pickable=True)
-view_state = pdk.ViewState(latitude=float(lat0), longitude=float(lng0), zoom=DEFAULT_ZOOM)
+view_state = pdk.ViewState(latitude=float(lat0), longitude=float(lng0), zoom=zoom)
 st.pydeck_chart(
     pdk.Deck(
-        layers=[layer],
+        layers=tile_layers(clusters, points),
         initial_view_state=view_state,
         map_provider="carto",
         map_style="light",
@@ -56,12 +51,14 @@ st.pydeck_chart(
 )
 
 # ----- table & quick status update -----
-st.caption(f"{len(df)} spot(s) found")
-show_cols = [c for c in ["spotID","address","lat","lng","status","price","estViewPerMonth","monthlyRentCost","contactTel","distance_km"] if c in df.columns]
-st.dataframe(df[show_cols], use_container_width=True, hide_index=True)
+in_view = (int(clusters["count"].sum()) if not clusters.empty else 0) + len(points)
+st.caption(f"{in_view} spot(s) in view")
+if not points.empty:
+    show_cols = [c for c in ["spotID","address","lat","lng","status","price","estViewPerMonth"] if c in points.columns]
+    st.dataframe(points[show_cols], use_container_width=True, hide_index=True)
 
 st.subheader("Update spot status")
-sid = st.number_input("spotID", min_value=1, step=1, value=int(df.iloc[0]["spotID"]))
+sid = st.number_input("spotID", min_value=1, step=1, value=int(points.iloc[0]["spotID"]) if not points.empty else 1)
 new_status = st.selectbox("New status", ["free","inuse","planned","w.issue"], index=0)
 if st.button("Update status", type="primary"):
     code, resp = api("PUT", f"/salesman/spots/{int(sid)}/status", json={"status": new_status})
@@ -1,6 +1,7 @@
 import os, json, pandas as pd, requests, streamlit as st
 from datetime import date
 from modules.nav import SideBarLinks
+from modules.jobs import wait_for_job
 
 st.set_page_config(page_title="O&M Admin & Imports", page_icon="🛠️", layout="wide")
 SideBarLinks()
@@ -99,81 +100,59 @@ with tab1:
 with tab2:
     st.subheader("Bulk Import / Update")
 
-    entity = st.selectbox("Entity type", ["Regions","Buildings","Spots"], index=2)
+    entity = st.selectbox("Entity type", ["Spots","Customers","Orders"], index=0)
     mode = st.segmented_control("Mode", ["Insert","Update"], default="Insert")
-    uploaded = st.file_uploader("Upload CSV or JSON", type=["csv","json"])
+    batch_size = st.select_slider("Rows per transaction", [100, 500, 1000, 2000, 5000], value=1000)
+    uploaded = st.file_uploader("Upload CSV, JSON or NDJSON", type=["csv","json","ndjson","jsonl"])
 
     sample_tip = st.expander("Field hints (minimum required)")
     with sample_tip:
         st.markdown("""
-**Regions**: `regionName`  
-**Buildings**: `buildingName`, `address`, `regionID`  
-**Spots**: `address`, `price`, `status` (free|inuse|planned|w.issue), `latitude`, `longitude`  
-Optional (Spots): `imageURL`, `estViewPerMonth`, `monthlyRentCost`, `contactTel`, `endTimeOfCurrentOrder`
+**Spots**: `address`, `price`  
+Optional: `status` (free|inuse|planned|w.issue, default free), `latitude`, `longitude`, `imageURL`, `estViewPerMonth`, `monthlyRentCost`, `contactTel`, `endTimeOfCurrentOrder`  
+**Customers**: `fName`, `lName`, `email`  
+Optional: `position`, `companyName`, `totalOrderTimes`, `VIP`, `avatarURL`, `balance`, `TEL`  
+**Orders**: `date` (YYYY-MM-DD), `total`, `cID`  
+
+**Update** mode needs the key column (`spotID` / `cID` / `orderID`) and updates the columns in the file header.
         """)
 
-    df = None
     if uploaded:
-        try:
-            if uploaded.type.endswith("json"):
-                data = json.load(uploaded)
-                df = pd.DataFrame(data if isinstance(data, list) else [data])
-            else:
-                df = pd.read_csv(uploaded)
-        except Exception as e:
-            st.error(f"Parse error: {e}")
-
-    if df is not None and not df.empty:
-        st.markdown("**Preview**")
-        st.dataframe(df.head(25), use_container_width=True, hide_index=True)
-
-        def validate_row(row, kind):
-            missing = []
-            if kind == "Regions":
-                need = ["regionName"]
-            elif kind == "Buildings":
-                need = ["buildingName","address","regionID"]
+        name = uploaded.name.lower()
+        content_type = ("text/csv" if name.endswith(".csv")
+                        else "application/x-ndjson" if name.endswith((".ndjson", ".jsonl"))
+                        else "application/json")
+        st.caption(f"{uploaded.size:,} bytes — rows are validated on the server")
+        if content_type == "text/csv":
+            try:
+                st.markdown("**Preview**")
+                st.dataframe(pd.read_csv(uploaded, nrows=25), use_container_width=True, hide_index=True)
+            except Exception as e:
+                st.error(f"Parse error: {e}")
+            uploaded.seek(0)
+
+        if st.button(f"{mode} {entity.lower()}", type="primary"):
+            target = entity.lower()
+            code, data = api("POST", f"/o_and_m/bulk_import?entity={target}&mode={mode.lower()}"
+                                     f"&batch_size={batch_size}&async=1",
+                             data=uploaded, headers={"Content-Type": content_type})
+            if code == 202 and isinstance(data, dict):
+                job = wait_for_job(api, data["jobID"], "Importing...")
+                if job and job["status"] == "failed":
+                    code, data = 500, job.get("error")
+                elif job:
+                    code, data = 200, job["result"]
+            if code in (200,201) and isinstance(data, dict):
+                st.success(f"{data['written']:,} of {data['received']:,} rows written in "
+                           f"{data['batches']} batch(es), {data['elapsed_ms']:,.0f} ms")
+                if data.get("aborted"):
+                    st.warning(f"Stopped early: {data['aborted']}")
+                if data.get("failed"):
+                    st.error(f"{data['failed']:,} row(s) failed"
+                             + (" (first 1000 shown)" if data.get("errors_truncated") else ""))
+                    st.dataframe(pd.DataFrame(data["errors"]), use_container_width=True, hide_index=True)
             else:
-                need = ["address","price","status","latitude","longitude"]
-            for k in need:
-                if pd.isna(row.get(k, None)): missing.append(k)
-            return missing
-
-        errs = []
-        for i, row in df.iterrows():
-            miss = validate_row(row, entity)
-            if miss: errs.append((i, miss))
-        if errs:
-            st.error(f"Validation failed on {len(errs)} rows (showing first 10):")
-            st.write(errs[:10])
-        else:
-            st.success("Validation passed ✅")
-            if st.button(("Insert" if mode=="Insert" else "Update") + f" {len(df)} {entity[:-1]}"):
-                payload_list = df.to_dict(orient="records")
-                target = "regions" if entity=="Regions" else ("buildings" if entity=="Buildings" else "spots")
-
-                # Try bulk first
-                code, data = api("POST", f"/o_and_m/bulk_import?entity={target}&mode={mode.lower()}", json=payload_list)
-                if code in (200,201):
-                    st.success(f"Bulk {mode.lower()} OK: {data}")
-                else:
-                    # fallback: per-row insert/update
-                    successes = failures = 0
-                    prog = st.progress(0, text="Processing...")
-                    for i, row in enumerate(payload_list, start=1):
-                        if mode == "Insert":
-                            per_code, per_data = api("POST", "/o_and_m/insert", json={"entity": target[:-1] if target.endswith('s') else target, **row})
-                        else:
-                            identifier = row.get("spotID") or row.get("buildingID") or row.get("regionID") or row.get("id")
-                            if identifier is None:
-                                failures += 1
-                                prog.progress(i/len(payload_list), text=f"Skip row {i} (no identifier)")
-                                continue
-                            per_code, per_data = api("PUT", f"/o_and_m/{target}/{int(identifier)}", json=row)
-                        if per_code in (200,201): successes += 1
-                        else: failures += 1
-                        prog.progress(i/len(payload_list), text=f"Processed {i}/{len(payload_list)}")
-                    st.info(f"Done. Success: {successes}, Fail: {failures}")
+                st.error(f"{code} {data}")
     else:
         st.info("Upload a CSV/JSON to continue.")
 
@@ -243,13 +222,21 @@ with tab4:
 
     st.divider()
     st.markdown("**Retention tools**")
+    tables = st.multiselect("Tables", ["orders", "reports"], default=["orders", "reports"])
     colA, colB = st.columns(2)
     with colA:
-        older = st.number_input("Purge test/temporary orders older than N days", 7, 3650, 120)
+        older = st.number_input("Purge orders/reports older than N days", 7, 3650, 120)
         if st.button("Purge now"):
-            c4, d4 = try_endpoints("POST", [(f"/o_and_m/retention/purge?older_than_days={int(older)}", None)])
+            c4, d4 = api("POST", f"/o_and_m/retention/purge?older_than_days={int(older)}&tables={','.join(tables)}")
+            if c4 == 202:
+                job = wait_for_job(api, d4["jobID"], "Purging...")
+                c4, d4 = (200, job["result"]) if job and job["status"] == "succeeded" else (500, job and job.get("error"))
             st.success(d4) if c4 in (200,201) else st.error(f"{c4} {d4}")
     with colB:
-        if st.button("Archive logs (zip & rotate)"):
-            c5, d5 = try_endpoints("POST", [("/o_and_m/retention/archive", None)])
+        archive_days = st.number_input("Archive (gzip NDJSON) & purge older than N days", 7, 3650, 365)
+        if st.button("Archive & purge"):
+            c5, d5 = api("POST", f"/o_and_m/retention/archive?older_than_days={int(archive_days)}&tables={','.join(tables)}")
+            if c5 == 202:
+                job = wait_for_job(api, d5["jobID"], "Archiving...")
+                c5, d5 = (200, job["result"]) if job and job["status"] == "succeeded" else (500, job and job.get("error"))
             st.success(d5) if c5 in (200,201) else st.error(f"{c5} {d5}")
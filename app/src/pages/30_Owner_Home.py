@@ -28,27 +28,11 @@ def fint(x, default=0):
     try:    return int(float(x))
     except: return int(default)
 
-# ---- Try /owner/overview; fallback to O&M metrics if not present ----
-code, overview = api("GET", "/owner/overview")
+# ---- KPIs: one cached aggregate request ----
+code, overview = api("GET", "/owner/overview?period=90d")
 if code != 200 or not isinstance(overview, dict):
+    st.error(f"Overview unavailable: {code} {overview}")
     overview = {}
-    sc, s = api("GET", "/o_and_m/spots/metrics")
-    cc, c = api("GET", "/o_and_m/customers/metrics")
-    oc, o = api("GET", "/o_and_m/orders/metrics?period=90d")
-    if sc == 200 and isinstance(s, dict):
-        overview.update({
-            "spots_total": s.get("total", 0),
-            "spots_in_use": s.get("in_use", 0),
-            "spots_with_issue": s.get("with_issue", 0),
-        })
-    if cc == 200 and isinstance(c, dict):
-        overview.update({"vip_count": c.get("vip", 0)})
-    if oc == 200 and isinstance(o, dict):
-        # allow either field name the backend might provide
-        overview.update({
-            "revenue_90d": o.get("sum_total", o.get("last_period_total", 0)),
-            "avg_order_value": o.get("avg_price", 0),
-        })
 
 # -------- KPI cards (string-safe) --------
 k1, k2, k3, k4, k5, k6 = st.columns(6)
@@ -78,29 +62,11 @@ cA, cB = st.columns(2)
 
 with cA:
     st.subheader("Top 10 Clients by Spend (90d)")
-    oc, odata = api("GET", "/o_and_m/orders/summary?period=90d&limit=10000")
-    if oc == 200 and isinstance(odata, list) and odata:
-        df = pd.DataFrame(odata)
-        if {"cID","total"}.issubset(df.columns):
-            top = (df.groupby("cID")["total"]
-                     .sum()
-                     .reset_index()
-                     .sort_values("total", ascending=False)
-                     .head(10))
-            # best-effort names
-            names = {}
-            for cid in top["cID"].tolist():
-                nc, ndata = api("GET", f"/customer/{int(cid)}")
-                if nc == 200 and isinstance(ndata, dict):
-                    nm = f"{ndata.get('fName','')} {ndata.get('lName','')}".strip()
-                    if ndata.get("companyName"):
-                        nm = f"{nm} ({ndata.get('companyName')})" if nm else ndata.get("companyName")
-                else:
-                    nm = f"Customer {cid}"
-                names[cid] = nm
-            top["customer"] = top["cID"].map(names)
-            top["total"] = top["total"].map(lambda x: f"${fnum(x):,.0f}")
-            st.dataframe(top[["customer","cID","total"]], use_container_width=True, hide_index=True)
+    tc, tdata = api("GET", "/owner/clients/top?period=90d&limit=10")
+    if tc == 200 and isinstance(tdata, list) and tdata:
+        top = pd.DataFrame(tdata)
+        top["total"] = top["spend"].map(lambda x: f"${fnum(x):,.0f}")
+        st.dataframe(top[["customer","cID","orders","total"]], use_container_width=True, hide_index=True)
     else:
         st.info("No order data for last 90 days.")
 
@@ -4,6 +4,7 @@ import os, sys, requests, json, pandas as pd, streamlit as st
 # --- nav import like Customer ---
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from modules.nav import SideBarLinks
+from modules.jobs import wait_for_job
 
 st.set_page_config(page_title="Owner • Pricing & Discounts", page_icon="💸", layout="wide")
 SideBarLinks()
@@ -50,63 +51,51 @@ else:
     new_price = st.number_input("Set new price ($)", 0, 10_000, 500)
     action = {"set": int(new_price)}
 
-# Owner simulate endpoint first
-sc, sim = api("GET",
-    "/owner/price/simulate?" +
-    "&".join([
-        f"regions={requests.utils.quote(x)}" for x in filters["regions"]
-    ]) +
-    (f"&status={filters['status']}" if filters["status"] else "") +
-    (f"&price_min={filters['price_min']}" if filters["price_min"] is not None else "") +
-    (f"&price_max={filters['price_max']}" if filters["price_max"] is not None else "") +
-    (f"&min_views={filters['min_views']}" if filters["min_views"] is not None else "") +
-    (f"&percent={action['percent']}" if 'percent' in action else f"&set={action['set']}")
-)
+params = [("regions", x) for x in filters["regions"]]
+params += [(k, filters[k]) for k in ("status", "price_min", "price_max", "min_views") if filters[k] is not None]
+params += list(action.items()) + [("preview", limit_preview)]
+sc, sim = api("GET", "/owner/price/simulate", params=params)
 
 if sc == 200 and isinstance(sim, dict):
-    s1, s2, s3 = st.columns(3)
+    s1, s2, s3, s4 = st.columns(4)
     s1.metric("Affected spots", sim.get("affected", 0))
     s2.metric("Current total $", f"{sim.get('current_total', 0):,.0f}")
     s3.metric("Projected total $", f"{sim.get('projected_total', 0):,.0f}")
+    s4.metric("Change $", f"{sim.get('delta_total', 0):+,.0f}")
+    hist = sim.get("histogram")
+    if hist:
+        edges = hist["edges"]
+        hdf = pd.DataFrame({
+            "price": [f"{lo:,.0f}–{hi:,.0f}" for lo, hi in zip(edges[:-1], edges[1:])],
+            "current": hist["current"],
+            "projected": hist["projected"],
+        }).set_index("price")
+        st.bar_chart(hdf, stack=False)
+    if sim.get("preview"):
+        st.dataframe(pd.DataFrame(sim["preview"]), use_container_width=True, hide_index=True)
+    st.caption(f"Simulated in {sim.get('elapsed_ms', 0)} ms")
 else:
-    # fallback: approximate preview using O&M spots summary
-    st.caption("Using O&M summary for preview (Owner simulate not available).")
-    qc, qd = api("GET", f"/o_and_m/spots/summary?limit={limit_preview}")
-    if qc == 200 and isinstance(qd, list) and qd:
-        df = pd.DataFrame(qd)
-        # apply filters locally when columns exist
-        if "address" in df.columns and filters["regions"]:
-            df = df[df["address"].fillna("").str.contains("|".join(filters["regions"]), case=False)]
-        if filters["status"] and "status" in df.columns:
-            df = df[df["status"] == filters["status"]]
-        if "price" in df.columns and filters["price_min"] is not None:
-            df = df[df["price"] >= filters["price_min"]]
-        if "price" in df.columns and filters["price_max"] is not None and filters["price_max"] > 0:
-            df = df[df["price"] <= filters["price_max"]]
-        affected = len(df)
-        current_total = int(df["price"].sum()) if "price" in df.columns else 0
-        if 'percent' in action:
-            projected_total = int((df["price"] * (1 + action['percent']/100.0)).sum()) if "price" in df.columns else current_total
-        else:
-            projected_total = int(len(df) * action['set'])
-        s1, s2, s3 = st.columns(3)
-        s1.metric("Affected spots (approx)", affected)
-        s2.metric("Current total $ (approx)", f"{current_total:,.0f}")
-        s3.metric("Projected total $ (approx)", f"{projected_total:,.0f}")
-        st.dataframe(df.head(50), use_container_width=True, hide_index=True)
-    else:
-        st.info("No preview available.")
+    st.error(f"Simulation unavailable: {sc} {sim}")
 
 # ---- Commit panel ----
 st.divider()
 st.subheader("Commit Change")
 if st.button("Apply bulk change", type="primary"):
-    body = {"filters": filters, **action}
-    pc, pd = api("POST", "/owner/spots/bulk-price", json=body)
-    if pc in (200,201):
-        st.success(pd)
+    body = {"filters": filters, **action, "async": True}
+    pc, res = api("POST", "/owner/spots/bulk-price", json=body)
+    if pc == 202 and isinstance(res, dict):
+        job = wait_for_job(api, res["jobID"], "Repricing...")
+        if job and job["status"] == "failed":
+            pc, res = 500, job.get("error")
+        elif job:
+            pc, res = 200, job["result"]
+    if pc in (200,201) and isinstance(res, dict):
+        st.success(f"Updated {res.get('updated', 0)} spots in {res.get('chunks', 0)} batches "
+                   f"({res.get('elapsed_ms', 0)} ms)")
+        st.dataframe(pd.DataFrame({"before": res.get("before", {}), "after": res.get("after", {})}),
+                     use_container_width=True)
     else:
-        st.error(f"{pc} {pd}")
+        st.error(f"{pc} {res}")
 
 st.divider()
 st.subheader("Discount Caps")
@@ -5,6 +5,7 @@ from datetime import date
 # --- nav import like Customer ---
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from modules.nav import SideBarLinks
+from modules.jobs import wait_for_job
 
 st.set_page_config(page_title="Owner • Reviews, VIP & Hygiene", page_icon="⭐", layout="wide")
 SideBarLinks()
@@ -59,26 +60,9 @@ with tab1:
 with tab2:
     st.subheader("Scores (90d)")
     sc, sd = api("GET", "/owner/customers/scores?period=90d")
-    if sc == 200 and isinstance(sd, list) and sd:
-        df = pd.DataFrame(sd)
-    else:
-        # fallback: compute from orders summary
-        oc, od = api("GET", "/o_and_m/orders/summary?period=90d&limit=10000")
-        if oc == 200 and isinstance(od, list) and od:
-            dfO = pd.DataFrame(od)
-            if {"cID","total"}.issubset(dfO.columns):
-                spend = dfO.groupby("cID")["total"].sum().rename("spend_90d")
-                freq = dfO.groupby("cID")["total"].size().rename("orders_90d")
-                df = pd.concat([spend, freq], axis=1).reset_index()
-                # simple score: 70% spend rank + 30% freq rank (0..100)
-                df["rank_spend"] = 100 * (df["spend_90d"].rank(pct=True))
-                df["rank_freq"]  = 100 * (df["orders_90d"].rank(pct=True))
-                df["score"] = (0.7*df["rank_spend"] + 0.3*df["rank_freq"]).round(1)
-                df["category"] = pd.cut(df["score"], bins=[-1,40,70,90,100], labels=["Low","Med","High","VIP"])
-            else:
-                df = pd.DataFrame()
-        else:
-            df = pd.DataFrame()
+    df = pd.DataFrame(sd) if (sc == 200 and isinstance(sd, list)) else pd.DataFrame()
+    if sc != 200:
+        st.error(f"Scores unavailable: {sc} {sd}")
 
     if not df.empty:
         st.dataframe(df.sort_values("score", ascending=False).head(50), use_container_width=True, hide_index=True)
@@ -133,11 +117,17 @@ with tab3:
     st.subheader("Retention")
     col1, col2 = st.columns(2)
     with col1:
-        days = st.number_input("Purge temporary/test data older than (days)", 7, 3650, 120)
+        days = st.number_input("Purge orders/reports older than (days)", 7, 3650, 120)
         if st.button("Purge"):
             pc, pd = api("POST", f"/owner/retention/purge?older_than_days={int(days)}")
+            if pc == 202:
+                job = wait_for_job(api, pd["jobID"], "Purging...")
+                pc, pd = (200, job["result"]) if job and job["status"] == "succeeded" else (500, job and job.get("error"))
             st.success(pd) if pc in (200,201) else st.error(f"{pc} {pd}")
     with col2:
-        if st.button("Archive logs"):
+        if st.button("Archive & purge (older than 1 year)"):
             pc, pd = api("POST", "/owner/retention/archive")
+            if pc == 202:
+                job = wait_for_job(api, pd["jobID"], "Archiving...")
+                pc, pd = (200, job["result"]) if job and job["status"] == "succeeded" else (500, job and job.get("error"))
             st.success(pd) if pc in (200,201) else st.error(f"{pc} {pd}")
\ No newline at end of file
@@ -25,36 +25,20 @@ def fnum(x, d=0.0):
     try: return float(x)
     except: return float(d)
 
-# Pull 2 years of orders to find repeats
-oc, od = api("GET", "/o_and_m/orders/summary?period=730d&limit=100000")
-dfO = pd.DataFrame(od) if (oc == 200 and isinstance(od, list)) else pd.DataFrame()
+st.subheader("Top repeat clients")
+min_orders = st.slider("Min orders (2y)", 2, 10, 2)
 
-if dfO.empty or not {"cID","date","total"}.issubset(dfO.columns):
-    st.info("Orders data not available yet.")
-    st.stop()
+# Per-client totals over 2 years, computed server-side
+oc, od = api("GET", f"/salesman/clients/repeat?period=730d&min_orders={min_orders}&limit=200")
+df = pd.DataFrame(od) if (oc == 200 and isinstance(od, list)) else pd.DataFrame()
 
-dfO["date"] = pd.to_datetime(dfO["date"], errors="coerce")
-last = dfO.sort_values("date").groupby("cID").tail(1)[["cID","date","total"]]
-cnt  = dfO.groupby("cID").size().rename("orders_2y").reset_index()
-sp   = dfO.groupby("cID")["total"].sum().rename("spend_2y").reset_index()
-df   = cnt.merge(last, on="cID", how="left").merge(sp, on="cID", how="left")
-df["last_total"] = df["total"].apply(fnum); df.drop(columns=["total"], inplace=True)
+if df.empty:
+    st.info("No repeat clients yet." if oc == 200 else "Orders data not available yet.")
+    st.stop()
 
-st.subheader("Top repeat clients")
-min_orders = st.slider("Min orders (2y)", 2, 10, 2)
-top = df[df["orders_2y"] >= min_orders].sort_values(["orders_2y","spend_2y"], ascending=[False,False]).head(200)
-# best-effort names (only for visible rows)
-names = {}
-for cid in top["cID"].tolist():
-    nc, ndata = api("GET", f"/customer/{int(cid)}")
-    if nc == 200 and isinstance(ndata, dict):
-        nm = f"{ndata.get('fName','')} {ndata.get('lName','')}".strip()
-        if ndata.get("companyName"): nm = f"{nm} ({ndata.get('companyName')})" if nm else ndata.get("companyName")
-    else:
-        nm = f"Customer {cid}"
-    names[cid] = nm
-top = top.assign(customer=top["cID"].map(names))
-show = top[["customer","cID","orders_2y","date","last_total","spend_2y"]].rename(columns={"date":"last_order_date"})
+df["last_total"] = df["last_total"].apply(fnum)
+show = df[["customer","cID","orders","last_order_date","last_total","spend"]].rename(
+    columns={"orders": "orders_2y", "spend": "spend_2y"})
 show["last_total"] = show["last_total"].map(lambda x: f"${x:,.0f}")
 show["spend_2y"]   = show["spend_2y"].map(lambda x: f"${fnum(x):,.0f}")
 st.dataframe(show, use_container_width=True, hide_index=True)
@@ -20,12 +20,12 @@ def api(method, path, **kw):
     except Exception as e:
         return 0, {"error": str(e)}
 
-# Load spots (O&M summary gives all)
-code, data = api("GET", "/o_and_m/spots/summary?limit=10000")
-if code != 200 or not isinstance(data, list):
-    st.error(f"Failed to load spots: {code} {data}")
+# Load all spots (streamed CSV export, no row cap)
+try:
+    df = pd.read_csv(f"{API}/export/spots.csv").rename(columns={"latitude":"lat","longitude":"lng"})
+except Exception as e:
+    st.error(f"Failed to load spots: {e}")
     st.stop()
-df = pd.DataFrame(data).rename(columns={"latitude":"lat","longitude":"lng"})
 if df.empty:
     st.info("No spots found.")
     st.stop()
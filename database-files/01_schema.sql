@@ -4,6 +4,10 @@ CREATE DATABASE `SpotLight`
   COLLATE utf8mb4_unicode_ci;
 USE `SpotLight`;
 
+-- This file is the current schema. Databases created from an older version
+-- are upgraded with `flask --app backend_app migrate` (api/backend/migrations.py);
+-- add a migration there for every index/column/table added here.
+
 CREATE TABLE IF NOT EXISTS Customers (
   cID INT AUTO_INCREMENT PRIMARY KEY,
   fName VARCHAR(50),
@@ -15,7 +19,8 @@ CREATE TABLE IF NOT EXISTS Customers (
   VIP BOOL,
   avatarURL VARCHAR(100),
   balance INT,
-  TEL VARCHAR(20)
+  TEL VARCHAR(20),
+  FULLTEXT KEY ft_customer_search (fName, lName, email, companyName)
 );
 
 CREATE TABLE IF NOT EXISTS Spot (
@@ -30,7 +35,21 @@ CREATE TABLE IF NOT EXISTS Spot (
   address VARCHAR(100),
   latitude DOUBLE,
   longitude DOUBLE,
-  FULLTEXT KEY ft_address (address)
+  -- assigned from latitude/longitude by backend/spots/regions.py
+  region VARCHAR(64),
+  -- SRID 4326 is latitude-first; spots without coordinates sit at (0, 0)
+  -- and are excluded by the latitude/longitude IS NOT NULL filters.
+  location POINT GENERATED ALWAYS AS (
+    ST_SRID(POINT(COALESCE(latitude, 0), COALESCE(longitude, 0)), 4326)
+  ) STORED SRID 4326 NOT NULL,
+  FULLTEXT KEY ft_address (address),
+  SPATIAL INDEX sp_location (location),
+  -- (sort key, id) pairs for keyset pagination of GET /spots/
+  KEY idx_spot_price (price, spotID),
+  KEY idx_spot_views (estViewPerMonth, spotID),
+  KEY idx_spot_status (status, spotID),
+  KEY idx_spot_region (region, status),
+  KEY idx_spot_end (endTimeOfCurrentOrder)
 );
 
 CREATE TABLE IF NOT EXISTS Reviews (
@@ -41,6 +60,7 @@ CREATE TABLE IF NOT EXISTS Reviews (
   cID INT,
   lastUpdate TIMESTAMP,
   CONSTRAINT chk_ratingrange CHECK (rating >= 0 AND rating <= 5),
+  KEY idx_reviews_spot_updated (spotID, lastUpdate),
   FOREIGN KEY (spotID) REFERENCES Spot(spotID) ON UPDATE CASCADE ON DELETE RESTRICT,
   FOREIGN KEY (cID) REFERENCES Customers(cID) ON UPDATE CASCADE ON DELETE RESTRICT
 );
@@ -71,9 +91,28 @@ CREATE TABLE IF NOT EXISTS Orders (
   total INT,
   cID INT,
   CONSTRAINT chk_totalnotnegative CHECK (total >= 0),
+  KEY idx_orders_date (date, orderID),
+  KEY idx_orders_customer_date (cID, date),
   FOREIGN KEY (cID) REFERENCES Customers(cID) ON UPDATE CASCADE ON DELETE RESTRICT
 );
 
+-- Per-day order totals maintained with every Orders write (backend/orders/rollup.py)
+CREATE TABLE IF NOT EXISTS OrderDailyRollup (
+  day DATE PRIMARY KEY,
+  orders INT NOT NULL DEFAULT 0,
+  revenue BIGINT NOT NULL DEFAULT 0,
+  customers INT NOT NULL DEFAULT 0
+);
+
+-- Per-(day, region) order totals through SpotOrder (backend/orders/rollup.py)
+CREATE TABLE IF NOT EXISTS RegionDailyRollup (
+  day DATE NOT NULL,
+  region VARCHAR(64) NOT NULL,
+  orders INT NOT NULL DEFAULT 0,
+  revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, region)
+);
+
 CREATE TABLE IF NOT EXISTS ToBeProcessedOrder (
   orderID INT PRIMARY KEY,
   status ENUM('in_chart', 'sent_as_order'),
@@ -84,14 +123,17 @@ CREATE TABLE IF NOT EXISTS ProcessedOrder (
   orderID INT PRIMARY KEY,
   processTime TIMESTAMP,
   processorID INT,
+  KEY idx_processed_time (processTime, orderID),
   FOREIGN KEY (orderID) REFERENCES Orders(orderID) ON DELETE CASCADE,
   FOREIGN KEY (processorID) REFERENCES SalesMan(eID) ON UPDATE CASCADE ON DELETE RESTRICT
 );
 
 
 CREATE TABLE IF NOT EXISTS SpotOrder (
-  spotID INT,
-  orderID INT,
+  spotID INT NOT NULL,
+  orderID INT NOT NULL,
+  PRIMARY KEY (orderID, spotID),
+  KEY idx_spotorder_spot (spotID, orderID),
   FOREIGN KEY (spotID) REFERENCES Spot(spotID) ON DELETE CASCADE,
   FOREIGN KEY (orderID) REFERENCES Orders(orderID) ON DELETE CASCADE
 );
@@ -103,6 +145,7 @@ CREATE TABLE IF NOT EXISTS Report (
   status ENUM('unexamined', 'examined'),
   generatorID INT,
   examinerID INT,
+  KEY idx_report_date (date, rID),
   FOREIGN KEY (generatorID) REFERENCES SalesMan(eID) ON UPDATE CASCADE ON DELETE RESTRICT,
   FOREIGN KEY (examinerID) REFERENCES OandM(eID) ON UPDATE CASCADE ON DELETE RESTRICT
 );
@@ -113,3 +156,27 @@ CREATE TABLE IF NOT EXISTS InvalidSpotReport (
   FOREIGN KEY (rID) REFERENCES Report(rID) ON DELETE CASCADE,
   FOREIGN KEY (orderID) REFERENCES Orders(orderID) ON UPDATE CASCADE ON DELETE CASCADE
 );
+
+-- Background jobs and their progress (api/backend/jobs/runner.py)
+CREATE TABLE IF NOT EXISTS Job (
+  jobID INT AUTO_INCREMENT PRIMARY KEY,
+  kind VARCHAR(50) NOT NULL,
+  status ENUM('queued', 'running', 'succeeded', 'failed') NOT NULL DEFAULT 'queued',
+  params JSON,
+  progress DOUBLE NOT NULL DEFAULT 0,
+  message VARCHAR(255),
+  result JSON,
+  error TEXT,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP NULL,
+  finished_at TIMESTAMP NULL,
+  heartbeat_at TIMESTAMP NULL,
+  KEY idx_job_status (status, heartbeat_at),
+  KEY idx_job_created (created_at, jobID)
+);
+
+-- Per-cache change counters for cross-worker invalidation (api/backend/cache_sync.py)
+CREATE TABLE IF NOT EXISTS CacheVersion (
+  name VARCHAR(64) PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0
+);
@@ -1,2 +1,7 @@
 USE `SpotLight`;
 SET FOREIGN_KEY_CHECKS=1;
+
+-- Build the daily order rollup from the seeded orders
+INSERT INTO OrderDailyRollup (day, orders, revenue, customers)
+SELECT date, COUNT(*), COALESCE(SUM(total), 0), COUNT(DISTINCT cID)
+FROM Orders WHERE date IS NOT NULL GROUP BY date;